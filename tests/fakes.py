@@ -0,0 +1,314 @@
+"""
+Local stand-ins for the Wikiquote API, used by tests that must not hit the network.
+"""
+
+import gzip
+import http.server
+import json
+import threading
+import urllib.parse
+import zlib
+
+import lxml.html
+
+from wikiquote import aio, transport
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.client_ports.append(self.client_address[1])
+
+        if self.path.startswith("/redirect"):
+            self.send_response(301)
+            self.send_header("Location", "/w/api.php?redirected=1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.path.startswith("/missing"):
+            body = b"not found"
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.path.startswith("/slow"):
+            server.release.wait(5)
+
+        body = json.dumps(server.payload).encode("utf-8")
+        accepted = self.headers.get("Accept-Encoding", "")
+        encoding = None
+        if server.encoding and server.encoding in accepted:
+            encoding = server.encoding
+            body = gzip.compress(body) if encoding == "gzip" else zlib.compress(body)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    """
+    A keep-alive HTTP server on localhost that answers every request with `payload`
+    encoded as JSON (optionally compressed with `encoding`).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, payload=None, encoding=None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.payload = payload if payload is not None else {}
+        self.encoding = encoding
+        self.requests = []
+        self.client_ports = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release.set()
+        self.shutdown()
+        self.server_close()
+
+
+class FakeWiki:
+    """
+    An in-process imitation of the parts of the MediaWiki API used by wikiquote.
+    `pages` maps page titles to their HTML contents; pages listed in
+    `disambiguations` are reported as disambiguation pages.
+    """
+
+    def __init__(
+        self,
+        pages=None,
+        disambiguations=(),
+        search_results=None,
+        redirects=None,
+        categories_per_request=None,
+    ):
+        self.pages = dict(pages or {})
+        self.disambiguations = set(disambiguations)
+        self.search_results = search_results or {}
+        self.redirects = dict(redirects or {})
+        self.categories_per_request = categories_per_request
+        self.revisions = {}
+        self.requests = []
+
+    def handle(self, url):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        params = {key: values[-1] for key, values in query.items()}
+        self.requests.append(params)
+
+        if params.get("action") == "parse":
+            return self.parse(params)
+        if params.get("action") == "query" and "titles" in params:
+            return self.query(params)
+        if params.get("list") == "search":
+            return {"query": {"search": self.search(params["srsearch"])}}
+        if params.get("list") == "random":
+            titles = sorted(self.pages)[: int(params["rnlimit"])]
+            return {"query": {"random": [{"title": t} for t in titles]}}
+        raise ValueError("Unexpected request: " + url)
+
+    def revision(self, title):
+        # Each page gets a distinct revision ID unless one was set explicitly
+        return self.revisions.setdefault(title, 1000 + len(self.revisions))
+
+    def parse(self, params):
+        if "oldid" in params:
+            return self.parse_section(
+                params, int(params["oldid"]), int(params["section"])
+            )
+
+        title = params["page"]
+        if title not in self.pages:
+            return {"error": {"code": "missingtitle"}}
+
+        prop = params.get("prop", "text|categories").split("|")
+        category = "Disambiguation_pages" if title in self.disambiguations else "People"
+        data = {"title": title, "revid": self.revision(title)}
+        if "text" in prop:
+            data["text"] = self.text(params, self.pages[title])
+        if "categories" in prop:
+            key = "category" if params.get("formatversion") == "2" else "*"
+            data["categories"] = [{"sortkey": "", key: category}]
+        if "sections" in prop:
+            data["sections"] = [
+                {
+                    "toclevel": level - 1,
+                    "level": str(level),
+                    "line": line,
+                    "number": str(i + 1),
+                    "index": str(i + 1),
+                    "fromtitle": title.replace(" ", "_"),
+                    "anchor": line.replace(" ", "_"),
+                }
+                for i, (level, line, _) in enumerate(self.sections(title))
+            ]
+        return {"parse": data}
+
+    def parse_section(self, params, revid, section):
+        titles = [t for t in sorted(self.pages) if self.revision(t) == revid]
+        if len(titles) != 1:
+            return {"error": {"code": "nosuchrevid"}}
+        _, _, html = self.sections(titles[0])[section - 1]
+        text = self.text(params, html)
+        return {"parse": {"title": titles[0], "revid": revid, "text": text}}
+
+    def text(self, params, html):
+        # In formatversion=2, the HTML is a plain string
+        return html if params.get("formatversion") == "2" else {"*": html}
+
+    def body(self, url):
+        """
+        Answer a request, and encode the response like the API does: non-ASCII
+        characters are escaped, unless formatversion=2 is used without ascii=1.
+        """
+        params = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        ascii_only = params.get("formatversion") != ["2"] or "ascii" in params
+        return json.dumps(self.handle(url), ensure_ascii=ascii_only).encode("utf-8")
+
+    def sections(self, title):
+        """
+        Split a page at its headings like MediaWiki does, returning (level, heading,
+        HTML) tuples. Each section includes its subsections.
+        """
+        root = lxml.html.fromstring(self.pages[title])
+        children = list(root)
+        headings = []
+        for i, child in enumerate(children):
+            heading = child
+            if child.tag == "div" and "mw-heading" in child.get("class", ""):
+                heading = child[0]
+            if heading.tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                headings.append((i, int(heading.tag[1]), heading.text_content()))
+
+        sections = []
+        for n, (start, level, line) in enumerate(headings):
+            end = next(
+                (i for i, lvl, _ in headings[n + 1 :] if lvl <= level), len(children)
+            )
+            html = "".join(
+                lxml.html.tostring(child, encoding="unicode")
+                for child in children[start:end]
+            )
+            sections.append(
+                (level, line, '<div class="mw-parser-output">' + html + "</div>")
+            )
+        return sections
+
+    def categories(self, title):
+        if title in self.disambiguations:
+            return ["Disambiguation pages", "Lists"]
+        return ["People", "Politicians"]
+
+    def query(self, params):
+        normalized, redirects, pages = [], [], {}
+        # Categories of all pages, optionally split across several responses
+        categories = []
+        for i, title in enumerate(params["titles"].split("|")):
+            target = title[:1].upper() + title[1:].replace("_", " ")
+            if target != title:
+                normalized.append({"from": title, "to": target})
+            if target in self.redirects:
+                redirects.append({"from": target, "to": self.redirects[target]})
+                target = self.redirects[target]
+
+            if target in self.pages:
+                pages[str(i + 1)] = {"pageid": i + 1, "ns": 0, "title": target}
+                if "revisions" in params["prop"]:
+                    revid = self.revision(target)
+                    pages[str(i + 1)]["revisions"] = [{"revid": revid}]
+                    continue
+                categories.extend((str(i + 1), c) for c in self.categories(target))
+            else:
+                pages[str(-i - 1)] = {"ns": 0, "title": target, "missing": ""}
+
+        start = int(params.get("clcontinue", 0))
+        end = len(categories)
+        if self.categories_per_request:
+            end = min(end, start + self.categories_per_request)
+        for page_id, category in categories[start:end]:
+            pages[page_id].setdefault("categories", []).append(
+                {"ns": 14, "title": "Category:" + category}
+            )
+
+        data = {
+            "query": {"normalized": normalized, "redirects": redirects, "pages": pages}
+        }
+        if end < len(categories):
+            data["continue"] = {"clcontinue": str(end), "continue": "||"}
+        return data
+
+    def search(self, s):
+        titles = self.search_results.get(s)
+        if titles is None:
+            titles = [t for t in sorted(self.pages) if s.lower() in t.lower()]
+        return [{"title": t} for t in titles]
+
+
+class FakeTransport(transport.Transport):
+    def __init__(self, wiki):
+        self.wiki = wiki
+
+    def get(self, url):
+        return self.wiki.body(url)
+
+
+class FakeAsyncTransport(aio.AsyncTransport):
+    def __init__(self, wiki):
+        self.wiki = wiki
+
+    async def get(self, url):
+        return self.wiki.body(url)
+
+
+AUTHOR_PAGE = """
+<div class="mw-parser-output">
+<p>An American politician.</p>
+<h2>Quotes</h2>
+<ul>
+<li>The only thing we have to fear is fear itself.
+<ul><li>First inaugural address (1933)</li></ul>
+</li>
+<li>Ask not what your country can do for you.</li>
+<li>too short</li>
+</ul>
+<h2>About</h2>
+<ul><li>He was a great man, everybody said so.</li></ul>
+</div>
+"""
+
+AUTHOR_QUOTES = [
+    "The only thing we have to fear is fear itself.",
+    "Ask not what your country can do for you.",
+]
+
+EN_MAIN_PAGE = """
+<div class="mw-parser-output">
+<div id="mf-qotd"><div><div><table><tbody>
+<tr><td>Always forgive your enemies; nothing annoys them so much. ~ Oscar Wilde ~</td></tr>
+</tbody></table></div></div></div>
+</div>
+"""
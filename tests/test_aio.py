@@ -0,0 +1,134 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest import mock
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    EN_MAIN_PAGE,
+    FakeAsyncTransport,
+    FakeServer,
+    FakeWiki,
+)
+from wikiquote import aio, langs
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class AioTest(unittest.TestCase):
+    """
+    Test wikiquote.aio
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={
+                "Franklin": AUTHOR_PAGE,
+                "Matrix": AUTHOR_PAGE,
+                "Main Page": EN_MAIN_PAGE,
+            },
+            disambiguations=["Matrix"],
+        )
+        self.previous = aio.set_transport(FakeAsyncTransport(self.wiki))
+
+    def tearDown(self):
+        aio.set_transport(self.previous)
+
+    def test_quotes(self):
+        self.assertEqual(run(aio.quotes("Franklin")), AUTHOR_QUOTES)
+        self.assertEqual(run(aio.quotes("Franklin", max_quotes=1)), AUTHOR_QUOTES[:1])
+
+    def test_exceptions(self):
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            run(aio.quotes("foobarfoobar"))
+        with self.assertRaises(wikiquote.DisambiguationPageException):
+            run(aio.quotes("Matrix"))
+
+    def test_unsupported_lang(self):
+        with self.assertRaisesRegex(
+            wikiquote.UnsupportedLanguageException, "Unsupported language: foobar"
+        ):
+            run(aio.search("test", lang="foobar"))
+
+    def test_search(self):
+        self.assertEqual(run(aio.search("frank")), ["Franklin"])
+        self.assertEqual(run(aio.search("")), [])
+
+    def test_random_titles(self):
+        self.assertEqual(len(run(aio.random_titles(max_titles=2))), 2)
+
+    def test_qotd(self):
+        quote, author = run(aio.qotd())
+        self.assertEqual(
+            quote, "Always forgive your enemies; nothing annoys them so much."
+        )
+        self.assertEqual(author, "Oscar Wilde")
+
+    def test_all_qotd(self):
+        qotds = run(aio.all_qotd(["es", "en"]))
+        self.assertEqual(sorted(qotds), ["en", "es"])
+        self.assertEqual(qotds["en"][1], "Oscar Wilde")
+        self.assertIsInstance(qotds["es"], Exception)
+
+        async def cancelled(lang):
+            raise asyncio.CancelledError()
+
+        with mock.patch("wikiquote.aio.quote_of_the_day", cancelled):
+            with self.assertRaises(asyncio.CancelledError):
+                run(aio.all_qotd(["en"]))
+
+    def test_extraction_off_loop(self):
+        # Pages are parsed outside of the thread running the event loop
+        threads = []
+        extract_quotes_lang = langs.extract_quotes_lang
+
+        def extract(*args):
+            threads.append(threading.current_thread())
+            return extract_quotes_lang(*args)
+
+        with mock.patch("wikiquote.langs.extract_quotes_lang", extract):
+            self.assertEqual(run(aio.quotes("Franklin")), AUTHOR_QUOTES)
+            run(aio.quotes("Franklin", max_quotes=1, sections=True))
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_supported_languages(self):
+        self.assertEqual(aio.supported_languages(), wikiquote.supported_languages())
+
+
+class AsyncHTTPTransportTest(unittest.TestCase):
+    """
+    Test wikiquote.aio.AsyncHTTPTransport
+    """
+
+    def test_bounded_connections(self):
+        async def fetch_all(url):
+            transport = aio.AsyncHTTPTransport(timeout=5, max_connections=2)
+            try:
+                return await asyncio.gather(*[transport.get(url) for _ in range(50)])
+            finally:
+                await transport.close()
+
+        with FakeServer({"a": 1}, encoding="gzip") as server:
+            bodies = run(fetch_all(server.url + "/w/api.php"))
+
+        self.assertEqual([json.loads(b) for b in bodies], [{"a": 1}] * 50)
+        self.assertEqual(len(server.requests), 50)
+        self.assertLessEqual(len(set(server.client_ports)), 2)
+
+    def test_redirect(self):
+        async def fetch(url):
+            transport = aio.AsyncHTTPTransport(timeout=5)
+            try:
+                return await transport.get(url)
+            finally:
+                await transport.close()
+
+        with FakeServer({"b": 2}) as server:
+            body = run(fetch(server.url + "/redirect"))
+        self.assertEqual(json.loads(body), {"b": 2})
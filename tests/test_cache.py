@@ -0,0 +1,107 @@
+import os
+import tempfile
+import time
+import unittest
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import cache, transport
+
+
+class MemoryCacheTest(unittest.TestCase):
+    """
+    Test wikiquote.cache.MemoryCache
+    """
+
+    def test_lru_eviction(self):
+        c = cache.MemoryCache(maxsize=2)
+        c.set(("en", "quotes", "A"), 1)
+        c.set(("en", "quotes", "B"), 2)
+        c.get(("en", "quotes", "A"))
+        c.set(("en", "quotes", "C"), 3)
+
+        self.assertEqual(c.get(("en", "quotes", "A")), 1)
+        self.assertIsNone(c.get(("en", "quotes", "B")))
+        self.assertEqual(c.stats.evictions, 1)
+
+    def test_ttl(self):
+        c = cache.MemoryCache(ttl=0.05)
+        c.set(("en", "search", "A"), ["A"])
+        self.assertEqual(c.get(("en", "search", "A")), ["A"])
+        time.sleep(0.1)
+        self.assertIsNone(c.get(("en", "search", "A")))
+        self.assertEqual((c.stats.hits, c.stats.misses), (1, 1))
+
+
+class SQLiteCacheTest(unittest.TestCase):
+    """
+    Test wikiquote.cache.SQLiteCache
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_persistence(self):
+        c = cache.SQLiteCache(self.path)
+        c.set(("he", "quotes", "ברק אובמה"), {"quotes": ["ציטוט"]})
+        c.close()
+
+        c = cache.SQLiteCache(self.path)
+        self.assertEqual(c.get(("he", "quotes", "ברק אובמה")), {"quotes": ["ציטוט"]})
+        c.close()
+
+    def test_maxsize_and_ttl(self):
+        c = cache.SQLiteCache(self.path, maxsize=2)
+        for title in "ABC":
+            c.set(("en", "quotes", title), title)
+            time.sleep(0.01)
+        self.assertEqual(len(c), 2)
+        self.assertIsNone(c.get(("en", "quotes", "A")))
+        c.close()
+
+        c = cache.SQLiteCache(self.path, ttl=-1)
+        c.set(("en", "quotes", "A"), "A")
+        self.assertIsNone(c.get(("en", "quotes", "A")))
+        c.close()
+
+
+class CachedQuotesTest(unittest.TestCase):
+    """
+    Test caching of wikiquote.quotes() and wikiquote.search()
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(pages={"Franklin": AUTHOR_PAGE})
+        self.previous_transport = transport.set_transport(FakeTransport(self.wiki))
+        self.cache = cache.MemoryCache()
+        self.previous_cache = cache.set_cache(self.cache)
+
+    def tearDown(self):
+        transport.set_transport(self.previous_transport)
+        cache.set_cache(self.previous_cache)
+
+    def test_quotes(self):
+        self.assertEqual(wikiquote.quotes("Franklin", max_quotes=5), AUTHOR_QUOTES)
+        # The page has no more quotes, so any smaller or larger limit can be served
+        self.assertEqual(wikiquote.quotes("Franklin", max_quotes=1), AUTHOR_QUOTES[:1])
+        self.assertEqual(wikiquote.quotes("Franklin", max_quotes=50), AUTHOR_QUOTES)
+        self.assertEqual(
+            wikiquote.quotes_many(["Franklin"]), {"Franklin": AUTHOR_QUOTES}
+        )
+        self.assertEqual(len(self.wiki.requests), 1)
+        self.assertEqual(self.cache.stats.hits, 3)
+
+    def test_quotes_larger_limit(self):
+        wikiquote.quotes("Franklin", max_quotes=1)
+        wikiquote.quotes("Franklin", max_quotes=2)
+        self.assertEqual(len(self.wiki.requests), 2)
+        self.assertEqual(self.cache.stats.misses, 2)
+
+    def test_search(self):
+        self.assertEqual(wikiquote.search("frank"), ["Franklin"])
+        self.assertEqual(wikiquote.search("frank"), ["Franklin"])
+        self.assertEqual(len(self.wiki.requests), 1)
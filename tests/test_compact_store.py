@@ -0,0 +1,194 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import dump, store, transport
+
+DUMP = os.path.join(
+    os.path.dirname(__file__), "fixtures", "dumps", "enwikiquote-pages-articles.xml"
+)
+
+
+class CompactStoreTest(unittest.TestCase):
+    """
+    Test wikiquote.store.CompactQuoteStore
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "quotes.wqs")
+        with store.CompactStoreBuilder(self.path) as builder:
+            builder.add_pages(
+                [
+                    ("en", "Zebra", ["Stripes are forever, said the zebra."], 1, False),
+                    ("en", "Ápple", ["Ünïcode quotes survive the trip."], 2, False),
+                    ("en", "Mercury", [], 3, True),
+                    ("en", "Ada Lovelace", ["Old quote that is replaced."], 4, False),
+                    ("es", "Cervantes", ["El que lee mucho y anda mucho."], 5, False),
+                ]
+            )
+            builder.add_pages(
+                [
+                    (
+                        "en",
+                        "Ada Lovelace",
+                        [
+                            "The Analytical Engine weaves patterns.",
+                            "That brain of mine.",
+                        ],
+                        6,
+                        False,
+                    )
+                ]
+            )
+            builder.add_redirects(
+                [("en", "Lovelace", "Ada Lovelace"), ("en", "Nowhere", "Missing")]
+            )
+        self.store = store.CompactQuoteStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp)
+
+    def test_quotes(self):
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(
+            self.store.quotes("en", "Ada Lovelace"),
+            ["The Analytical Engine weaves patterns.", "That brain of mine."],
+        )
+        self.assertEqual(
+            self.store.quotes("en", "lovelace", max_quotes=1),
+            ["The Analytical Engine weaves patterns."],
+        )
+        self.assertEqual(
+            self.store.quotes("en", "Ápple"), ["Ünïcode quotes survive the trip."]
+        )
+        self.assertEqual(
+            self.store.quotes("es", "Cervantes"), ["El que lee mucho y anda mucho."]
+        )
+        with self.assertRaises(wikiquote.DisambiguationPageException):
+            self.store.quotes("en", "Mercury")
+        for lang, title in (("en", "Nowhere"), ("en", "Cervantes"), ("fr", "Zebra")):
+            with self.assertRaises(wikiquote.NoSuchPageException):
+                self.store.quotes(lang, title)
+
+    def test_search_and_random(self):
+        self.assertEqual(self.store.search("en", "a"), ["Ada Lovelace", "Zebra"])
+        self.assertEqual(self.store.search("en", "zebra"), ["Zebra"])
+        self.assertEqual(self.store.search("fr", "zebra"), [])
+        self.assertEqual(
+            sorted(self.store.random_titles("en", 10)),
+            ["Ada Lovelace", "Mercury", "Zebra", "Ápple"],
+        )
+        self.assertEqual(len(self.store.random_titles("en", 2)), 2)
+
+        seen = set()
+        for _ in range(200):
+            seen.add(self.store.random_quote("en"))
+        self.assertEqual(
+            seen,
+            {
+                ("The Analytical Engine weaves patterns.", "Ada Lovelace"),
+                ("That brain of mine.", "Ada Lovelace"),
+                ("Stripes are forever, said the zebra.", "Zebra"),
+                ("Ünïcode quotes survive the trip.", "Ápple"),
+            },
+        )
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.store.random_quote("fr")
+
+    def test_indexes(self):
+        # The indexes give the same results as scanning, which is used for files
+        # written without them
+        titles = ["Ada", "ADA", "Adam", "Canada", "Nevada Ada", "Zebra", "Ápple"]
+        path = os.path.join(self.tmp, "indexed.wqs")
+        with store.CompactStoreBuilder(path) as builder:
+            builder.add_pages(
+                [
+                    ("en", title, ["{} wrote about {}.".format(title, other)], i, False)
+                    for i, (title, other) in enumerate(zip(titles, reversed(titles)))
+                ]
+            )
+        indexed = store.CompactQuoteStore(path)
+        scanned = store.CompactQuoteStore(path)
+        try:
+            scanned._langs["en"].indexed = False
+            for s in ("ada", "AD", "a", "da", "ápp", "pple", "missing", "a\nb"):
+                for limit in (1, 3, 10):
+                    with self.subTest(search=s, limit=limit):
+                        self.assertEqual(
+                            indexed.search("en", s, limit),
+                            scanned.search("en", s, limit),
+                        )
+            self.assertEqual(
+                indexed.search("en", "ada", 4), ["ADA", "Ada", "Adam", "Canada"]
+            )
+
+            for query in ("ada", "ada wrote", "wrote about a", "about z ", "x", "ab"):
+                with self.subTest(query=query):
+                    self.assertEqual(
+                        indexed.search_quotes("en", query),
+                        scanned.search_quotes("en", query),
+                    )
+            self.assertEqual(
+                indexed.search_quotes("en", "about nevada"),
+                [("Adam", "Adam wrote about Nevada Ada.")],
+            )
+        finally:
+            indexed.close()
+            scanned.close()
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.store.add_pages([("en", "Title", ["A new quote here."], 1, False)])
+
+    def test_invalid_file(self):
+        path = os.path.join(self.tmp, "invalid")
+        with open(path, "wb") as f:
+            f.write(pickle.dumps(list(range(10))))
+        with self.assertRaises(ValueError):
+            store.CompactQuoteStore(path)
+
+    def test_from_dump(self):
+        path = os.path.join(self.tmp, "enwikiquote.wqs")
+        with store.CompactStoreBuilder(path) as builder:
+            dump.ingest_dump(DUMP, builder)
+
+        previous_store = store.set_store(store.CompactQuoteStore(path))
+        wiki = FakeWiki()
+        previous_transport = transport.set_transport(FakeTransport(wiki))
+        try:
+            self.assertEqual(
+                wikiquote.quotes("FDR", max_quotes=1),
+                ["The only thing we have to fear is fear itself."],
+            )
+            quote, title = wikiquote.random_quote()
+            self.assertIn(title, ["Franklin D. Roosevelt", "The Matrix"])
+            self.assertIn(quote, wikiquote.quotes(title))
+        finally:
+            store.set_store(previous_store).close()
+            transport.set_transport(previous_transport)
+        self.assertEqual(wiki.requests, [])
+
+
+class RandomQuoteTest(unittest.TestCase):
+    """
+    Test wikiquote.random_quote() without a quote store
+    """
+
+    def test_random_quote(self):
+        wiki = FakeWiki(
+            pages={"Author": AUTHOR_PAGE, "About": AUTHOR_PAGE},
+            disambiguations=["About"],
+        )
+        previous = transport.set_transport(FakeTransport(wiki))
+        try:
+            quote, title = wikiquote.random_quote()
+        finally:
+            transport.set_transport(previous)
+        self.assertEqual(title, "Author")
+        self.assertIn(quote, AUTHOR_QUOTES)
@@ -0,0 +1,222 @@
+import asyncio
+import bz2
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+import lxml.html
+
+import wikiquote
+from tests.fakes import FakeTransport, FakeWiki
+from wikiquote import aio, dump, store, transport
+
+DUMP = os.path.join(
+    os.path.dirname(__file__), "fixtures", "dumps", "enwikiquote-pages-articles.xml"
+)
+
+FDR_QUOTES = [
+    "The only thing we have to fear is fear itself.",
+    "Ask not what your country can do for you.",
+    "A radical is a man with both feet firmly planted — in the air.",
+]
+
+
+class DumpTest(unittest.TestCase):
+    """
+    Test wikiquote.dump
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = store.SQLiteQuoteStore(os.path.join(self.tmp, "quotes.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp)
+
+    def test_iter_dump_pages(self):
+        pages = list(dump.iter_dump_pages(DUMP))
+        self.assertEqual(
+            [page.title for page in pages],
+            ["Franklin D. Roosevelt", "FDR", "Matrix", "The Matrix"],
+        )
+        self.assertEqual(pages[0].revid, 101)
+        self.assertEqual(pages[1].redirect, "Franklin D. Roosevelt")
+        self.assertIn("== Quotes ==", pages[0].text)
+
+    def test_ingest(self):
+        self.assertEqual(dump.dump_lang(DUMP), "en")
+        self.assertEqual(dump.ingest_dump(DUMP, self.store), 3)
+        self.assertEqual(len(self.store), 3)
+
+        self.assertEqual(self.store.quotes("en", "Franklin D. Roosevelt"), FDR_QUOTES)
+        self.assertEqual(self.store.quotes("en", "FDR", max_quotes=1), FDR_QUOTES[:1])
+        self.assertEqual(
+            self.store.quotes("en", "the_Matrix"),
+            [
+                "I know kung fu.",
+                "Whoa, this is déjà vu all over again.",
+                "Welcome to the real world.",
+            ],
+        )
+        with self.assertRaises(wikiquote.DisambiguationPageException):
+            self.store.quotes("en", "Matrix")
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.store.quotes("en", "Talk:Franklin D. Roosevelt")
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.store.quotes("es", "Franklin D. Roosevelt")
+
+    def test_ingest_bz2(self):
+        path = os.path.join(self.tmp, "enwikiquote-pages-articles.xml.bz2")
+        with open(DUMP, "rb") as src, bz2.open(path, "wb") as dst:
+            dst.write(src.read())
+
+        batches = []
+        self.assertEqual(
+            dump.ingest_dump(path, self.store, batch_size=2, progress=batches.append),
+            3,
+        )
+        self.assertEqual(batches, [1, 3, 3])
+        self.assertEqual(self.store.quotes("en", "FDR"), FDR_QUOTES)
+
+    def test_ingest_file_object(self):
+        with open(DUMP, "rb") as f:
+            with self.assertRaises(ValueError):
+                dump.ingest_dump(f, self.store)
+            self.assertEqual(dump.ingest_dump(f, self.store, lang="en"), 3)
+
+    def test_random_quote(self):
+        # Quotes are picked uniformly, not pages
+        many = ["Quote number {}.".format(i) for i in range(99)]
+        self.store.add_pages(
+            [
+                ("en", "One", ["The only quote."], 1, False),
+                ("en", "Many", many, 2, False),
+                ("en", "None", [], 3, False),
+            ]
+        )
+        titles = collections.Counter(
+            self.store.random_quote("en")[1] for _ in range(300)
+        )
+        self.assertLess(titles["One"], 30)
+        self.assertEqual(set(titles), {"One", "Many"})
+
+        # Replaced pages do not leave their quotes behind
+        self.store.add_pages([("en", "Many", [], 2, False)])
+        self.assertEqual(self.store.random_quote("en"), ("The only quote.", "One"))
+
+        # Languages whose quotes are too sparse to be hit at random
+        self.store.add_pages(
+            [("fr", "Page {}".format(i), many, i, False) for i in range(20)]
+        )
+        self.assertEqual(self.store.random_quote("en"), ("The only quote.", "One"))
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.store.random_quote("es")
+
+    def test_quote_rows_created(self):
+        # Stores created before quote rows existed are given them when opened
+        self.store.add_pages([("en", "One", ["The only quote."], 1, False)])
+        self.store._conn.execute("DROP TABLE quote_rows")
+        self.store.close()
+        self.store = store.SQLiteQuoteStore(os.path.join(self.tmp, "quotes.db"))
+        self.assertEqual(self.store.random_quote("en"), ("The only quote.", "One"))
+
+    def test_offline_api(self):
+        dump.ingest_dump(DUMP, self.store)
+        previous_store = store.set_store(self.store)
+        # No requests may be made
+        wiki = FakeWiki()
+        previous_transport = transport.set_transport(FakeTransport(wiki))
+        try:
+            self.assertEqual(wikiquote.quotes("FDR", max_quotes=2), FDR_QUOTES[:2])
+            results = wikiquote.quotes_many(["Franklin D. Roosevelt", "Matrix"])
+            self.assertEqual(results["Franklin D. Roosevelt"], FDR_QUOTES)
+            self.assertIsInstance(
+                results["Matrix"], wikiquote.DisambiguationPageException
+            )
+            self.assertEqual(wikiquote.search("matrix"), ["Matrix", "The Matrix"])
+            self.assertEqual(wikiquote.search("roosevelt"), ["Franklin D. Roosevelt"])
+            self.assertEqual(
+                sorted(wikiquote.random_titles(max_titles=10)),
+                ["Franklin D. Roosevelt", "Matrix", "The Matrix"],
+            )
+            self.assertEqual(len(wikiquote.random_titles(max_titles=2)), 2)
+            self.assertEqual(asyncio.run(aio.quotes("FDR")), FDR_QUOTES)
+            self.assertEqual(
+                asyncio.run(aio.search("Matrix")), ["Matrix", "The Matrix"]
+            )
+        finally:
+            store.set_store(previous_store)
+            transport.set_transport(previous_transport)
+        self.assertEqual(wiki.requests, [])
+
+
+class WikitextTest(unittest.TestCase):
+    """
+    Test the conversion of wikitext to HTML
+    """
+
+    def test_lists(self):
+        html = dump.wikitext_to_html(
+            "* One\n** One.1\n*# One.2\n* Two\n: Three\n:: Three.1\n; Four\nText"
+        )
+        self.assertEqual(
+            html,
+            '<div class="mw-parser-output">'
+            "<ul><li>One<ul><li>One.1</li></ul><ol><li>One.2</li></ol></li>"
+            "<li>Two</li></ul>"
+            "<dl><dd>Three<dl><dd>Three.1</dd></dl></dd><dt>Four</dt></dl>"
+            "<p>Text</p></div>",
+        )
+
+    def test_inline(self):
+        html = dump.wikitext_to_html(
+            "'''Bold''' and ''italic'' [[Target|label]] [[Link]] "
+            "[https://example.org external] [[Category:Hidden]] [[fr:Hidden]]"
+            "{{template|[[a|b]]}}<ref name=x>Reference</ref><!-- comment -->"
+        )
+        self.assertEqual(
+            html,
+            '<div class="mw-parser-output"><p><b>Bold</b> and <i>italic</i> '
+            "<a>label</a> <a>Link</a> <a>external</a></p></div>",
+        )
+
+    def test_escaping(self):
+        wikitext = (
+            "== Quotes ==\n"
+            "* If x <b then we are done & happy, and nothing else matters at all.\n"
+            "* Use the <tag> element in all your pages, always and forever.\n"
+            "* A quote with a line<br />break and <small>small text</small> in it."
+        )
+        html = dump.wikitext_to_html(wikitext)
+        self.assertIn("If x &lt;b then we are done &amp; happy", html)
+        self.assertIn("line<br />break and <small>small text</small>", html)
+        self.assertEqual(
+            wikiquote.langs.extract_quotes_lang("it", html, 2),
+            [
+                "If x <b then we are done & happy, and nothing else matters at all.",
+                "Use the <tag> element in all your pages, always and forever.",
+            ],
+        )
+
+    def test_french_citations(self):
+        html = dump.wikitext_to_html(
+            "{{citation|citation=Je pense, donc je [[être|suis]].}}\n"
+            "{{Citation|Une autre citation.}}"
+        )
+        tree = lxml.html.fromstring(html)
+        self.assertEqual(
+            [div.text_content() for div in tree.find_class("citation")],
+            ["Je pense, donc je suis.", "Une autre citation."],
+        )
+        self.assertEqual(
+            wikiquote.langs.extract_quotes_lang("fr", html, 10),
+            ["Je pense, donc je suis.", "Une autre citation."],
+        )
+
+    def test_disambiguation(self):
+        self.assertTrue(dump.is_disambiguation("Foo\n{{Disambig}}", "en"))
+        self.assertTrue(dump.is_disambiguation("{{homonymie|x}}", "fr"))
+        self.assertFalse(dump.is_disambiguation("{{homonymie}}", "en"))
@@ -0,0 +1,246 @@
+import glob
+import json
+import os
+import unittest
+from unittest import mock
+
+import lxml.etree
+import lxml.html
+
+from wikiquote import langs, utils
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_page(name):
+    with open(os.path.join(FIXTURES, "pages", name + ".json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ExtractionTest(unittest.TestCase):
+    """
+    Test quote extraction against a corpus of recorded pages
+    """
+
+    def setUp(self):
+        with open(
+            os.path.join(FIXTURES, "expected_quotes.json"), encoding="utf-8"
+        ) as f:
+            self.expected = json.load(f)
+
+    def test_corpus(self):
+        names = sorted(
+            os.path.basename(path)[:-5]
+            for path in glob.glob(os.path.join(FIXTURES, "pages", "*.json"))
+        )
+        self.assertEqual(names, sorted(self.expected))
+
+        for name in names:
+            lang = name.split("_")[0]
+            html = load_page(name)["parse"]["text"]["*"]
+            for max_quotes, expected in self.expected[name].items():
+                with self.subTest(page=name, max_quotes=max_quotes):
+                    tree = lxml.html.fromstring(html)
+                    quotes = langs.extract_quotes_lang(lang, tree, int(max_quotes))
+                    self.assertEqual(quotes, expected)
+
+                with self.subTest(page=name, incremental=True):
+                    quotes = langs.extract_quotes_lang(lang, html, int(max_quotes))
+                    self.assertEqual(quotes, expected)
+
+                with self.subTest(page=name, encoded=True):
+                    encoded = html.encode("utf-8")
+                    quotes = langs.extract_quotes_lang(lang, encoded, int(max_quotes))
+                    self.assertEqual(quotes, expected)
+
+    def test_qotd_corpus(self):
+        expected = {
+            "de": "Bertolt Brecht",
+            "en": "Oscar Wilde",
+            "es": "Pedro Calderón de la Barca",
+            "eu": "Jose Mari Iparragirre",
+            "fr": "Victor Hugo",
+            "he": "הלל הזקן",
+            "it": "Luciano De Crescenzo",
+            "pl": "Janusz Leon Wiśniewski",
+            "pt": "José Saramago",
+        }
+        self.assertEqual(sorted(expected), langs.SUPPORTED_LANGUAGES)
+        for lang, author in expected.items():
+            with self.subTest(lang=lang):
+                path = os.path.join(FIXTURES, "main_pages", lang + ".json")
+                with open(path, encoding="utf-8") as f:
+                    html = json.load(f)["parse"]["text"]["*"]
+                quote, qotd_author = langs.qotd_lang(lang, lxml.html.fromstring(html))
+                self.assertEqual(qotd_author, author)
+                tree = utils.parse_html(html)
+                self.assertEqual(langs.qotd_lang(lang, tree), (quote, qotd_author))
+                self.assertGreater(len(quote), 20)
+                self.assertNotIn(author, quote)
+
+    def test_page_html(self):
+        data = {"parse": {"title": "Page", "text": "<p>“Ünïcode”</p>"}}
+        self.assertEqual(utils.page_html(data), "<p>“Ünïcode”</p>")
+        # The response no longer holds the HTML
+        self.assertEqual(data, {"parse": {"title": "Page"}})
+
+    def test_parse_html(self):
+        html = "<div><p>“Ünïcode” {}</p></div>".format("x" * 40000)
+        for source in (html, html.encode("utf-8"), html):
+            tree = utils.parse_html(source)
+            self.assertEqual(tree.find(".//p").text_content()[:9], "“Ünïcode”")
+
+        # A failed parse does not affect the next one
+        with mock.patch("wikiquote.utils.HTML_CHUNK_SIZE", 1):
+            with self.assertRaises(TypeError):
+                utils.parse_html([b"<p>", None])
+        self.assertEqual(utils.parse_html("<p>Text</p>").find(".//p").text, "Text")
+
+    def test_tree_not_modified(self):
+        html = load_page("de_author")["parse"]["text"]["*"]
+        tree = lxml.html.fromstring(html)
+        before = lxml.html.tostring(tree)
+        langs.extract_quotes_lang("de", tree, 1000)
+        self.assertEqual(lxml.html.tostring(tree), before)
+
+    def test_toc(self):
+        html = (
+            '<div><div id="toc"><h2>Sommaire</h2><ul><li>A quote in the table of '
+            'contents.</li></ul><div class="citation">Citation in the table of '
+            "contents.</div></div><h2>Citations</h2><ul><li>A quote after the table "
+            'of contents.</li></ul><div class="citation">Citation after the table '
+            "of contents.</div></div>"
+        )
+        for source in (html, lxml.html.fromstring(html)):
+            self.assertEqual(
+                utils.extract_quotes_li(source, -1),
+                ["A quote after the table of contents."],
+            )
+            # French citations are extracted from the whole page, as they always were
+            self.assertEqual(
+                langs.extract_quotes_lang("fr", source, 100),
+                [
+                    "Citation in the table of contents.",
+                    "Citation after the table of contents.",
+                ],
+            )
+
+    def test_no_headings(self):
+        tree = lxml.html.fromstring(
+            "<div><ul><li>First quote without any heading.</li>"
+            "<li>Second quote without any heading.</li></ul></div>"
+        )
+        self.assertEqual(
+            utils.extract_quotes_li(tree, 1), ["First quote without any heading."]
+        )
+
+    def test_lazy(self):
+        html = load_page("en_author")["parse"]["text"]["*"]
+        quotes = utils.iter_quotes_li(lxml.html.fromstring(html), ["about"], ["quoted"])
+        self.assertEqual(
+            next(quotes),
+            "Where I end up is always that we have a choice, and hope is that choice.",
+        )
+
+    def test_spec(self):
+        html = load_page("en_author")["parse"]["text"]["*"]
+        spec = utils.ExtractorSpec(["About"], ["quoted"], ["small"])
+        self.assertEqual(spec.headings, ("about",))
+        self.assertEqual(spec.word_blocklist, frozenset(["quoted"]))
+        # A spec is reused across pages and calls
+        for source in (html, lxml.html.fromstring(html)):
+            self.assertEqual(
+                spec.extract_quotes(source, 5),
+                utils.extract_quotes_li(source, 5, ["about"], ["quoted"], ["small"]),
+            )
+
+    def test_quote_mask(self):
+        candidates = [
+            "A perfectly valid quote.",
+            "lowercase start is invalid",
+            "Short",
+            "Two words",
+            "(Starts with a parenthesis",
+            "Ends with a colon:",
+            "This one was quoted somewhere.",
+            "",
+        ]
+        mask = [True, False, False, False, False, False, False, False]
+        self.assertEqual(utils.quote_mask(candidates, ["quoted"]), mask)
+        self.assertEqual(utils.quote_mask(candidates, frozenset(["quoted"])), mask)
+        self.assertEqual(
+            [utils.is_quote(candidate, ["quoted"]) for candidate in candidates], mask
+        )
+        self.assertEqual(utils.quote_mask([]), [])
+
+    def test_batches(self):
+        items = "".join(
+            "<li>Quote number {} of the section.</li>".format(i) for i in range(40)
+        )
+        html = "<div><h2>Quotes</h2><ul>{0}</ul><h2>More</h2><ul>{0}</ul></div>"
+        quotes = utils.extract_quotes_li(html.format(items), 50)
+        self.assertEqual(len(quotes), 50)
+        self.assertEqual(quotes[45], "Quote number 5 of the section.")
+
+    def test_postprocess(self):
+        quotes = [
+            "Hello, world! –",
+            "Some other quote.",
+            "hello world",
+            "Héllo  wörld...",
+        ]
+        self.assertEqual(
+            list(utils.postprocess_quotes(quotes, [utils.remove_credit])),
+            ["Hello, world!", "Some other quote.", "hello world", "Héllo  wörld..."],
+        )
+        self.assertEqual(
+            list(utils.postprocess_quotes(quotes, [str.upper], dedupe=True)),
+            ["HELLO, WORLD! –", "SOME OTHER QUOTE."],
+        )
+        self.assertEqual(utils.quote_key("Héllo,  Wörld!"), "hello world")
+
+        spec = utils.ExtractorSpec(stages=[utils.remove_credit], dedupe=True)
+        tree = lxml.html.fromstring(
+            "<div><ul>"
+            + "".join("<li>{}</li>".format(quote) for quote in quotes)
+            + "</ul></div>"
+        )
+        self.assertEqual(
+            spec.extract_quotes(tree, 2), ["Hello, world!", "Some other quote."]
+        )
+
+    def test_clean_txt(self):
+        self.assertEqual(utils.clean_txt(' «Un “test”»\xa0"ici" \n'), "Un testici")
+
+    def test_compiled_xpath(self):
+        xpath = utils.compiled_xpath("//li")
+        self.assertIs(utils.compiled_xpath("//li"), xpath)
+        tree = lxml.html.fromstring("<div><ul><li>One</li><li>Two</li></ul></div>")
+        self.assertEqual([node.text for node in xpath(tree)], ["One", "Two"])
+
+    def test_incremental_stops_early(self):
+        html = load_page("en_author")["parse"]["text"]["*"]
+        html += "<div><ul><li>Filler text that is never parsed.</li></ul></div>" * 10000
+        fed = []
+
+        class Parser(lxml.etree.HTMLPullParser):
+            def feed(self, data):
+                fed.append(len(data))
+                super().feed(data)
+
+        with mock.patch.object(lxml.etree, "HTMLPullParser", Parser):
+            quotes = langs.extract_quotes_lang("en", html, 2)
+
+        self.assertEqual(len(quotes), 2)
+        self.assertLess(sum(fed), len(html) / 10)
+
+    def test_walk_html(self):
+        html = "<div><ul><li>One</li></ul><h2>Two</h2></div>"
+        for source in (html, lxml.html.fromstring(html)):
+            events = [
+                (event, node.tag)
+                for event, node in utils.walk_html(source, ["li", "h2"], chunk_size=4)
+            ]
+            self.assertEqual(
+                events, [("start", "li"), ("end", "li"), ("start", "h2"), ("end", "h2")]
+            )
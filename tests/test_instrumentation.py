@@ -0,0 +1,161 @@
+import importlib
+import unittest
+import urllib.request
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    EN_MAIN_PAGE,
+    FakeServer,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import instrumentation, transport, utils
+
+# wikiquote.qotd is shadowed by the qotd() function
+qotd_module = importlib.import_module("wikiquote.qotd")
+
+
+class RecordingTracer(instrumentation.Tracer):
+    def __init__(self):
+        self.stages = []
+        self.counters = {}
+
+    def observe(self, stage, seconds, lang=None):
+        self.stages.append((stage, lang))
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+class InstrumentationTest(unittest.TestCase):
+    """
+    Test wikiquote.instrumentation
+    """
+
+    def setUp(self):
+        qotd_module.clear_cache()
+        self.wiki = FakeWiki(pages={"Author": AUTHOR_PAGE, "Main Page": EN_MAIN_PAGE})
+        self.previous_transport = transport.set_transport(FakeTransport(self.wiki))
+        self.tracer = RecordingTracer()
+        self.previous_tracer = instrumentation.set_tracer(self.tracer)
+
+    def tearDown(self):
+        qotd_module.clear_cache()
+        transport.set_transport(self.previous_transport)
+        instrumentation.set_tracer(self.previous_tracer)
+
+    def test_quotes(self):
+        self.assertEqual(wikiquote.quotes("Author", 20, "en"), AUTHOR_QUOTES)
+        self.assertEqual(
+            self.tracer.stages,
+            [
+                ("request", None),
+                ("json_decode", None),
+                ("html_parse", None),
+                ("extract_quotes", "en"),
+                ("quotes", "en"),
+            ],
+        )
+        self.assertGreater(self.tracer.counters["response_bytes"], len(AUTHOR_PAGE))
+        self.assertGreater(self.tracer.counters["candidate_nodes"], len(AUTHOR_QUOTES))
+        self.assertGreater(self.tracer.counters["rejected_quotes"], 0)
+        for stage, _ in self.tracer.stages:
+            self.assertIn(stage, instrumentation.STAGES)
+        for name in self.tracer.counters:
+            self.assertIn(name, instrumentation.COUNTERS)
+
+    def test_qotd(self):
+        wikiquote.qotd()
+        self.assertEqual(
+            self.tracer.stages,
+            [
+                ("request", None),
+                ("json_decode", None),
+                ("html_parse", None),
+                ("extract_qotd", "en"),
+                ("qotd", "en"),
+            ],
+        )
+
+    def test_disabled(self):
+        instrumentation.set_tracer(None)
+        self.assertEqual(wikiquote.quotes("Author"), AUTHOR_QUOTES)
+        self.assertEqual(self.tracer.stages, [])
+        self.assertEqual(self.tracer.counters, {})
+
+    def test_errors(self):
+        # Failed stages are timed too
+        with self.assertRaises(utils.NoSuchPageException):
+            wikiquote.quotes("Missing")
+        self.assertEqual(self.tracer.stages[-1], ("quotes", "en"))
+
+    def test_http_transport(self):
+        http_transport = transport.HTTPTransport(timeout=2)
+        try:
+            with FakeServer({"quote": "abc" * 100}, encoding="gzip") as server:
+                for _ in range(2):
+                    http_transport.get(server.url + "/w/api.php")
+        finally:
+            http_transport.close()
+
+        # The connection was opened once, and then reused
+        self.assertEqual(self.tracer.stages, [("connect", None)])
+        self.assertLess(self.tracer.counters["received_bytes"], 2 * 300)
+
+
+class PrometheusExporterTest(unittest.TestCase):
+    """
+    Test wikiquote.instrumentation.PrometheusExporter
+    """
+
+    def setUp(self):
+        self.exporter = instrumentation.PrometheusExporter(buckets=(0.25, 1))
+        self.exporter.observe("request", 0.25)
+        self.exporter.observe("request", 0.5)
+        self.exporter.observe("extract_quotes", 2, "en")
+        self.exporter.count("rejected_quotes", 3)
+        self.exporter.count("rejected_quotes", 2)
+
+    def test_render(self):
+        self.assertEqual(
+            self.exporter.render(),
+            "# HELP wikiquote_stage_duration_seconds Time spent in each stage.\n"
+            "# TYPE wikiquote_stage_duration_seconds histogram\n"
+            'wikiquote_stage_duration_seconds_bucket{stage="extract_quotes",lang="en",le="0.25"} 0\n'
+            'wikiquote_stage_duration_seconds_bucket{stage="extract_quotes",lang="en",le="1.0"} 0\n'
+            'wikiquote_stage_duration_seconds_bucket{stage="extract_quotes",lang="en",le="+Inf"} 1\n'
+            'wikiquote_stage_duration_seconds_sum{stage="extract_quotes",lang="en"} 2.0\n'
+            'wikiquote_stage_duration_seconds_count{stage="extract_quotes",lang="en"} 1\n'
+            'wikiquote_stage_duration_seconds_bucket{stage="request",le="0.25"} 1\n'
+            'wikiquote_stage_duration_seconds_bucket{stage="request",le="1.0"} 2\n'
+            'wikiquote_stage_duration_seconds_bucket{stage="request",le="+Inf"} 2\n'
+            'wikiquote_stage_duration_seconds_sum{stage="request"} 0.75\n'
+            'wikiquote_stage_duration_seconds_count{stage="request"} 2\n'
+            "# HELP wikiquote_rejected_quotes_total potential quotes rejected by "
+            "is_quote()\n"
+            "# TYPE wikiquote_rejected_quotes_total counter\n"
+            "wikiquote_rejected_quotes_total 5\n",
+        )
+
+    def test_openmetrics(self):
+        lines = self.exporter.render(openmetrics=True).splitlines()
+        self.assertIn("# TYPE wikiquote_rejected_quotes counter", lines)
+        self.assertIn("wikiquote_rejected_quotes_total 5", lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+    def test_serve(self):
+        server = self.exporter.serve(0, "127.0.0.1")
+        try:
+            url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(body, self.exporter.render())
+
+    def test_reset(self):
+        self.exporter.reset()
+        self.assertEqual(self.exporter.render(), "")
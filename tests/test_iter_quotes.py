@@ -0,0 +1,69 @@
+import itertools
+import unittest
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import transport
+
+
+class FailingTransport:
+    def get(self, url):
+        raise ConnectionError("Unreachable")
+
+
+class IterQuotesTest(unittest.TestCase):
+    """
+    Test wikiquote.iter_quotes
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={"Author": AUTHOR_PAGE, "Other": AUTHOR_PAGE, "Matrix": AUTHOR_PAGE},
+            disambiguations=["Matrix"],
+        )
+        self.previous = transport.set_transport(FakeTransport(self.wiki))
+
+    def tearDown(self):
+        transport.set_transport(self.previous)
+
+    def test_iter_quotes(self):
+        records = list(
+            wikiquote.iter_quotes(["Author", "Matrix", "Nobody", "Other", "Author"])
+        )
+        self.assertEqual(
+            records,
+            [("Author", quote) for quote in AUTHOR_QUOTES]
+            + [("Other", quote) for quote in AUTHOR_QUOTES]
+            + [("Author", quote) for quote in AUTHOR_QUOTES],
+        )
+        self.assertEqual(
+            list(wikiquote.iter_quotes(["Author"], max_quotes=1)),
+            [("Author", AUTHOR_QUOTES[0])],
+        )
+        self.assertEqual(list(wikiquote.iter_quotes([])), [])
+
+    def test_infinite(self):
+        consumed = []
+
+        def titles():
+            for title in itertools.cycle(["Author", "Other"]):
+                consumed.append(title)
+                yield title
+
+        records = wikiquote.iter_quotes(titles(), window=3)
+        self.assertEqual(next(records), ("Author", AUTHOR_QUOTES[0]))
+        # Only the window of pages is read ahead
+        self.assertEqual(len(consumed), 3)
+
+        taken = list(itertools.islice(records, 4 * len(AUTHOR_QUOTES)))
+        self.assertEqual(len(taken), 4 * len(AUTHOR_QUOTES))
+        self.assertLessEqual(len(consumed), 8)
+        records.close()
+
+    def test_errors(self):
+        transport.set_transport(FailingTransport())
+        # Only missing and disambiguation pages are skipped
+        with self.assertRaises(ConnectionError):
+            list(wikiquote.iter_quotes(["Author"]))
+        with self.assertRaises(wikiquote.UnsupportedLanguageException):
+            wikiquote.iter_quotes(["Author"], lang="xx")
@@ -0,0 +1,68 @@
+import glob
+import os
+import subprocess
+import sys
+import unittest
+
+import wikiquote
+from wikiquote import langs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LangsTest(unittest.TestCase):
+    """
+    Test wikiquote.langs
+    """
+
+    def test_registry(self):
+        modules = glob.glob(os.path.join(ROOT, "wikiquote", "langs", "*.py"))
+        names = [os.path.basename(m)[:-3] for m in modules]
+        names.remove("__init__")
+        self.assertEqual(sorted(names), langs.SUPPORTED_LANGUAGES)
+        self.assertEqual(wikiquote.supported_languages(), langs.SUPPORTED_LANGUAGES)
+
+    def test_lazy_import(self):
+        code = (
+            "import sys, wikiquote\n"
+            "loaded = lambda: sorted(m for m in sys.modules if m.startswith("
+            "('wikiquote.langs.', 'lxml')))\n"
+            "print(loaded(), wikiquote.supported_languages() != [])\n"
+            "wikiquote.langs.extract_quotes_lang('en', '<ul><li>A quote</li></ul>', 1)\n"
+            "print(loaded()[-1])"
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+            text=True,
+        )
+        self.assertEqual(output.split("\n")[:2], ["[] True", "wikiquote.langs.en"])
+
+    def test_lazy_functions(self):
+        code = (
+            "import sys, wikiquote\n"
+            "heavy = ['asyncio', 'concurrent.futures', 'http.server', 'sqlite3',\n"
+            "         'wikiquote.pipeline', 'wikiquote.reservoir']\n"
+            "print([m for m in heavy if m in sys.modules])\n"
+            "print(wikiquote.harvest_quotes.__name__, wikiquote.random_quotes.__name__)\n"
+            "import wikiquote.aio\n"
+            "print(callable(wikiquote.quotes), callable(wikiquote.qotd))"
+        )
+        output = subprocess.check_output(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+            text=True,
+        )
+        self.assertEqual(
+            output.split("\n")[:3], ["[]", "internal internal", "True True"]
+        )
+        self.assertIn("search_quotes", dir(wikiquote))
+        with self.assertRaises(AttributeError):
+            wikiquote.missing_function
+
+    def test_unsupported(self):
+        with self.assertRaises(KeyError):
+            langs.lang_module("xx")
+        self.assertIs(langs.lang_module("en"), langs.lang_module("en"))
@@ -0,0 +1,95 @@
+import concurrent.futures
+import json
+import os
+import unittest
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import cache, transport
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def fixture_html(name):
+    with open(os.path.join(PAGES, name + ".json"), encoding="utf-8") as f:
+        return json.load(f)["parse"]["text"]["*"]
+
+
+class PipelineTest(unittest.TestCase):
+    """
+    Test wikiquote.harvest_quotes
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = concurrent.futures.ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={
+                "Author": AUTHOR_PAGE,
+                "Barack Obama": fixture_html("en_author"),
+                "The Matrix": fixture_html("en_film"),
+                "Matrix": AUTHOR_PAGE,
+            },
+            disambiguations=["Matrix"],
+        )
+        self.previous = transport.set_transport(FakeTransport(self.wiki))
+        self.titles = ["Barack Obama", "Matrix", "Author", "Nobody", "The Matrix"]
+
+    def tearDown(self):
+        transport.set_transport(self.previous)
+
+    def harvest(self, titles, **kwargs):
+        kwargs.setdefault("parse_executor", self.executor)
+        return wikiquote.harvest_quotes(titles, **kwargs)
+
+    def test_ordered(self):
+        results = list(self.harvest(self.titles, ordered=True, max_pending=2))
+        self.assertEqual([title for title, _ in results], self.titles)
+
+        expected = wikiquote.quotes_many(self.titles)
+        for title, result in results:
+            if isinstance(expected[title], Exception):
+                self.assertIs(type(result), type(expected[title]))
+            else:
+                self.assertEqual(result, expected[title])
+
+    def test_unordered(self):
+        results = dict(self.harvest(self.titles + ["Author"], max_quotes=1))
+        self.assertEqual(sorted(results), sorted(self.titles))
+        self.assertEqual(results["Author"], AUTHOR_QUOTES[:1])
+        self.assertIsInstance(results["Matrix"], wikiquote.DisambiguationPageException)
+        self.assertIsInstance(results["Nobody"], wikiquote.NoSuchPageException)
+
+    def test_default_executor(self):
+        results = dict(self.harvest(["Author"], parse_executor=None, parse_workers=1))
+        self.assertEqual(results, {"Author": AUTHOR_QUOTES})
+
+    def test_backpressure(self):
+        results = self.harvest(self.titles, ordered=True, max_pending=1)
+        self.assertEqual(next(results)[0], "Barack Obama")
+        # Only the pages of the results consumed so far (and the next one) are
+        # downloaded
+        self.assertLessEqual(len(self.wiki.requests), 2)
+        results.close()
+        self.assertLessEqual(len(self.wiki.requests), 2)
+
+    def test_cache(self):
+        previous = cache.set_cache(cache.MemoryCache())
+        try:
+            self.assertEqual(dict(self.harvest(["Author"])), {"Author": AUTHOR_QUOTES})
+            requests = len(self.wiki.requests)
+            self.assertEqual(dict(self.harvest(["Author"])), {"Author": AUTHOR_QUOTES})
+            self.assertEqual(wikiquote.quotes("Author"), AUTHOR_QUOTES)
+        finally:
+            cache.set_cache(previous)
+        self.assertEqual(len(self.wiki.requests), requests)
+
+    def test_unsupported_language(self):
+        with self.assertRaises(wikiquote.UnsupportedLanguageException):
+            list(wikiquote.harvest_quotes(["Author"], lang="xx"))
@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+import importlib
+import unittest
+from unittest import mock
+
+import wikiquote
+from tests.fakes import EN_MAIN_PAGE, FakeAsyncTransport, FakeTransport, FakeWiki
+from wikiquote import aio, transport
+
+# wikiquote.qotd is shadowed by the qotd() function
+qotd_module = importlib.import_module("wikiquote.qotd")
+
+QOTD = ("Always forgive your enemies; nothing annoys them so much.", "Oscar Wilde")
+
+
+class QOTDCacheTest(unittest.TestCase):
+    """
+    Test the daily cache of wikiquote.quote_of_the_day()
+    """
+
+    def setUp(self):
+        qotd_module.clear_cache()
+        self.wiki = FakeWiki(pages={"Main Page": EN_MAIN_PAGE})
+        self.previous_transport = transport.set_transport(FakeTransport(self.wiki))
+        self.previous_aio_transport = aio.set_transport(FakeAsyncTransport(self.wiki))
+
+    def tearDown(self):
+        qotd_module.clear_cache()
+        transport.set_transport(self.previous_transport)
+        aio.set_transport(self.previous_aio_transport)
+
+    def test_same_day(self):
+        self.assertEqual(wikiquote.qotd(), QOTD)
+        self.assertEqual(wikiquote.qotd(), QOTD)
+        self.assertEqual(asyncio.run(aio.qotd()), QOTD)
+        self.assertEqual(len(self.wiki.requests), 1)
+
+    def test_next_day(self):
+        today = datetime.date(2024, 1, 1)
+        with mock.patch.object(qotd_module, "_utc_today", return_value=today):
+            wikiquote.qotd()
+            wikiquote.qotd()
+        with mock.patch.object(
+            qotd_module, "_utc_today", return_value=today + datetime.timedelta(days=1)
+        ):
+            wikiquote.qotd()
+        self.assertEqual(len(self.wiki.requests), 2)
+
+    def test_all_qotd(self):
+        results = wikiquote.all_qotd(["en", "es"])
+        self.assertEqual(list(results), ["en", "es"])
+        self.assertEqual(results["en"], QOTD)
+        # There is no spanish main page in the fake wiki
+        self.assertIsInstance(results["es"], Exception)
+        self.assertEqual(
+            len(wikiquote.all_qotd()), len(wikiquote.supported_languages())
+        )
+
+    def test_prefetch(self):
+        prefetcher = wikiquote.start_qotd_prefetch(["en"])
+        prefetcher.stop()
+        prefetcher.join(5)
+        self.assertFalse(prefetcher.is_alive())
+        self.assertGreater(prefetcher.seconds_until_next_prefetch(), 0)
+
+        wikiquote.qotd()
+        self.assertEqual(len(self.wiki.requests), 1)
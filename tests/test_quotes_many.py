@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    FakeAsyncTransport,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import aio, transport
+
+DUPLICATES_PAGE = """
+<div class="mw-parser-output">
+<h2>Quotes</h2>
+<ul>
+<li>The only thing we have to fear is fear itself.</li>
+<li>The only thing we have to fear, is fear itself!</li>
+<li>Ask not what your country can do for you.</li>
+<li>The only thing we have to fear is fear itself…</li>
+<li>He was a great man, everybody said so.</li>
+</ul>
+</div>
+"""
+
+
+class QuotesManyTest(unittest.TestCase):
+    """
+    Test wikiquote.quotes_many()
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={"Author {}".format(i): AUTHOR_PAGE for i in range(120)},
+            disambiguations=["Author 7"],
+            redirects={"Roosevelt": "Author 1"},
+            categories_per_request=30,
+        )
+        self.previous = transport.set_transport(FakeTransport(self.wiki))
+
+    def tearDown(self):
+        transport.set_transport(self.previous)
+
+    def test_quotes_many(self):
+        titles = ["Author {}".format(i) for i in range(120)]
+        results = wikiquote.quotes_many(titles, max_quotes=1)
+
+        self.assertEqual(list(results), titles)
+        self.assertIsInstance(
+            results["Author 7"], wikiquote.DisambiguationPageException
+        )
+        for title in titles:
+            if title != "Author 7":
+                self.assertEqual(results[title], AUTHOR_QUOTES[:1])
+
+        parses = [r for r in self.wiki.requests if r["action"] == "parse"]
+        queries = [r for r in self.wiki.requests if r["action"] == "query"]
+        self.assertEqual(len(parses), 119)
+        # Three batches of titles, with continuations for the categories
+        self.assertEqual(len({r["titles"] for r in queries}), 3)
+
+    def test_redirects_and_missing(self):
+        results = wikiquote.quotes_many(["roosevelt", "Author 1", "Nobody"])
+
+        self.assertEqual(results["roosevelt"], AUTHOR_QUOTES)
+        self.assertEqual(results["Author 1"], AUTHOR_QUOTES)
+        self.assertIsInstance(results["Nobody"], wikiquote.NoSuchPageException)
+        # Both titles lead to the same page, which is only downloaded once
+        parses = [r for r in self.wiki.requests if r["action"] == "parse"]
+        self.assertEqual([r["page"] for r in parses], ["Author 1"])
+        # ... but they do not share the same list
+        results["roosevelt"].clear()
+        self.assertEqual(results["Author 1"], AUTHOR_QUOTES)
+
+    def test_unsupported_lang(self):
+        with self.assertRaisesRegex(
+            wikiquote.UnsupportedLanguageException, "Unsupported language: foobar"
+        ):
+            wikiquote.quotes_many(["Matrix"], lang="foobar")
+
+    def test_dedupe(self):
+        self.wiki.pages["Duplicates"] = DUPLICATES_PAGE
+        unique = AUTHOR_QUOTES + ["He was a great man, everybody said so."]
+
+        # Near duplicates are only removed on request
+        self.assertEqual(len(wikiquote.quotes("Duplicates", max_quotes=-1)), 5)
+        self.assertEqual(wikiquote.quotes("Duplicates", dedupe=True), unique)
+        # Duplicates removed from a truncated list are replaced
+        self.assertEqual(wikiquote.quotes("Duplicates", 2, dedupe=True), unique[:2])
+        results = wikiquote.quotes_many(
+            ["Duplicates", "Author 1", "Author 7"], max_quotes=3, dedupe=True
+        )
+        self.assertEqual(results["Duplicates"], unique)
+        self.assertEqual(results["Author 1"], AUTHOR_QUOTES)
+        self.assertIsInstance(
+            results["Author 7"], wikiquote.DisambiguationPageException
+        )
+
+        previous = aio.set_transport(FakeAsyncTransport(self.wiki))
+        try:
+            self.assertEqual(
+                asyncio.run(aio.quotes("Duplicates", 3, dedupe=True)), unique
+            )
+        finally:
+            aio.set_transport(previous)
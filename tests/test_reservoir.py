@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import reservoir, store, transport
+
+
+class ReservoirTest(unittest.TestCase):
+    """
+    Test wikiquote.reservoir
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={
+                "Author": AUTHOR_PAGE,
+                "Other author": AUTHOR_PAGE,
+                "Empty": "<div class='mw-parser-output'></div>",
+                "Matrix": AUTHOR_PAGE,
+            },
+            disambiguations=["Matrix"],
+        )
+        self.previous = transport.set_transport(FakeTransport(self.wiki))
+        self.reservoir = reservoir.QuoteReservoir(size=4, batch_size=10)
+
+    def tearDown(self):
+        self.reservoir.stop()
+        transport.set_transport(self.previous)
+
+    def test_fill(self):
+        self.assertEqual(self.reservoir.fill("en"), 2 * len(AUTHOR_QUOTES))
+        self.assertEqual(self.reservoir.available("en"), 2 * len(AUTHOR_QUOTES))
+        self.assertEqual(self.reservoir.available("es"), 0)
+
+        drawn = self.reservoir.draw("en", 2 * len(AUTHOR_QUOTES))
+        self.assertEqual(len(set(drawn)), 2 * len(AUTHOR_QUOTES))
+        for quote, title in drawn:
+            self.assertIn(title, ["Author", "Other author"])
+            self.assertIn(quote, AUTHOR_QUOTES)
+        self.assertEqual(self.reservoir.available("en"), 0)
+
+    def test_quotes_per_page(self):
+        self.reservoir.quotes_per_page = 1
+        self.assertEqual(self.reservoir.fill("en"), 2)
+        # Pools are filled by draw() if the thread is not running
+        self.assertEqual(len(self.reservoir.draw("en", 5)), 5)
+        self.assertEqual(self.reservoir.available("en"), 1)
+
+    def test_background(self):
+        self.reservoir.start()
+        self.assertEqual(len(self.reservoir.draw("en", 8, timeout=5)), 8)
+        fetches = len(self.wiki.requests)
+        # The pool is replenished after quotes are drawn
+        self.reservoir.draw("en", 1, timeout=5)
+        with self.reservoir._condition:
+            self.reservoir._condition.wait_for(
+                lambda: self.reservoir.available("en") >= 4, timeout=5
+            )
+        self.assertGreaterEqual(self.reservoir.available("en"), 4)
+        self.assertGreater(len(self.wiki.requests), fetches)
+
+    def test_no_quotes(self):
+        transport.set_transport(FakeTransport(FakeWiki(pages={"Empty": ""})))
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.reservoir.draw("en")
+
+    def test_timeout(self):
+        # Quotes drawn before the deadline are put back in the pool
+        self.reservoir.fill("en")
+        self.reservoir.is_alive = lambda: True
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.reservoir.draw("en", 3 * len(AUTHOR_QUOTES), timeout=0.05)
+        self.assertEqual(self.reservoir.available("en"), 2 * len(AUTHOR_QUOTES))
+
+        # Same when the pool cannot be filled
+        del self.reservoir.is_alive
+        transport.set_transport(FakeTransport(FakeWiki(pages={"Empty": ""})))
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            self.reservoir.draw("en", 3 * len(AUTHOR_QUOTES))
+        self.assertEqual(self.reservoir.available("en"), 2 * len(AUTHOR_QUOTES))
+
+    def test_random_quotes(self):
+        previous = reservoir.set_reservoir(self.reservoir)
+        try:
+            drawn = wikiquote.random_quotes(3)
+        finally:
+            reservoir.set_reservoir(previous)
+        self.assertEqual(len(drawn), 3)
+        self.assertEqual(self.reservoir.available("en"), 2 * len(AUTHOR_QUOTES) - 3)
+
+        with self.assertRaises(wikiquote.UnsupportedLanguageException):
+            wikiquote.random_quotes(lang="xx")
+
+    def test_store(self):
+        tmp = tempfile.mkdtemp()
+        quote_store = store.SQLiteQuoteStore(os.path.join(tmp, "quotes.db"))
+        quote_store.add_pages([("en", "Author", AUTHOR_QUOTES, 1, False)])
+        previous = store.set_store(quote_store)
+        try:
+            drawn = wikiquote.random_quotes(5)
+        finally:
+            store.set_store(previous)
+            quote_store.close()
+            shutil.rmtree(tmp)
+        self.assertEqual(len(drawn), 5)
+        self.assertEqual(self.wiki.requests, [])
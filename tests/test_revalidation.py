@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+import urllib.error
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    FakeAsyncTransport,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import aio, cache, transport
+
+
+class FailingRevisionsTransport(FakeTransport):
+    def get(self, url):
+        if "prop=revisions" in url:
+            raise urllib.error.URLError("Revision check failed")
+        return super().get(url)
+
+
+class FailingRevisionsAsyncTransport(FakeAsyncTransport):
+    async def get(self, url):
+        if "prop=revisions" in url:
+            raise urllib.error.URLError("Revision check failed")
+        return await super().get(url)
+
+
+class RevalidationTest(unittest.TestCase):
+    """
+    Test revalidation of expired cache entries using revision IDs
+    """
+
+    def setUp(self):
+        self.titles = ["Author {}".format(i) for i in range(60)]
+        self.wiki = FakeWiki(pages={title: AUTHOR_PAGE for title in self.titles})
+        self.previous_transport = transport.set_transport(FakeTransport(self.wiki))
+        self.previous_aio_transport = aio.set_transport(FakeAsyncTransport(self.wiki))
+        # Every entry expires immediately
+        self.cache = cache.MemoryCache(ttl=-1)
+        self.previous_cache = cache.set_cache(self.cache)
+
+    def tearDown(self):
+        transport.set_transport(self.previous_transport)
+        aio.set_transport(self.previous_aio_transport)
+        cache.set_cache(self.previous_cache)
+
+    def actions(self):
+        return [
+            "revisions" if r.get("prop") == "revisions" else r["action"]
+            for r in self.wiki.requests
+        ]
+
+    def test_unchanged_page(self):
+        wikiquote.quotes("Author 1")
+        self.assertEqual(wikiquote.quotes("Author 1"), AUTHOR_QUOTES)
+        self.assertEqual(self.actions(), ["parse", "revisions"])
+
+    def test_changed_page(self):
+        wikiquote.quotes("Author 1")
+        self.wiki.revisions["Author 1"] = 2
+        self.wiki.pages["Author 1"] = AUTHOR_PAGE.replace("Ask not", "Ask")
+        self.assertEqual(
+            wikiquote.quotes("Author 1")[1], "Ask what your country can do for you."
+        )
+        self.assertEqual(self.actions(), ["parse", "revisions", "parse"])
+
+    def test_failed_revision_check(self):
+        # The page is downloaded again
+        wikiquote.quotes("Author 1")
+        transport.set_transport(FailingRevisionsTransport(self.wiki))
+        self.assertEqual(wikiquote.quotes("Author 1"), AUTHOR_QUOTES)
+        self.assertEqual(self.actions(), ["parse", "parse"])
+
+        aio.set_transport(FailingRevisionsAsyncTransport(self.wiki))
+        self.assertEqual(asyncio.run(aio.quotes("Author 1")), AUTHOR_QUOTES)
+        self.assertEqual(self.actions(), ["parse", "parse", "parse"])
+
+    def test_aio(self):
+        asyncio.run(aio.quotes("Author 1"))
+        self.assertEqual(asyncio.run(aio.quotes("Author 1")), AUTHOR_QUOTES)
+        self.assertEqual(self.actions(), ["parse", "revisions"])
+
+    def test_revalidate_quotes(self):
+        wikiquote.quotes_many(self.titles)
+        self.wiki.requests.clear()
+        self.wiki.revisions["Author 3"] = 2
+        del self.wiki.pages["Author 4"]
+
+        changed = wikiquote.revalidate_quotes(self.titles + ["Uncached"])
+        self.assertEqual(
+            {title for title in changed if changed[title]}, {"Author 3", "Author 4"}
+        )
+        self.assertEqual(len(changed), 60)
+        # Two batches of revision checks, and one page downloaded again
+        self.assertEqual(
+            sorted(self.actions()),
+            ["parse", "parse"] + ["revisions"] * 2,
+        )
+        self.assertIsNone(self.cache.get_stale(("en", "quotes", "Author 4")))
+
+    def test_quotes_many(self):
+        wikiquote.quotes_many(self.titles)
+        self.wiki.requests.clear()
+        self.wiki.revisions["Author 3"] = 2
+
+        results = wikiquote.quotes_many(self.titles)
+        self.assertEqual(results["Author 3"], AUTHOR_QUOTES)
+        self.assertEqual(
+            sorted(self.actions()),
+            ["parse"] + ["query"] + ["revisions"] * 2,
+        )
@@ -0,0 +1,173 @@
+import http.client
+import io
+import threading
+import time
+import unittest
+import urllib.error
+
+import wikiquote
+from tests.fakes import AUTHOR_PAGE, AUTHOR_QUOTES, FakeTransport, FakeWiki
+from wikiquote import scheduler, transport
+
+URL = "https://en.wikiquote.org/w/api.php?format=json"
+MAXLAG_ERROR = b'{"error": {"code": "maxlag", "info": "Waiting: 7 seconds lagged"}}'
+
+
+def http_error(code, retry_after=None):
+    headers = http.client.HTTPMessage()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return urllib.error.HTTPError(URL, code, "Error", headers, io.BytesIO(b""))
+
+
+class ScriptedTransport(transport.Transport):
+    """
+    Answers requests with the given responses (bodies or exceptions to raise), in
+    order, and then with an empty JSON object.
+    """
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.urls.append(url)
+            response = self.responses.pop(0) if self.responses else b"{}"
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class SchedulerTest(unittest.TestCase):
+    """
+    Test wikiquote.scheduler
+    """
+
+    def scheduling(self, inner, **kwargs):
+        kwargs.setdefault("retry_delay", 0.001)
+        kwargs.setdefault("rate", 1000)
+        return scheduler.SchedulingTransport(inner, **kwargs)
+
+    def test_retry(self):
+        inner = ScriptedTransport(
+            [http_error(429, "0"), http_error(503, "0"), http_error(502), b"{}"]
+        )
+        scheduling = self.scheduling(inner)
+        self.assertEqual(scheduling.get(URL), b"{}")
+        self.assertEqual(len(inner.urls), 4)
+        # Each throttled response halved the concurrency limit
+        self.assertEqual(scheduling.concurrency_limit("en.wikiquote.org"), 2)
+
+        for _ in range(10):
+            scheduling.get(URL)
+        self.assertGreater(scheduling.concurrency_limit("en.wikiquote.org"), 2)
+
+    def test_give_up(self):
+        inner = ScriptedTransport([http_error(503, "0")] * 2)
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.scheduling(inner, max_retries=1).get(URL)
+        self.assertEqual(ctx.exception.code, 503)
+        self.assertEqual(len(inner.urls), 2)
+
+        # Other errors are not retried
+        inner = ScriptedTransport([http_error(404)])
+        with self.assertRaises(urllib.error.HTTPError):
+            self.scheduling(inner).get(URL)
+        self.assertEqual(len(inner.urls), 1)
+
+    def test_maxlag(self):
+        inner = ScriptedTransport([MAXLAG_ERROR, b"{}"])
+        scheduling = self.scheduling(inner)
+        with scheduler.request_priority(scheduler.BULK):
+            self.assertEqual(scheduling.get(URL), b"{}")
+        self.assertEqual(inner.urls, [URL + "&maxlag=5"] * 2)
+
+        inner = ScriptedTransport([MAXLAG_ERROR] * 2)
+        with scheduler.request_priority(scheduler.BULK):
+            with self.assertRaises(urllib.error.HTTPError):
+                self.scheduling(inner, max_retries=1).get(URL)
+
+        # Interactive requests do not carry the maxlag parameter
+        inner = ScriptedTransport()
+        self.scheduling(inner).get(URL)
+        self.assertEqual(inner.urls, [URL])
+
+    def test_rate_limit(self):
+        scheduling = self.scheduling(ScriptedTransport(), rate=100, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            scheduling.get(URL)
+        self.assertGreaterEqual(time.monotonic() - start, 0.045)
+
+    def test_priority(self):
+        gate = threading.Event()
+
+        class BlockingTransport(ScriptedTransport):
+            def get(self, url):
+                if not self.urls:
+                    gate.wait(5)
+                return super().get(url)
+
+        inner = BlockingTransport()
+        scheduling = self.scheduling(inner, max_concurrency=1)
+        host = scheduling._host("en.wikiquote.org")
+
+        def request(path, priority):
+            with scheduler.request_priority(priority):
+                scheduling.get("https://en.wikiquote.org/" + path)
+
+        threads = []
+        for path, priority in [
+            ("first", scheduler.BULK),
+            ("bulk", scheduler.BULK),
+            ("interactive", scheduler.INTERACTIVE),
+        ]:
+            thread = threading.Thread(target=request, args=(path, priority))
+            thread.start()
+            threads.append(thread)
+            # Wait for the request to be in flight or queued before the next one
+            while host.in_flight + len(host._waiting) < len(threads):
+                time.sleep(0.001)
+
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            [url.rsplit("/", 1)[1] for url in inner.urls],
+            ["first", "interactive", "bulk"],
+        )
+
+    def test_bind_priority(self):
+        lanes = []
+        with scheduler.request_priority(scheduler.BULK):
+            bound = scheduler.bind_priority(scheduler.current_priority)
+        thread = threading.Thread(target=lambda: lanes.append(bound()))
+        thread.start()
+        thread.join()
+        self.assertEqual(lanes, [scheduler.BULK])
+        self.assertEqual(scheduler.current_priority(), scheduler.INTERACTIVE)
+
+    def test_retry_after(self):
+        self.assertEqual(scheduler.retry_after("5"), 5)
+        self.assertEqual(scheduler.retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(scheduler.retry_after("soon"))
+        self.assertIsNone(scheduler.retry_after(None))
+
+    def test_lanes(self):
+        wiki = FakeWiki(pages={"Author": AUTHOR_PAGE})
+        previous = transport.set_transport(
+            scheduler.SchedulingTransport(FakeTransport(wiki))
+        )
+        try:
+            self.assertEqual(wikiquote.quotes("Author"), AUTHOR_QUOTES)
+            self.assertNotIn("maxlag", wiki.requests[-1])
+
+            self.assertEqual(
+                [quote for _, quote in wikiquote.iter_quotes(["Author"])],
+                AUTHOR_QUOTES,
+            )
+            self.assertEqual(wiki.requests[-1]["maxlag"], "5")
+        finally:
+            transport.set_transport(previous)
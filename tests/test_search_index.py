@@ -0,0 +1,119 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    FakeAsyncTransport,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import aio, index, transport
+
+
+class SearchIndexTest(unittest.TestCase):
+    """
+    Test wikiquote.index
+    """
+
+    def setUp(self):
+        self.index = index.SearchIndex(include_quotes=True)
+        self.index.add_page("en", "Albert Einstein", ["Imagination is everything."])
+        self.index.add_page("en", "Einstein on the Beach")
+        self.index.add_page("en", "The Matrix", ["I know kung fu."])
+        self.index.add_page("en", "Matrix")
+
+    def test_tokenize(self):
+        self.assertEqual(index.tokenize("Éire, EIRE & éire!"), ["eire"] * 3)
+        self.assertEqual(index.tokenize("Łódź Żółć"), ["łodz", "zołc"])
+        self.assertEqual(index.tokenize("Euskal Herria-ko"), ["euskal", "herria", "ko"])
+        # Hebrew vowel points are removed
+        self.assertEqual(index.tokenize("שָׁלוֹם עולם"), ["שלום", "עולם"])
+
+    def test_search(self):
+        self.assertEqual(
+            self.index.search("en", "einstein"),
+            ["Albert Einstein", "Einstein on the Beach"],
+        )
+        # The last word is a prefix
+        self.assertEqual(self.index.search("en", "albert ein"), ["Albert Einstein"])
+        self.assertEqual(self.index.search("en", "albert ein "), [])
+        self.assertEqual(self.index.search("en", "EINST", limit=1), ["Albert Einstein"])
+        # Titles rank higher than quotes, shorter titles higher than longer ones
+        self.assertEqual(self.index.search("en", "matrix"), ["Matrix", "The Matrix"])
+        self.assertEqual(self.index.search("en", "kung"), ["The Matrix"])
+        self.assertEqual(self.index.search("en", "nothing"), [])
+        self.assertEqual(self.index.search("fr", "einstein"), [])
+
+    def test_update(self):
+        self.index.add_page("en", "The Matrix", ["Welcome to the real world."])
+        self.assertEqual(self.index.search("en", "kung"), [])
+        self.assertEqual(self.index.search("en", "real world"), ["The Matrix"])
+        # Pages added without quotes are left unchanged
+        self.index.add_page("en", "The Matrix")
+        self.assertEqual(self.index.search("en", "real world"), ["The Matrix"])
+        self.assertEqual(len(self.index), 4)
+
+    def test_titles_only(self):
+        titles_index = index.SearchIndex()
+        titles_index.add_page("en", "The Matrix", ["I know kung fu."])
+        self.assertEqual(titles_index.search("en", "matr"), ["The Matrix"])
+        self.assertEqual(titles_index.search("en", "kung"), [])
+
+    def test_save_load(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "index.json.gz")
+            self.index.save(path)
+            loaded = index.SearchIndex.load(path)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertTrue(loaded.include_quotes)
+        self.assertEqual(len(loaded), 4)
+        for query in ("einstein", "albert ein", "matrix", "kung"):
+            self.assertEqual(loaded.search("en", query), self.index.search("en", query))
+
+
+class IndexedSearchTest(unittest.TestCase):
+    """
+    Test the use of the search index by wikiquote.search()
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(pages={"Author": AUTHOR_PAGE, "Author (band)": ""})
+        self.previous_transport = transport.set_transport(FakeTransport(self.wiki))
+        self.index = index.SearchIndex()
+        self.previous_index = index.set_index(self.index)
+
+    def tearDown(self):
+        transport.set_transport(self.previous_transport)
+        index.set_index(self.previous_index)
+
+    def search_requests(self):
+        return [r for r in self.wiki.requests if r.get("list") == "search"]
+
+    def test_fallback(self):
+        self.assertEqual(wikiquote.search("author"), ["Author", "Author (band)"])
+        self.assertEqual(len(self.search_requests()), 1)
+        # Titles found are added to the index
+        self.assertEqual(wikiquote.search("auth"), ["Author", "Author (band)"])
+        self.assertEqual(wikiquote.search("band"), ["Author (band)"])
+        self.assertEqual(len(self.search_requests()), 1)
+
+    def test_harvested_pages(self):
+        self.assertEqual(wikiquote.quotes("Author"), AUTHOR_QUOTES)
+        self.assertEqual(wikiquote.search("Auth"), ["Author"])
+        self.assertEqual(self.search_requests(), [])
+
+    def test_aio(self):
+        previous = aio.set_transport(FakeAsyncTransport(self.wiki))
+        try:
+            self.assertEqual(asyncio.run(aio.search("band")), ["Author (band)"])
+            self.assertEqual(asyncio.run(aio.search("band")), ["Author (band)"])
+        finally:
+            aio.set_transport(previous)
+        self.assertEqual(len(self.search_requests()), 1)
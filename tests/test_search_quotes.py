@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import wikiquote
+from wikiquote import dump, index, store
+
+DUMP = os.path.join(
+    os.path.dirname(__file__), "fixtures", "dumps", "enwikiquote-pages-articles.xml"
+)
+
+PAGES = [
+    (
+        "en",
+        "Fear",
+        ["Fear is the mind-killer.", "Nothing to fear but fear itself."],
+        1,
+        False,
+    ),
+    ("en", "Déjà vu", ["Déjà vu is a glitch in the Matrix."], 2, False),
+    ("en", "Mind", ["The mind is everything.", "A mind that is stretched."], 3, False),
+    ("fr", "Peur", ["La peur est le chemin vers le côté obscur."], 4, False),
+]
+
+
+class SearchQuotesTest(unittest.TestCase):
+    """
+    Test wikiquote.search_quotes
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.index = index.SearchIndex(include_quotes=True)
+        for lang, title, quotes, _, _ in PAGES:
+            self.index.add_page(lang, title, quotes)
+        self.sqlite_store = store.SQLiteQuoteStore(os.path.join(self.tmp, "quotes.db"))
+        self.sqlite_store.add_pages(PAGES)
+        path = os.path.join(self.tmp, "quotes.wqs")
+        with store.CompactStoreBuilder(path) as builder:
+            builder.add_pages(PAGES)
+        self.compact_store = store.CompactQuoteStore(path)
+
+    def tearDown(self):
+        self.sqlite_store.close()
+        self.compact_store.close()
+        shutil.rmtree(self.tmp)
+
+    def searchers(self):
+        return {
+            "index": self.index,
+            "sqlite": self.sqlite_store,
+            "compact": self.compact_store,
+            # The scan used when FTS5 is not available
+            "scan": super(store.SQLiteQuoteStore, self.sqlite_store),
+        }
+
+    def test_search_quotes(self):
+        for name, searcher in self.searchers().items():
+            with self.subTest(name):
+                self.assertEqual(
+                    searcher.search_quotes("en", "fear"),
+                    [
+                        ("Fear", "Nothing to fear but fear itself."),
+                        ("Fear", "Fear is the mind-killer."),
+                    ],
+                )
+                # Phrases, the last word of which is a prefix
+                self.assertEqual(
+                    searcher.search_quotes("en", "the mind k"),
+                    [("Fear", "Fear is the mind-killer.")],
+                )
+                self.assertEqual(searcher.search_quotes("en", "mind the"), [])
+                self.assertEqual(searcher.search_quotes("en", "the mind k "), [])
+                self.assertEqual(
+                    searcher.search_quotes("en", "DEJA VU"),
+                    [("Déjà vu", "Déjà vu is a glitch in the Matrix.")],
+                )
+                self.assertEqual(len(searcher.search_quotes("en", "mind", 2)), 2)
+                self.assertEqual(
+                    searcher.search_quotes("fr", "côte"),
+                    [("Peur", "La peur est le chemin vers le côté obscur.")],
+                )
+                self.assertEqual(searcher.search_quotes("de", "fear"), [])
+                self.assertEqual(searcher.search_quotes("en", "!"), [])
+
+    def test_replaced_pages(self):
+        self.index.add_page("en", "Fear", ["Courage is not the absence of fear."])
+        self.sqlite_store.add_pages(
+            [("en", "Fear", ["Courage is not the absence of fear."], 5, False)]
+        )
+        for searcher in (self.index, self.sqlite_store):
+            self.assertEqual(searcher.search_quotes("en", "killer"), [])
+            self.assertEqual(
+                searcher.search_quotes("en", "absence"),
+                [("Fear", "Courage is not the absence of fear.")],
+            )
+
+    def test_existing_database(self):
+        # Stores created before quotes were indexed are indexed when opened
+        self.sqlite_store._conn.execute("DROP TABLE quote_terms")
+        reopened = store.SQLiteQuoteStore(self.sqlite_store.path)
+        try:
+            self.assertEqual(
+                reopened.search_quotes("en", "glitch"),
+                [("Déjà vu", "Déjà vu is a glitch in the Matrix.")],
+            )
+        finally:
+            reopened.close()
+
+    def test_api(self):
+        self.assertEqual(wikiquote.search_quotes("glitch"), [])
+
+        previous_store = store.set_store(self.sqlite_store)
+        try:
+            dump.ingest_dump(DUMP, self.sqlite_store)
+            self.assertEqual(
+                wikiquote.search_quotes("kung fu"), [("The Matrix", "I know kung fu.")]
+            )
+            previous_index = index.set_index(self.index)
+            try:
+                # The index is used first, and the store on a miss
+                self.assertEqual(
+                    wikiquote.search_quotes("glitch"),
+                    [("Déjà vu", "Déjà vu is a glitch in the Matrix.")],
+                )
+                self.assertEqual(
+                    wikiquote.search_quotes("kung fu"),
+                    [("The Matrix", "I know kung fu.")],
+                )
+            finally:
+                index.set_index(previous_index)
+        finally:
+            store.set_store(previous_store)
+
+        with self.assertRaises(wikiquote.UnsupportedLanguageException):
+            wikiquote.search_quotes("fear", lang="xx")
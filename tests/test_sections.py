@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+import unittest
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    FakeAsyncTransport,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import aio, langs, transport, utils
+from wikiquote.quotes import _quote_sections
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def fixture_html(name):
+    with open(os.path.join(PAGES, name + ".json"), encoding="utf-8") as f:
+        return json.load(f)["parse"]["text"]["*"]
+
+
+def section(index, level, line):
+    return {"index": str(index), "level": str(level), "line": line}
+
+
+class SectionsTest(unittest.TestCase):
+    """
+    Test section-scoped fetching in wikiquote.quotes()
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(
+            pages={
+                "Author": AUTHOR_PAGE,
+                "Barack Obama": fixture_html("en_author"),
+                "The Matrix": fixture_html("en_film"),
+                "Flat": fixture_html("en_flat"),
+                "Matrix": AUTHOR_PAGE,
+            },
+            disambiguations=["Matrix"],
+        )
+        self.previous = transport.set_transport(FakeTransport(self.wiki))
+
+    def tearDown(self):
+        transport.set_transport(self.previous)
+
+    def test_same_quotes(self):
+        for title in ("Author", "Barack Obama", "The Matrix", "Flat"):
+            for max_quotes in (1, 5, 1000):
+                with self.subTest(title=title, max_quotes=max_quotes):
+                    self.assertEqual(
+                        wikiquote.quotes(title, max_quotes, sections=True),
+                        wikiquote.quotes(title, max_quotes),
+                    )
+
+    def test_skipped_sections_not_downloaded(self):
+        self.assertEqual(wikiquote.quotes("Author", sections=True), AUTHOR_QUOTES)
+
+        parses = [r for r in self.wiki.requests if r["action"] == "parse"]
+        self.assertEqual(parses[0]["prop"], "sections|categories|revid")
+        # Only "Quotes" is downloaded, "About" is skipped
+        self.assertEqual([r.get("section") for r in parses[1:]], ["1"])
+        self.assertEqual(parses[1]["oldid"], str(self.wiki.revision("Author")))
+
+    def test_lean_requests(self):
+        wikiquote.quotes("Author", sections=True)
+        wikiquote.quotes("Author", 1000)
+        parses = [r for r in self.wiki.requests if r["action"] == "parse"]
+        self.assertEqual(
+            [r["prop"] for r in parses],
+            ["sections|categories|revid", "text", "text|categories"],
+        )
+        for request in parses:
+            self.assertEqual(request["formatversion"], "2")
+            self.assertEqual(request["redirects"], "1")
+
+    def test_no_headings(self):
+        # Pages without sections are downloaded whole
+        self.assertEqual(
+            wikiquote.quotes("Flat", sections=True), wikiquote.quotes("Flat")
+        )
+        parses = [r for r in self.wiki.requests if r["action"] == "parse"]
+        self.assertEqual(parses[1]["prop"], "text|categories")
+
+    def test_errors(self):
+        with self.assertRaises(wikiquote.DisambiguationPageException):
+            wikiquote.quotes("Matrix", sections=True)
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            wikiquote.quotes("Nobody", sections=True)
+
+    def test_quotes_many(self):
+        results = wikiquote.quotes_many(["Author", "Barack Obama"], sections=True)
+        self.assertEqual(results["Author"], AUTHOR_QUOTES)
+        self.assertEqual(results["Barack Obama"], wikiquote.quotes("Barack Obama"))
+
+    def test_aio(self):
+        previous = aio.set_transport(FakeAsyncTransport(self.wiki))
+        try:
+            result = asyncio.run(aio.quotes("Barack Obama", sections=True))
+        finally:
+            aio.set_transport(previous)
+        self.assertEqual(result, wikiquote.quotes("Barack Obama"))
+
+
+class QuoteSectionsTest(unittest.TestCase):
+    """
+    Test the choice of sections to download
+    """
+
+    spec = utils.ExtractorSpec(["about", "see also"])
+
+    def test_subsections(self):
+        sections = [
+            section(1, 2, "Quotes"),
+            section(2, 3, "1990s"),
+            section(3, 3, "About his work"),
+            section(4, 2, "About"),
+            section(5, 3, "Quotes about him"),
+            section(6, 4, "Interviews"),
+            section(7, 3, "About the author"),
+            section(8, 4, "Interviews"),
+            section(9, 2, "<i>See also</i>"),
+        ]
+        self.assertEqual(_quote_sections(sections, self.spec), ["1", "5"])
+
+    def test_drop_tags(self):
+        # Headings are matched like the extractor matches them, without the dropped
+        # tags (text in italics, in German)
+        sections = [
+            section(1, 2, "Zitate"),
+            section(2, 2, "<i>Überprüft</i>"),
+            section(3, 2, "Überprüft"),
+        ]
+        self.assertEqual(_quote_sections(sections, langs.spec_lang("de")), ["1", "2"])
+        self.assertIsNone(_quote_sections(sections, langs.spec_lang("fr")))
+
+    def test_whole_page(self):
+        self.assertIsNone(_quote_sections([], self.spec))
+        self.assertIsNone(_quote_sections([section(1, 2, "Quotes")], None))
+        self.assertIsNone(_quote_sections([section(1, 4, "Quotes")], self.spec))
+
+        transcluded = [section(1, 2, "Quotes"), section("T-1", 2, "Sayings")]
+        self.assertIsNone(_quote_sections(transcluded, self.spec))
+        transcluded = [section(1, 2, "Quotes"), section("T-1", 2, "See also")]
+        self.assertEqual(_quote_sections(transcluded, self.spec), ["1"])
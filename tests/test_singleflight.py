@@ -0,0 +1,223 @@
+import asyncio
+import importlib
+import threading
+import time
+import unittest
+
+import wikiquote
+from tests.fakes import (
+    AUTHOR_PAGE,
+    AUTHOR_QUOTES,
+    EN_MAIN_PAGE,
+    FakeAsyncTransport,
+    FakeTransport,
+    FakeWiki,
+)
+from wikiquote import aio, instrumentation, scheduler, singleflight, transport
+
+# wikiquote.qotd is shadowed by the qotd() function
+qotd_module = importlib.import_module("wikiquote.qotd")
+
+CALLERS = 8
+
+
+class CountingTracer(instrumentation.Tracer):
+    def __init__(self):
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def count(self, name, value):
+        if name == "coalesced_calls":
+            with self.lock:
+                self.coalesced += value
+
+    def wait_for(self, coalesced):
+        deadline = time.monotonic() + 5
+        while self.coalesced < coalesced and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+
+class GatedTransport(FakeTransport):
+    def __init__(self, wiki):
+        super().__init__(wiki)
+        self.gate = threading.Event()
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.waiting += 1
+        self.gate.wait(5)
+        return super().get(url)
+
+
+class SingleFlightTest(unittest.TestCase):
+    """
+    Test wikiquote.singleflight
+    """
+
+    def setUp(self):
+        qotd_module.clear_cache()
+        self.wiki = FakeWiki(pages={"Author": AUTHOR_PAGE, "Main Page": EN_MAIN_PAGE})
+        self.transport = GatedTransport(self.wiki)
+        self.previous_transport = transport.set_transport(self.transport)
+        self.tracer = CountingTracer()
+        self.previous_tracer = instrumentation.set_tracer(self.tracer)
+
+    def tearDown(self):
+        qotd_module.clear_cache()
+        transport.set_transport(self.previous_transport)
+        instrumentation.set_tracer(self.previous_tracer)
+
+    def call_concurrently(self, fn, *args, **kwargs):
+        """
+        Call a function from several threads at once, releasing the requests once
+        all but one of the calls are waiting for the first one.
+        """
+        results = [None] * CALLERS
+
+        def call(i):
+            try:
+                results[i] = fn(*args, **kwargs)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(CALLERS)]
+        for thread in threads:
+            thread.start()
+        self.tracer.wait_for(CALLERS - 1)
+        self.transport.gate.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_quotes(self):
+        results = self.call_concurrently(wikiquote.quotes, "Author")
+        self.assertEqual(results, [AUTHOR_QUOTES] * CALLERS)
+        self.assertEqual(len(self.wiki.requests), 1)
+        # Callers do not share the same list
+        self.assertEqual(len({id(result) for result in results}), CALLERS)
+
+    def test_exceptions(self):
+        results = self.call_concurrently(wikiquote.quotes, "Missing")
+        for result in results:
+            self.assertIsInstance(result, wikiquote.NoSuchPageException)
+        self.assertEqual(len(self.wiki.requests), 1)
+
+        # Failures are not remembered
+        with self.assertRaises(wikiquote.NoSuchPageException):
+            wikiquote.quotes("Missing")
+        self.assertEqual(len(self.wiki.requests), 2)
+
+    def test_search_and_qotd(self):
+        results = self.call_concurrently(wikiquote.search, "auth")
+        self.assertEqual(results, [["Author"]] * CALLERS)
+        results = self.call_concurrently(wikiquote.qotd)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(self.wiki.requests), 2)
+
+    def test_options(self):
+        # Calls with different options are not coalesced
+        self.transport.gate.set()
+        threads = [
+            threading.Thread(target=wikiquote.quotes, args=("Author", max_quotes))
+            for max_quotes in (1, 2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.wiki.requests), 2)
+
+    def test_lanes(self):
+        # A bulk call does not hold up an interactive call for the same page
+        def bulk():
+            with scheduler.request_priority(scheduler.BULK):
+                wikiquote.quotes("Author")
+
+        threads = [
+            threading.Thread(target=bulk),
+            threading.Thread(target=wikiquote.quotes, args=("Author",)),
+        ]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.transport.waiting < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.transport.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.tracer.coalesced, 0)
+        self.assertEqual(len(self.wiki.requests), 2)
+
+    def test_interrupted(self):
+        group = singleflight.Group()
+        started = threading.Event()
+        calls = []
+
+        def interrupted():
+            calls.append("first")
+            started.set()
+            self.tracer.wait_for(1)
+            raise KeyboardInterrupt
+
+        def leader():
+            with self.assertRaises(KeyboardInterrupt):
+                group.do("key", interrupted)
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        started.wait(5)
+        # The waiting caller makes the call itself
+        self.assertEqual(group.do("key", lambda: calls.append("second")), None)
+        thread.join()
+        self.assertEqual(calls, ["first", "second"])
+
+
+class AsyncSingleFlightTest(unittest.TestCase):
+    """
+    Test wikiquote.singleflight.AsyncGroup
+    """
+
+    def setUp(self):
+        self.wiki = FakeWiki(pages={"Author": AUTHOR_PAGE})
+        self.previous = aio.set_transport(FakeAsyncTransport(self.wiki))
+
+    def tearDown(self):
+        aio.set_transport(self.previous)
+
+    def test_quotes(self):
+        async def gather():
+            return await asyncio.gather(
+                *(aio.quotes("Author") for _ in range(CALLERS)),
+                aio.quotes("Missing"),
+                aio.quotes("Missing"),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(gather())
+        self.assertEqual(results[:CALLERS], [AUTHOR_QUOTES] * CALLERS)
+        for result in results[CALLERS:]:
+            self.assertIsInstance(result, wikiquote.NoSuchPageException)
+        self.assertEqual(len(self.wiki.requests), 2)
+
+        # Each event loop has its own calls
+        self.assertEqual(asyncio.run(aio.quotes("Author")), AUTHOR_QUOTES)
+        self.assertEqual(len(self.wiki.requests), 3)
+
+    def test_cancelled(self):
+        group = singleflight.AsyncGroup()
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            first = asyncio.ensure_future(group.do("key", slow))
+            second = asyncio.ensure_future(group.do("key", slow))
+            await asyncio.sleep(0)
+            # Cancelling a caller does not cancel the call shared with the others
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), "result")
@@ -0,0 +1,69 @@
+import json
+import socket
+import unittest
+import urllib.error
+
+from tests.fakes import FakeServer
+from wikiquote import transport, utils
+
+
+class TransportTest(unittest.TestCase):
+    """
+    Test wikiquote.transport
+    """
+
+    def setUp(self):
+        self.transport = transport.HTTPTransport(timeout=2)
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_keep_alive(self):
+        with FakeServer({"a": 1}) as server:
+            for _ in range(3):
+                body = self.transport.get(server.url + "/w/api.php")
+                self.assertEqual(json.loads(body), {"a": 1})
+
+        # All requests were sent over the same connection
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(len(set(server.client_ports)), 1)
+
+    def test_gzip(self):
+        with FakeServer({"quote": "ÿ" * 100}, encoding="gzip") as server:
+            body = self.transport.get(server.url + "/w/api.php")
+        self.assertEqual(json.loads(body), {"quote": "ÿ" * 100})
+
+    def test_deflate(self):
+        with FakeServer({"quote": "abc"}, encoding="deflate") as server:
+            body = self.transport.get(server.url + "/w/api.php")
+        self.assertEqual(json.loads(body), {"quote": "abc"})
+
+    def test_redirect(self):
+        with FakeServer({"b": 2}) as server:
+            body = self.transport.get(server.url + "/redirect")
+        self.assertEqual(json.loads(body), {"b": 2})
+        self.assertEqual(server.requests[-1], "/w/api.php?redirected=1")
+
+    def test_http_error(self):
+        with FakeServer() as server:
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                self.transport.get(server.url + "/missing")
+        self.assertEqual(ctx.exception.code, 404)
+
+    def test_timeout(self):
+        slow = transport.HTTPTransport(timeout=0.2)
+        with FakeServer() as server:
+            with self.assertRaises(socket.timeout):
+                slow.get(server.url + "/slow")
+        slow.close()
+
+    def test_set_transport(self):
+        with FakeServer({"c": 3}) as server:
+            previous = transport.set_transport(self.transport)
+            try:
+                data = utils.json_from_url(server.url + "/w/api.php?page=", "A B")
+            finally:
+                transport.set_transport(previous)
+
+        self.assertEqual(data, {"c": 3})
+        self.assertEqual(server.requests[-1], "/w/api.php?page=A%20B")
@@ -0,0 +1,259 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# benchmark.py
+# Offline benchmarks of quote extraction and retrieval, run against the recorded
+# action=parse responses in tests/fixtures (author, film and main pages of every
+# language), without network access. For each benchmark, the following are
+# reported:
+#
+#   - time: the median, over several rounds, of the best time of a call in each round
+#     (calls are repeated in a loop, so that each timed sample lasts long enough to
+#     be measured reliably)
+#   - peak: the peak of memory allocated during one run (measured with tracemalloc)
+#   - growth: the number of memory blocks that remain allocated after each run, once
+#     caches have been filled (which should stay at 0: anything else is a leak)
+#
+# The recorded pages are small (a few KiB), so each author page is also repeated to
+# build a large page per language ("<lang>_large"). This covers the size, but not
+# the structure of real large pages (e.g. long tables of contents or deeply nested
+# sections), which the corpus does not include.
+#
+# Results are compared with the baselines stored in util/benchmark_baseline.json,
+# and regressions are flagged (the exit status is then 1). So that the comparison
+# holds when the machine is busier or faster, times are compared relative to the
+# time of a fixed reference workload, measured in the same rounds:
+#
+#   python util/benchmark.py            # compare with the baselines
+#   python util/benchmark.py --save     # store new baselines
+#   python util/benchmark.py qotd       # only run the benchmarks matching "qotd"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import lxml.html  # noqa: E402
+
+import wikiquote  # noqa: E402
+from tests.fakes import FakeTransport, FakeWiki  # noqa: E402
+from wikiquote import langs, transport, utils  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures")
+BASELINE = os.path.join(ROOT, "util", "benchmark_baseline.json")
+
+RUNS = 50
+# The timed runs are split in this many rounds, the median of which is kept
+ROUNDS = 5
+# Minimum duration of a timed sample, in seconds
+MIN_SAMPLE_TIME = 0.002
+# A result is a regression if it exceeds its baseline by more than these amounts
+TIME_TOLERANCE = 0.5
+PEAK_TOLERANCE = 0.10
+PEAK_SLACK_KIB = 4
+GROWTH_SLACK = 2
+# Number of traced runs used to measure memory growth
+GROWTH_RUNS = 20
+# Number of copies of the author page of each language in its synthetic large page
+LARGE_PAGE_COPIES = 20
+
+
+def load_fixture(directory, name):
+    with open(os.path.join(FIXTURES, directory, name + ".json"), encoding="utf-8") as f:
+        return json.load(f)["parse"]
+
+
+def fixture_names(directory):
+    return sorted(name[:-5] for name in os.listdir(os.path.join(FIXTURES, directory)))
+
+
+def benchmarks():
+    """
+    Return a dictionary mapping the name of each benchmark to a function running it
+    once.
+    """
+    result = {}
+    pages = {name: load_fixture("pages", name) for name in fixture_names("pages")}
+
+    sources = {name: page["text"]["*"] for name, page in pages.items()}
+    for name, page in pages.items():
+        if name.endswith("_author"):
+            large = page["text"]["*"] * LARGE_PAGE_COPIES
+            sources[name.split("_")[0] + "_large"] = "<div>{}</div>".format(large)
+
+    for name, html in sorted(sources.items()):
+        lang = name.split("_")[0]
+        tree = lxml.html.fromstring(html)
+        result["extract_quotes_li/" + name] = lambda tree=tree: utils.extract_quotes_li(
+            tree, -1
+        )
+        result["extract_quotes/" + name] = lambda lang=lang, tree=tree: (
+            langs.extract_quotes_lang(lang, tree, -1)
+        )
+        result["extract_quotes/{}/html".format(name)] = lambda lang=lang, html=html: (
+            langs.extract_quotes_lang(lang, html, -1)
+        )
+
+    for lang in fixture_names("main_pages"):
+        html = load_fixture("main_pages", lang)["text"]["*"]
+        tree = lxml.html.fromstring(html)
+        result["qotd/" + lang] = lambda lang=lang, tree=tree: langs.qotd_lang(
+            lang, tree
+        )
+
+    for name, page in sorted(pages.items()):
+        lang = name.split("_")[0]
+        wiki = FakeWiki(pages={page["title"]: page["text"]["*"]})
+
+        def run_quotes(wiki=wiki, title=page["title"], lang=lang):
+            previous = transport.set_transport(FakeTransport(wiki))
+            try:
+                wikiquote.quotes(title, max_quotes=-1, lang=lang)
+            finally:
+                transport.set_transport(previous)
+                # The fake records the requests it receives
+                wiki.requests.clear()
+
+        result["quotes/" + name] = run_quotes
+
+    return result
+
+
+def reference():
+    # A fixed amount of pure Python work
+    sorted(str(i * 7919 % 1000) for i in range(500))
+
+
+def timed(fn, number):
+    # Return the time of one call, averaged over a sample of calls
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number
+
+
+def calls_per_sample(fn):
+    number = 1
+    while timed(fn, number) * number < MIN_SAMPLE_TIME:
+        number *= 2
+    return number
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return (values[middle] + values[~middle]) / 2
+
+
+def measure(fn, runs):
+    # The first run fills caches (e.g. imports language modules)
+    fn()
+    number, reference_number = calls_per_sample(fn), calls_per_sample(reference)
+    times = []
+    ratios = []
+    for _ in range(ROUNDS):
+        best = best_reference = float("inf")
+        for _ in range(max(runs // ROUNDS, 1)):
+            best = min(best, timed(fn, number))
+            best_reference = min(best_reference, timed(reference, reference_number))
+        times.append(best)
+        ratios.append(best / best_reference)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        # Some memory stays allocated after the first runs (e.g. names interned by
+        # lxml), so growth is measured over the next runs
+        first = traced_blocks()
+        for _ in range(GROWTH_RUNS):
+            fn()
+        growth = (traced_blocks() - first) / GROWTH_RUNS
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_ms": median(times) * 1000,
+        "relative": median(ratios),
+        "peak_kib": peak / 1024,
+        "growth": growth,
+    }
+
+
+def traced_blocks():
+    # Objects in reference cycles (e.g. closed generators) are not leaks
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    return sum(stat.count for stat in snapshot.statistics("filename"))
+
+
+def regressions(result, baseline, tolerance):
+    found = []
+    if result["relative"] > baseline["relative"] * (1 + tolerance):
+        found.append("time")
+    peak_limit = baseline["peak_kib"] * (1 + PEAK_TOLERANCE) + PEAK_SLACK_KIB
+    if result["peak_kib"] > peak_limit:
+        found.append("peak")
+    if result["growth"] > max(baseline["growth"], 0) + GROWTH_SLACK:
+        found.append("growth")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks.")
+    parser.add_argument("pattern", nargs="?", default="", help="filter benchmarks")
+    parser.add_argument("--save", action="store_true", help="store new baselines")
+    parser.add_argument("--runs", type=int, default=RUNS, help="timed runs")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TIME_TOLERANCE,
+        help="relative slowdown flagged as a regression",
+    )
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    print(
+        "{:<36} {:>10} {:>10} {:>8} {:>10}".format(
+            "benchmark", "time (ms)", "peak (KiB)", "growth", "vs. base"
+        )
+    )
+    failed = []
+    for name, fn in benchmarks().items():
+        if args.pattern not in name:
+            continue
+        result = measure(fn, args.runs)
+        baseline = baselines.get(name)
+        change = ""
+        if baseline is not None:
+            change = "{:+.0%}".format(result["relative"] / baseline["relative"] - 1)
+            found = regressions(result, baseline, args.tolerance)
+            if found and not args.save:
+                failed.append(name)
+                change += " REGRESSION ({})".format(", ".join(found))
+        print(
+            "{:<36} {:>10.3f} {:>10.1f} {:>8.1f} {:>10}".format(
+                name, result["time_ms"], result["peak_kib"], result["growth"], change
+            )
+        )
+        baselines[name] = {key: round(value, 3) for key, value in result.items()}
+
+    if args.save:
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("Baselines saved to {}".format(BASELINE))
+    elif failed:
+        print("{} regression(s): {}".format(len(failed), ", ".join(failed)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+# extract_time.py
+# Measures the CPU time taken to extract the quotes of each page in the test
+# fixtures, from an already parsed tree and from the HTML string (which is parsed
+# incrementally). If the path of another checkout is given (e.g. a worktree of an
+# older commit), the same pages are also measured there for comparison:
+#
+#   git worktree add /tmp/wikiquote-old <commit>
+#   python util/extract_time.py /tmp/wikiquote-old
+#
+# Checkouts are measured in interleaved rounds, and each measurement is the best
+# of all runs, to reduce the effect of noise.
+
+ROUNDS = 5
+RUNS = 20
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = os.path.join(ROOT, "tests", "fixtures", "pages")
+
+BENCHMARK = """
+import json
+import os
+import sys
+import time
+
+import lxml.html
+
+from wikiquote import langs
+
+results = {{}}
+for name in sorted(os.listdir({pages!r})):
+    with open(os.path.join({pages!r}, name), encoding="utf-8") as f:
+        html = json.load(f)["parse"]["text"]["*"]
+    lang = name.split("_")[0]
+    best_tree = best_html = float("inf")
+    for _ in range({runs}):
+        tree = lxml.html.fromstring(html)
+        start = time.process_time()
+        langs.extract_quotes_lang(lang, tree, -1)
+        best_tree = min(best_tree, time.process_time() - start)
+
+        start = time.process_time()
+        langs.extract_quotes_lang(lang, html, -1)
+        best_html = min(best_html, time.process_time() - start)
+    results[name[:-5]] = best_tree * 1000, best_html * 1000
+print(json.dumps(results))
+"""
+
+
+def run(path):
+    output = subprocess.check_output(
+        [sys.executable, "-c", BENCHMARK.format(pages=PAGES, runs=RUNS)],
+        cwd=path,
+        env=dict(os.environ, PYTHONPATH=path),
+        text=True,
+    )
+    return json.loads(output)
+
+
+paths = [ROOT] + [os.path.abspath(path) for path in sys.argv[1:2]]
+results = [{} for _ in paths]
+for _ in range(ROUNDS):
+    for path, path_results in zip(paths, results):
+        for name, times in run(path).items():
+            best = path_results.get(name, times)
+            path_results[name] = min(best[0], times[0]), min(best[1], times[1])
+
+for path in paths:
+    print("[{}] {}".format(paths.index(path), path))
+print("{:<12} {:>18} {:>18}".format("page", "tree (ms)", "html (ms)"))
+for name in sorted(results[0]):
+    columns = []
+    for i in range(2):
+        columns.append(" / ".join("{:.2f}".format(r[name][i]) for r in results))
+    print("{:<12} {:>18} {:>18}".format(name, *columns))
+for i, path_results in enumerate(results):
+    total_tree = sum(tree for tree, _ in path_results.values())
+    total_html = sum(html for _, html in path_results.values())
+    print(
+        "[{}] total: {:.2f} ms (tree), {:.2f} ms (html)".format(
+            i, total_tree, total_html
+        )
+    )
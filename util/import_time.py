@@ -0,0 +1,67 @@
+import compileall
+import os
+import subprocess
+import sys
+
+# import_time.py
+# Measures the time taken by "import wikiquote" in fresh interpreters, and the cost
+# of the language modules (and lxml) when they are first used. If the path of
+# another checkout is given (e.g. a worktree of an older commit), "import
+# wikiquote" is also measured there for comparison:
+#
+#   git worktree add /tmp/wikiquote-old <commit>
+#   python util/import_time.py /tmp/wikiquote-old
+#
+# Runs are interleaved and the minimum is reported, to reduce the effect of noise.
+# The checkouts are byte-compiled first, as compiling modules whose bytecode is
+# missing or stale (e.g. with PYTHONDONTWRITEBYTECODE set) would be measured too.
+
+RUNS = 30
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIMER = """
+import time
+start = time.perf_counter()
+{}
+print(time.perf_counter() - start)
+"""
+
+IMPORT = "import wikiquote"
+IMPORT_EN = "import wikiquote\nwikiquote.langs.lang_module('en')"
+IMPORT_ALL = (
+    "import wikiquote\n"
+    "for lang in wikiquote.langs.SUPPORTED_LANGUAGES:\n"
+    "    wikiquote.langs.lang_module(lang)"
+)
+
+
+def run(path, snippet):
+    output = subprocess.check_output(
+        [sys.executable, "-c", TIMER.format(snippet)],
+        cwd=path,
+        env=dict(os.environ, PYTHONPATH=path),
+        text=True,
+    )
+    return float(output) * 1000
+
+
+benchmarks = {
+    "import wikiquote": (ROOT, IMPORT),
+    "import wikiquote + 'en' module": (ROOT, IMPORT_EN),
+    "import wikiquote + all language modules": (ROOT, IMPORT_ALL),
+}
+if len(sys.argv) > 1:
+    other = os.path.abspath(sys.argv[1])
+    benchmarks["import wikiquote ({})".format(other)] = (other, IMPORT)
+
+for path in {path for path, _ in benchmarks.values()}:
+    compileall.compile_dir(os.path.join(path, "wikiquote"), quiet=1)
+
+times = {name: [] for name in benchmarks}
+for _ in range(RUNS):
+    for name, (path, snippet) in benchmarks.items():
+        times[name].append(run(path, snippet))
+
+for name in benchmarks:
+    print("{:<45} {:7.2f} ms (best of {} runs)".format(name, min(times[name]), RUNS))
@@ -1,6 +1,10 @@
-from typing import List, Text
+import importlib
+from typing import Any, List, Text
 
 from . import langs
+
+# quotes() and quote_of_the_day() are imported right away: they share their names
+# with their modules, which would replace them once imported
 from .qotd import quote_of_the_day
 from .quotes import quotes, random_titles, search
 from .utils import (
@@ -17,13 +21,49 @@ def supported_languages() -> List[Text]:
 
 qotd = quote_of_the_day
 
+# The other functions are imported on first use, so that importing wikiquote does
+# not import the modules they need (e.g. sqlite3 or the thread pools)
+_LAZY_FUNCTIONS = {
+    "quotes_many": "quotes",
+    "iter_quotes": "quotes",
+    "revalidate_quotes": "quotes",
+    "random_quote": "quotes",
+    "search_quotes": "quotes",
+    "harvest_quotes": "pipeline",
+    "random_quotes": "reservoir",
+    "all_qotd": "qotd",
+    "start_qotd_prefetch": "qotd",
+}
+
+
+def __getattr__(name: Text) -> Any:
+    module = _LAZY_FUNCTIONS.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[Text]:
+    return sorted(set(globals()) | set(_LAZY_FUNCTIONS))
+
 
 __all__ = [
     "quotes",
+    "quotes_many",
+    "iter_quotes",
+    "harvest_quotes",
+    "revalidate_quotes",
     "random_titles",
+    "random_quote",
+    "random_quotes",
     "search",
+    "search_quotes",
     "qotd",
     "quote_of_the_day",
+    "all_qotd",
+    "start_qotd_prefetch",
     "supported_languages",
     "DisambiguationPageException",
     "NoSuchPageException",
@@ -0,0 +1,570 @@
+"""
+Asynchronous (asyncio) version of the wikiquote API. All functions mirror the ones
+exported by the wikiquote package, but must be awaited:
+
+    >>> from wikiquote import aio
+    >>> await aio.quotes("The Matrix (film)", max_quotes=2)
+
+Requests share a single pool of keep-alive connections per host, and the number of
+connections opened to each host is bounded, so that many concurrent calls only use a
+few sockets.
+"""
+
+import asyncio
+import datetime
+import functools
+import http.client
+import io
+import json
+import random
+import ssl
+import urllib.error
+import urllib.parse
+from typing import Any, Callable, Dict, Iterable, List, Optional, Text, Tuple, TypeVar
+
+from . import instrumentation, langs, singleflight, store, utils
+from .constants import (
+    DEFAULT_LANG,
+    DEFAULT_MAX_QUOTES,
+    DEFAULT_MAX_REDIRECTS,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+    MAINPAGE_URL,
+    PAGE_URL,
+    RANDOM_URL,
+    REVISIONS_URL,
+    SECTION_URL,
+    SECTIONS_URL,
+    SRCH_URL,
+    USER_AGENT,
+)
+from .qotd import QOTDResult, _cache_qotd, _cached_qotd, _qotd_from_data, _utc_today
+from .quotes import (
+    _cache_get,
+    _cache_quotes,
+    _cache_set,
+    _cached_quotes,
+    _check_page,
+    _index_pages,
+    _index_search,
+    _merge_query,
+    _page_quotes,
+    _page_revisions,
+    _quote_sections,
+    _random_results,
+    _renew_quotes,
+    _search_results,
+    _stale_quotes,
+    _without_duplicates,
+)
+from .transport import decode_body
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+_Response = Tuple[int, Text, http.client.HTTPMessage, bytes, bool]
+
+# Concurrent identical lookups share one request (and extraction)
+_flights = singleflight.AsyncGroup()
+
+T = TypeVar("T")
+
+_STALE_CONNECTION_ERRORS = (
+    asyncio.IncompleteReadError,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class AsyncTransport:
+    """
+    Base class for the objects used to perform asynchronous HTTP GET requests against
+    the Wikiquote API. Subclasses only need to implement get().
+    """
+
+    async def get(self, url: Text) -> bytes:
+        """
+        Perform an HTTP GET request and return the (decoded) response body.
+
+        :param url: The URL to retrieve
+        :return: The response body
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release any resources (e.g. open connections) held by the transport."""
+
+
+class _AsyncConnectionPool:
+    """
+    A pool of keep-alive connections to a single host. At most `size` connections
+    are open at any time; additional requests wait for a connection to be released.
+    """
+
+    def __init__(self, scheme: Text, host: Text, port: int, size: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def new_connection(self) -> _Connection:
+        context = ssl.create_default_context() if self.scheme == "https" else None
+        return await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def acquire(self) -> Tuple[_Connection, bool]:
+        """
+        Wait for a free slot and return an idle connection if there is one, or a new
+        one otherwise.
+
+        :return: A (connection, reused) tuple
+        """
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn[0].at_eof():
+                    return conn, True
+                conn[1].close()
+            return await self.new_connection(), False
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: Optional[_Connection]) -> None:
+        if conn is not None:
+            self._idle.append(conn)
+        self._slots.release()
+
+    def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+class AsyncHTTPTransport(AsyncTransport):
+    """
+    Asynchronous transport using persistent (keep-alive) connections, pooled and
+    bounded per host. Compressed responses (gzip/deflate) are transparently decoded.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_POOL_SIZE,
+        user_agent: Text = USER_AGENT,
+        max_redirects: int = DEFAULT_MAX_REDIRECTS,
+    ):
+        """
+        :param timeout: Timeout, in seconds, for each request
+        :param max_connections: Maximum number of connections open per host
+        :param user_agent: Value of the User-Agent header sent with every request
+        :param max_redirects: Maximum number of redirects to follow per request
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self._pools: Dict[Tuple[Text, Text, int], _AsyncConnectionPool] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _pool(self, scheme: Text, host: Text, port: int) -> _AsyncConnectionPool:
+        # Connections and semaphores are bound to an event loop, start over if the
+        # transport is used from a different one
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._pools = {}
+            self._loop = loop
+
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = _AsyncConnectionPool(scheme, host, port, self.max_connections)
+            self._pools[key] = pool
+        return pool
+
+    async def _request(self, url: Text) -> Tuple[int, Text, Any, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "https"
+        if scheme not in ("http", "https"):
+            raise ValueError("Unsupported URL scheme: {}".format(scheme))
+
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        pool = self._pool(scheme, host, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        request = (
+            "GET {} HTTP/1.1\r\n"
+            "Host: {}\r\n"
+            "Accept-Encoding: gzip, deflate\r\n"
+            "Connection: keep-alive\r\n"
+            "User-Agent: {}\r\n\r\n"
+        ).format(path, parts.netloc, self.user_agent)
+
+        conn, reused = await pool.acquire()
+        keep: Optional[_Connection] = None
+        try:
+            while True:
+                reader, writer = conn
+                try:
+                    writer.write(request.encode("latin-1"))
+                    await writer.drain()
+                    status, reason, headers, body, will_close = await _read_response(
+                        reader
+                    )
+                except _STALE_CONNECTION_ERRORS:
+                    writer.close()
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection, try again on a new one
+                    conn, reused = await pool.new_connection(), False
+                    continue
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+
+            if will_close:
+                writer.close()
+            else:
+                keep = conn
+        finally:
+            pool.release(keep)
+
+        encoding = headers.get("Content-Encoding")
+        return status, reason, headers, decode_body(body, encoding)
+
+    async def get(self, url: Text) -> bytes:
+        for _ in range(self.max_redirects + 1):
+            status, reason, headers, body = await asyncio.wait_for(
+                self._request(url), self.timeout
+            )
+            location = headers.get("Location")
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+            if status >= 400:
+                raise urllib.error.HTTPError(
+                    url, status, reason, headers, io.BytesIO(body)
+                )
+            return body
+
+        raise urllib.error.HTTPError(
+            url, status, "Too many redirects", headers, io.BytesIO(body)
+        )
+
+    async def close(self) -> None:
+        pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> _Response:
+    """
+    Read an HTTP/1.1 response from a stream.
+
+    :param reader: The stream to read from
+    :return: A (status, reason, headers, body, will_close) tuple
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, _, raw_headers = head.partition(b"\r\n")
+    version, status_text, reason = (status_line.decode("latin-1").split(" ", 2) + [""])[
+        :3
+    ]
+    status = int(status_text)
+    headers = http.client.parse_headers(io.BytesIO(raw_headers))
+
+    connection = (headers.get("Connection") or "").lower()
+    will_close = connection == "close" or (
+        version == "HTTP/1.0" and connection != "keep-alive"
+    )
+
+    if status in (204, 304) or 100 <= status < 200:
+        body = b""
+    elif (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if not size:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        # Skip any trailers
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        body = b"".join(chunks)
+    elif headers.get("Content-Length") is not None:
+        body = await reader.readexactly(int(headers["Content-Length"]))
+    else:
+        body = await reader.read()
+        will_close = True
+
+    return status, reason.strip(), headers, body, will_close
+
+
+_transport: Optional[AsyncTransport] = None
+
+
+def get_transport() -> AsyncTransport:
+    """
+    Return the transport currently used for all asynchronous requests, creating a
+    default AsyncHTTPTransport if none has been set.
+
+    :return: The current transport
+    """
+    global _transport
+    if _transport is None:
+        _transport = AsyncHTTPTransport()
+    return _transport
+
+
+def set_transport(transport: Optional[AsyncTransport]) -> Optional[AsyncTransport]:
+    """
+    Replace the transport used for all asynchronous requests. Passing None restores
+    the default AsyncHTTPTransport on the next request.
+
+    :param transport: The new transport
+    :return: The previously installed transport, if any
+    """
+    global _transport
+    previous, _transport = _transport, transport
+    return previous
+
+
+async def json_from_url(url: Text, params: Optional[Text] = None) -> Dict[Text, Any]:
+    """
+    Asynchronous version of utils.json_from_url().
+
+    :param url: The URL to retrieve
+    :param params: The parameters to pass to the URL
+    :return: A Python dictionary of the parsed JSON
+    """
+    tracer = instrumentation.get_tracer()
+    if tracer is None:
+        text = (await get_transport().get(utils.build_url(url, params))).decode("utf-8")
+        return json.loads(text)
+
+    with instrumentation.stage(tracer, "request"):
+        body = await get_transport().get(utils.build_url(url, params))
+    tracer.count("response_bytes", len(body))
+    with instrumentation.stage(tracer, "json_decode"):
+        text = body.decode("utf-8")
+        del body
+        return json.loads(text)
+
+
+@utils.validate_lang
+async def search(s: Text, lang: Text = DEFAULT_LANG) -> List[Text]:
+    if not s:
+        return []
+
+    indexed = _index_search(lang, s)
+    if indexed:
+        return indexed
+
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.search(lang, s)
+
+    cached = _cache_get(lang, "search", s)
+    if cached is not None:
+        return list(cached)
+
+    return list(await _flights.do(("search", lang, s), _search_api, s, lang))
+
+
+async def _search_api(s: Text, lang: Text) -> List[Text]:
+    data = await json_from_url(SRCH_URL.format(lang=lang), s)
+    results = _search_results(data)
+    _cache_set(lang, "search", s, list(results))
+    _index_pages(lang, results)
+    return results
+
+
+@utils.validate_lang
+async def random_titles(
+    lang: Text = DEFAULT_LANG, max_titles: int = DEFAULT_MAX_QUOTES
+) -> List[Text]:
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.random_titles(lang, max_titles)
+
+    data = await json_from_url(RANDOM_URL.format(lang=lang, limit=max_titles))
+    return _random_results(data)
+
+
+@utils.validate_lang
+async def random_quote(lang: Text = DEFAULT_LANG) -> Tuple[Text, Text]:
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.random_quote(lang)
+
+    for title in await random_titles(lang=lang):
+        try:
+            page_quotes = await quotes(title, lang=lang)
+        except (utils.NoSuchPageException, utils.DisambiguationPageException):
+            continue
+        if page_quotes:
+            return random.choice(page_quotes), title
+
+    raise utils.NoSuchPageException("No quotes found in random pages")
+
+
+@utils.validate_lang
+async def quotes(
+    page_title: Text,
+    max_quotes: int = DEFAULT_MAX_QUOTES,
+    lang: Text = DEFAULT_LANG,
+    sections: bool = False,
+    dedupe: bool = False,
+) -> List[Text]:
+    if not dedupe:
+        return await _quotes(page_title, max_quotes, lang, sections)
+    results = await _quotes(page_title, max_quotes, lang, sections)
+    unique = _without_duplicates(results)
+    if len(unique) < len(results) == max_quotes:
+        # Duplicates were removed from a truncated list, so all quotes are needed
+        unique = _without_duplicates(await _quotes(page_title, -1, lang, sections))
+    return unique[:max_quotes] if max_quotes >= 0 else unique
+
+
+async def _quotes(
+    page_title: Text, max_quotes: int, lang: Text, sections: bool
+) -> List[Text]:
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.quotes(lang, page_title, max_quotes)
+
+    cached = _cached_quotes(lang, page_title, max_quotes)
+    if cached is not None:
+        return cached
+
+    key = ("quotes", lang, page_title, max_quotes, sections)
+    return list(
+        await _flights.do(key, _retrieve_quotes, page_title, max_quotes, lang, sections)
+    )
+
+
+async def _retrieve_quotes(
+    page_title: Text, max_quotes: int, lang: Text, sections: bool
+) -> List[Text]:
+    # If the page has not changed since it was cached, reuse the expired entry
+    stale = _stale_quotes(lang, page_title, max_quotes)
+    if (
+        stale is not None
+        and await _current_revision(page_title, lang) == stale["revid"]
+    ):
+        _renew_quotes(lang, page_title)
+        return stale["quotes"][:max_quotes]
+
+    section_quotes = None
+    if sections:
+        section_quotes = await _fetch_section_quotes(page_title, max_quotes, lang)
+
+    if section_quotes is not None:
+        results, revid = section_quotes
+    else:
+        data = await json_from_url(PAGE_URL.format(lang=lang), page_title)
+        results = await _run_blocking(_page_quotes, data, page_title, max_quotes, lang)
+        revid = data["parse"].get("revid")
+    _cache_quotes(lang, page_title, max_quotes, results, revid)
+    return results
+
+
+async def _fetch_section_quotes(
+    page_title: Text, max_quotes: int, lang: Text
+) -> Optional[Tuple[List[Text], Optional[int]]]:
+    data = await json_from_url(SECTIONS_URL.format(lang=lang), page_title)
+    _check_page(data, page_title)
+
+    revid = data["parse"].get("revid")
+    indexes = _quote_sections(data["parse"]["sections"], langs.spec_lang(lang))
+    if revid is None or indexes is None:
+        return None
+    if not indexes:
+        return [], revid
+
+    sections_data = await asyncio.gather(
+        *(
+            json_from_url(SECTION_URL.format(lang=lang, section=index, revid=revid))
+            for index in indexes
+        )
+    )
+    html_content = "".join(utils.page_html(d) for d in sections_data)
+    results = await _run_blocking(
+        langs.extract_quotes_lang, lang, html_content, max_quotes
+    )
+    return results, revid
+
+
+async def _run_blocking(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Run a function parsing HTML (and extracting quotes from it) in the default
+    executor of the event loop, so that other coroutines are not blocked while large
+    pages are parsed.
+
+    :param fn: The function
+    :return: The result of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(fn, *args))
+
+
+async def _current_revision(page_title: Text, lang: Text) -> Optional[int]:
+    # If the revision cannot be checked, the page is downloaded again instead
+    try:
+        return await _revision(page_title, lang)
+    except Exception:
+        return None
+
+
+async def _revision(page_title: Text, lang: Text) -> Optional[int]:
+    data = await json_from_url(REVISIONS_URL.format(lang=lang) + "&titles=", page_title)
+    query: Dict[Text, Any] = {"normalized": {}, "redirects": {}, "pages": {}}
+    _merge_query(query, data)
+    return _page_revisions([page_title], query)[page_title]
+
+
+@utils.validate_lang
+async def quote_of_the_day(lang: Text = DEFAULT_LANG) -> Tuple[Text, Text]:
+    day = _utc_today()
+    cached = _cached_qotd(lang, day)
+    if cached is not None:
+        return cached
+
+    return await _flights.do(("qotd", lang, day), _retrieve_qotd, lang, day)
+
+
+async def _retrieve_qotd(lang: Text, day: datetime.date) -> Tuple[Text, Text]:
+    main_page = langs.main_page_lang(lang)
+    data = await json_from_url(MAINPAGE_URL.format(lang=lang), main_page)
+    result = await _run_blocking(_qotd_from_data, data, lang)
+    _cache_qotd(lang, day, result)
+    return result
+
+
+async def all_qotd(
+    languages: Optional[Iterable[Text]] = None,
+) -> Dict[Text, QOTDResult]:
+    languages = sorted(
+        languages if languages is not None else langs.SUPPORTED_LANGUAGES
+    )
+    results = await asyncio.gather(
+        *[quote_of_the_day(lang=lang) for lang in languages], return_exceptions=True
+    )
+    qotds: Dict[Text, QOTDResult] = {}
+    for lang, result in zip(languages, results):
+        # Cancellation and other non-Exception errors are not per-language results
+        if not isinstance(result, (tuple, Exception)):
+            raise result
+        qotds[lang] = result
+    return qotds
+
+
+def supported_languages() -> List[Text]:
+    return sorted(langs.SUPPORTED_LANGUAGES)
+
+
+qotd = quote_of_the_day
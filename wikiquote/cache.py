@@ -0,0 +1,293 @@
+import collections
+import json
+import threading
+import time
+from typing import Any, Callable, Optional, Text, Tuple
+
+from .constants import DEFAULT_CACHE_SIZE, DEFAULT_CACHE_TTL
+
+# Cache keys are (lang, endpoint, title) tuples, e.g. ("en", "quotes", "Dune")
+CacheKey = Tuple[Text, Text, Text]
+
+
+class CacheStats:
+    """
+    Hit/miss counters of a cache.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> Text:
+        return "CacheStats(hits={}, misses={}, evictions={})".format(
+            self.hits, self.misses, self.evictions
+        )
+
+
+class Cache:
+    """
+    Base class for the caches used to store API results (such as the quotes
+    extracted from a page, or search results). Values must be JSON-serializable.
+    Subclasses must implement _get(), _set(), touch(), delete() and clear().
+
+    Expired entries are not returned by get(), but may still be retrieved using
+    get_stale() (until they are evicted), so that they can be revalidated and
+    renewed using touch() instead of being downloaded again.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    def get(
+        self, key: CacheKey, accept: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[Any]:
+        """
+        Return the value stored for a key, or None if it is missing or has expired.
+
+        :param key: A (lang, endpoint, title) tuple
+        :param accept: If given, the value is only returned (and counted as a hit) if
+        accept(value) returns True
+        :return: The cached value, or None
+        """
+        value = self._get(key, False)
+        if value is not None and accept is not None and not accept(value):
+            value = None
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def get_stale(self, key: CacheKey) -> Optional[Any]:
+        """
+        Return the value stored for a key, even if it has expired. Hit/miss stats are
+        not updated.
+
+        :param key: A (lang, endpoint, title) tuple
+        :return: The cached value, or None
+        """
+        return self._get(key, True)
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        """
+        Store a value for a key.
+
+        :param key: A (lang, endpoint, title) tuple
+        :param value: The value to store
+        """
+        self._set(key, value)
+
+    def _get(self, key: CacheKey, stale: bool) -> Optional[Any]:
+        raise NotImplementedError
+
+    def _set(self, key: CacheKey, value: Any) -> None:
+        raise NotImplementedError
+
+    def touch(self, key: CacheKey) -> None:
+        """
+        Renew the expiration time of an entry, as if it had just been stored.
+
+        :param key: A (lang, endpoint, title) tuple
+        """
+        raise NotImplementedError
+
+    def delete(self, key: CacheKey) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(Cache):
+    """
+    In-memory cache holding at most `maxsize` entries, evicting the least recently
+    used ones first. Entries expire `ttl` seconds after being stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+    ):
+        """
+        :param maxsize: The maximum number of entries to keep
+        :param ttl: Time to live of each entry in seconds, or None to never expire
+        """
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "collections.OrderedDict[CacheKey, Tuple[float, Any]]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _expires(self) -> float:
+        return time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+
+    def _get(self, key: CacheKey, stale: bool) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic() and not stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: CacheKey, value: Any) -> None:
+        expires = self._expires()
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def touch(self, key: CacheKey) -> None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data[key] = (self._expires(), entry[1])
+                self._data.move_to_end(key)
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(Cache):
+    """
+    On-disk cache backed by an SQLite database, which can be shared between
+    processes and survives restarts. Entries expire `ttl` seconds after being
+    stored. If `maxsize` is set, the least recently used entries are evicted once
+    the cache grows beyond that size.
+    """
+
+    def __init__(
+        self,
+        path: Text,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        maxsize: Optional[int] = None,
+    ):
+        """
+        :param path: Path of the database file
+        :param ttl: Time to live of each entry in seconds, or None to never expire
+        :param maxsize: The maximum number of entries to keep, or None for no limit
+        """
+        # sqlite3 is only imported once a cache is created, so that importing
+        # wikiquote stays fast
+        import sqlite3
+
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)"
+            )
+
+    @staticmethod
+    def _key(key: CacheKey) -> Text:
+        return json.dumps(list(key), ensure_ascii=False)
+
+    def _get(self, key: CacheKey, stale: bool) -> Optional[Any]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (self._key(key),)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now and not stale:
+                return None
+            self._conn.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?", (now, self._key(key))
+            )
+        return json.loads(row[0])
+
+    def _set(self, key: CacheKey, value: Any) -> None:
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                (self._key(key), json.dumps(value), expires, now),
+            )
+            if self.maxsize is not None:
+                deleted = self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                ).rowcount
+                self.stats.evictions += deleted
+
+    def touch(self, key: CacheKey) -> None:
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE cache SET expires = ?, accessed = ? WHERE key = ?",
+                (expires, now, self._key(key)),
+            )
+
+    def delete(self, key: CacheKey) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (self._key(key),))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Optional[Cache]:
+    """
+    Return the cache currently used by all API functions, or None if caching is
+    disabled (the default).
+
+    :return: The current cache
+    """
+    return _cache
+
+
+def set_cache(cache: Optional[Cache]) -> Optional[Cache]:
+    """
+    Set the cache used by all API functions. Passing None disables caching.
+
+    :param cache: The new cache
+    :return: The previously installed cache, if any
+    """
+    global _cache
+    previous, _cache = _cache, cache
+    return previous
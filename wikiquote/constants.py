@@ -2,12 +2,51 @@ DEFAULT_LANG = "en"
 DEFAULT_MAX_QUOTES = 20
 MIN_QUOTE_LEN = 6
 MIN_QUOTE_WORDS = 3
-W_URL = "http://{lang}.wikiquote.org/w/api.php"
+DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RATE_LIMIT = 10
+DEFAULT_BURST = 10
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+DEFAULT_MAXLAG = 5
+DEFAULT_MAX_REDIRECTS = 5
+DEFAULT_MAX_WORKERS = 8
+MAX_TITLES_PER_QUERY = 50
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+DEFAULT_QOTD_PREFETCH_DELAY = 5 * 60
+HTML_CHUNK_SIZE = 16 * 1024
+QUOTE_BATCH_SIZE = 16
+DEFAULT_SEARCH_LIMIT = 10
+DUMP_BATCH_SIZE = 1000
+DEFAULT_RESERVOIR_SIZE = 200
+DEFAULT_RESERVOIR_BATCH = 20
+DEFAULT_QUOTES_PER_PAGE = 3
+RESERVOIR_RETRY_DELAY = 10
+USER_AGENT = "wikiquote (https://github.com/federicotdn/wikiquote)"
+W_URL = "https://{lang}.wikiquote.org/w/api.php"
 SRCH_URL = W_URL + "?format=json&action=query&list=search&continue=&srsearch="
 RANDOM_URL = (
     W_URL + "?format=json&action=query&list=random&rnnamespace=0&rnlimit={limit}"
 )
-PAGE_URL = (
-    W_URL + "?format=json&action=parse&prop=text|categories&" "disableeditsection&page="
+# Pages are retrieved with formatversion=2, which returns the HTML as a plain JSON
+# string, following redirects, and with only the properties and parts of the
+# output that are used. Non-ASCII characters are escaped (ascii=1), so that the
+# decoded response of a mostly ASCII page is not widened to 2 or 4 bytes per
+# character by a few typographic quotes
+PARSE_URL = (
+    W_URL + "?format=json&formatversion=2&ascii=1&action=parse&redirects=1&"
+    "disablelimitreport&disableeditsection&disabletoc"
+)
+PAGE_URL = PARSE_URL + "&prop=text|categories&page="
+SECTIONS_URL = PARSE_URL + "&prop=sections|categories|revid&page="
+SECTION_URL = PARSE_URL + "&prop=text&section={section}&oldid={revid}"
+MAINPAGE_URL = PARSE_URL + "&prop=text&page="
+QUERY_URL = (
+    W_URL + "?format=json&action=query&redirects=1&prop=categories|pageprops&"
+    "ppprop=disambiguation&cllimit=max"
+)
+REVISIONS_URL = (
+    W_URL + "?format=json&action=query&redirects=1&prop=revisions&rvprop=ids"
 )
-MAINPAGE_URL = W_URL + "?format=json&action=parse&prop=text&page="
@@ -0,0 +1,365 @@
+import bz2
+import html
+import logging
+import re
+import sys
+from typing import IO, Any, Callable, Iterator, List, NamedTuple, Optional, Text, Union
+
+import lxml.etree
+
+from . import langs, store
+from .constants import DUMP_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Templates marking a page as a disambiguation page, per language (lowercase)
+DISAMBIGUATION_TEMPLATES = {
+    "de": ["begriffsklärung"],
+    "en": ["disambig", "disambiguation", "dab"],
+    "es": ["desambiguación", "desambiguacion", "des"],
+    "eu": ["argipen"],
+    "fr": ["homonymie", "homonymes"],
+    "he": ["פירושונים", "דף פירושונים"],
+    "it": ["disambigua"],
+    "pl": ["ujednoznacznienie", "disambig"],
+    "pt": ["desambiguação", "desambig", "disambig"],
+}
+
+# Namespaces of links that are not rendered as part of the text (e.g. categories)
+_HIDDEN_LINK_NAMESPACES = {
+    "category",
+    "file",
+    "image",
+    "media",
+    "kategorie",
+    "datei",
+    "bild",
+    "categoría",
+    "archivo",
+    "imagen",
+    "kategoria",
+    "fitxategi",
+    "catégorie",
+    "fichier",
+    "קטגוריה",
+    "קובץ",
+    "תמונה",
+    "categoria",
+    "immagine",
+    "plik",
+    "grafika",
+    "ficheiro",
+    "imagem",
+}
+
+_COMMENT_RE = re.compile(r"<!--.*?(-->|$)", re.DOTALL)
+_REF_RE = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+_TEMPLATE_RE = re.compile(r"\{\{([^{}]*)\}\}")
+_HEADING_RE = re.compile(r"^(={1,6})\s*(.+?)\s*\1\s*$")
+_LIST_PREFIX_RE = re.compile(r"^[*#:;]+")
+_LINK_RE = re.compile(r"\[\[([^\[\]|]*)(?:\|([^\[\]]*))?\]\]")
+_EXTERNAL_LINK_RE = re.compile(r"\[(?:https?:)?//[^\s\]]+(?:\s+([^\]]*))?\]")
+_BOLD_RE = re.compile(r"'''(.+?)'''")
+_ITALIC_RE = re.compile(r"''(.+?)''")
+_MAGIC_WORD_RE = re.compile(r"__[A-Z]+__")
+_INTERLANGUAGE_RE = re.compile(r"^[a-z]{2,3}(-[a-z]+)*$")
+# Formatting tags allowed in wikitext, which are kept once the text has been escaped
+_HTML_TAG_RE = re.compile(
+    r"&lt;(/?(?:b|i|u|s|em|strong|small|big|sub|sup|span|br|center|poem|blockquote)"
+    r"\b[^&\n]*?)&gt;",
+    re.IGNORECASE,
+)
+
+# Tags of the list items and lists corresponding to each list prefix character
+_LIST_TAGS = {
+    "*": ("ul", "li"),
+    "#": ("ol", "li"),
+    ":": ("dl", "dd"),
+    ";": ("dl", "dt"),
+}
+
+
+class DumpPage(NamedTuple):
+    title: Text
+    ns: int
+    revid: Optional[int]
+    redirect: Optional[Text]
+    text: Text
+
+
+def iter_dump_pages(
+    source: Union[Text, IO[bytes]], namespaces: Optional[List[int]] = None
+) -> Iterator[DumpPage]:
+    """
+    Stream the pages of a MediaWiki XML dump (such as
+    enwikiquote-latest-pages-articles.xml.bz2), keeping only one page in memory at
+    a time. Files compressed with bzip2 are decompressed on the fly.
+
+    :param source: The path of the dump, or a binary file object
+    :param namespaces: The namespaces of the pages to yield (defaults to articles
+    only)
+    :return: An iterator over the pages of the dump
+    """
+    namespaces = namespaces if namespaces is not None else [0]
+    f = _open_dump(source) if isinstance(source, str) else source
+    try:
+        for _, elem in lxml.etree.iterparse(f, events=("end",), tag="{*}page"):
+            page = _dump_page(elem)
+            # Free the memory used by the pages processed so far
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+            if page.ns in namespaces:
+                yield page
+    finally:
+        if f is not source:
+            f.close()
+
+
+def dump_lang(source: Union[Text, IO[bytes]]) -> Optional[Text]:
+    """
+    Determine the language of a dump from its database name (e.g. "enwikiquote").
+
+    :param source: The path of the dump, or a binary file object
+    :return: The language code, or None if it could not be determined
+    """
+    f = _open_dump(source) if isinstance(source, str) else source
+    try:
+        for _, elem in lxml.etree.iterparse(f, events=("end",), tag="{*}dbname"):
+            dbname = elem.text or ""
+            if dbname.endswith("wikiquote"):
+                return dbname[: -len("wikiquote")].replace("_", "-")
+            return None
+    finally:
+        if f is not source:
+            f.close()
+    return None
+
+
+def _open_dump(path: Text) -> IO[bytes]:
+    with open(path, "rb") as f:
+        compressed = f.read(3) == b"BZh"
+    return bz2.open(path, "rb") if compressed else open(path, "rb")
+
+
+def _dump_page(elem: Any) -> DumpPage:
+    def child_text(path: Text) -> Optional[Text]:
+        found = elem.find(path)
+        return found.text if found is not None else None
+
+    namespace = elem.tag[: elem.tag.index("}") + 1] if "}" in elem.tag else ""
+    redirect = elem.find(namespace + "redirect")
+    revid = child_text("{0}revision/{0}id".format(namespace))
+    return DumpPage(
+        title=child_text(namespace + "title") or "",
+        ns=int(child_text(namespace + "ns") or 0),
+        revid=int(revid) if revid else None,
+        redirect=redirect.get("title") if redirect is not None else None,
+        text=child_text("{0}revision/{0}text".format(namespace)) or "",
+    )
+
+
+def ingest_dump(
+    source: Union[Text, IO[bytes]],
+    quote_store: Union[store.QuoteStore, store.CompactStoreBuilder],
+    lang: Optional[Text] = None,
+    batch_size: int = DUMP_BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Extract the quotes of every article of a Wikiquote XML dump, and add them to a
+    quote store. Wikitext is converted to an approximation of the HTML rendered by
+    MediaWiki, which is then passed to the language's quote extractor.
+
+    :param source: The path of the dump (optionally compressed with bzip2), or a
+    binary file object
+    :param quote_store: The store (or compact store builder) to add the pages to
+    :param lang: The language of the dump (determined from the dump if possible)
+    :param batch_size: Number of pages added to the store at a time
+    :param progress: If given, called with the number of pages ingested so far
+    after every batch
+    :return: The number of pages (excluding redirects) ingested
+    """
+    if lang is None:
+        if not isinstance(source, str):
+            raise ValueError("The language of a dump file object must be given")
+        lang = dump_lang(source)
+    if lang not in langs.SUPPORTED_LANGUAGES:
+        raise ValueError("Unsupported or unknown dump language: {}".format(lang))
+
+    count = 0
+    pages: List[store.StoredPage] = []
+    redirects = []
+    for page in iter_dump_pages(source):
+        if page.redirect is not None:
+            target = store.normalize_title(page.redirect.split("#")[0])
+            redirects.append((lang, page.title, target))
+        else:
+            pages.append(_stored_page(page, lang))
+
+        if len(pages) + len(redirects) >= batch_size:
+            quote_store.add_pages(pages)
+            quote_store.add_redirects(redirects)
+            count += len(pages)
+            pages, redirects = [], []
+            if progress is not None:
+                progress(count)
+
+    quote_store.add_pages(pages)
+    quote_store.add_redirects(redirects)
+    count += len(pages)
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def _stored_page(page: DumpPage, lang: Text) -> store.StoredPage:
+    disambiguation = is_disambiguation(page.text, lang)
+    quotes: List[Text] = []
+    if not disambiguation:
+        try:
+            quotes = langs.extract_quotes_lang(
+                lang, wikitext_to_html(page.text), sys.maxsize
+            )
+        except Exception as e:
+            logger.warning("Could not extract quotes from '%s': %s", page.title, e)
+    return lang, page.title, quotes, page.revid, disambiguation
+
+
+def is_disambiguation(wikitext: Text, lang: Text) -> bool:
+    """
+    Check if the wikitext of a page uses one of the disambiguation templates of its
+    language.
+
+    :param wikitext: The wikitext of the page
+    :param lang: The language of the page
+    :return: True if the page is a disambiguation page, False otherwise
+    """
+    names = DISAMBIGUATION_TEMPLATES.get(lang, [])
+    for match in _TEMPLATE_RE.finditer(wikitext):
+        name = match.group(1).split("|")[0].strip().lower()
+        if name in names:
+            return True
+    return False
+
+
+def wikitext_to_html(wikitext: Text) -> Text:
+    """
+    Convert wikitext to an approximation of the HTML MediaWiki would render: headings,
+    (nested) lists, paragraphs, links and bold/italic text are converted, while
+    templates (other than French citations), references, tables and comments are
+    dropped.
+
+    :param wikitext: The wikitext to convert
+    :return: The HTML, wrapped in a <div class="mw-parser-output"> element
+    """
+    text = _COMMENT_RE.sub("", wikitext)
+    text = _REF_RE.sub("", text)
+    text = _MAGIC_WORD_RE.sub("", text)
+    # Literal "<", ">" and "&" are escaped before any markup is added (except in the
+    # formatting tags allowed in wikitext)
+    text = _HTML_TAG_RE.sub(r"<\1>", html.escape(text, quote=False))
+    # Links are converted first, so that their "|" do not split template arguments
+    text = _LINK_RE.sub(_link, text)
+    # Expand templates from the innermost ones outwards
+    while True:
+        text, count = _TEMPLATE_RE.subn(_template, text)
+        if not count:
+            break
+
+    out = ['<div class="mw-parser-output">']
+    prefix = ""
+    in_table = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        # Tables are dropped
+        if stripped.startswith("{|"):
+            in_table += 1
+        if in_table:
+            if stripped.startswith("|}"):
+                in_table -= 1
+            continue
+
+        match = _LIST_PREFIX_RE.match(line)
+        new_prefix = match.group(0) if match else ""
+        _change_list(out, prefix, new_prefix)
+        prefix = new_prefix
+
+        if new_prefix:
+            out.append(_inline(line[len(new_prefix) :].strip()))
+            continue
+
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            level = len(heading.group(1))
+            out.append("<h{0}>{1}</h{0}>".format(level, _inline(heading.group(2))))
+        elif stripped:
+            out.append("<p>{}</p>".format(_inline(stripped)))
+
+    _change_list(out, prefix, "")
+    out.append("</div>")
+    return "".join(out)
+
+
+def _same_list(a: Text, b: Text) -> bool:
+    return a == b or (a in ":;" and b in ":;")
+
+
+def _change_list(out: List[Text], prefix: Text, new_prefix: Text) -> None:
+    """
+    Close and open the lists and list items needed to go from a line with list
+    prefix `prefix` (e.g. "*#") to a line with list prefix `new_prefix`.
+    """
+    common = 0
+    while common < min(len(prefix), len(new_prefix)) and _same_list(
+        prefix[common], new_prefix[common]
+    ):
+        common += 1
+
+    for char in reversed(prefix[common:]):
+        out.append("</{1}></{0}>".format(*_LIST_TAGS[char]))
+    if new_prefix and common == len(new_prefix):
+        # A new item of the innermost list
+        out.append(
+            "</{}><{}>".format(
+                _LIST_TAGS[prefix[common - 1]][1], _LIST_TAGS[new_prefix[-1]][1]
+            )
+        )
+    for char in new_prefix[common:]:
+        out.append("<{0}><{1}>".format(*_LIST_TAGS[char]))
+
+
+def _template(match: "re.Match[Text]") -> Text:
+    name, _, args = match.group(1).partition("|")
+    if name.strip().lower() != "citation":
+        return ""
+
+    # French citations: {{citation|text}} or {{citation|citation=text|...}}
+    positional = []
+    for arg in args.split("|"):
+        key, sep, value = arg.partition("=")
+        if sep and key.strip().lower() == "citation":
+            return '<div class="citation">{}</div>'.format(value.strip())
+        if not sep:
+            positional.append(arg)
+    if positional:
+        return '<div class="citation">{}</div>'.format(positional[0].strip())
+    return ""
+
+
+def _link(match: "re.Match[Text]") -> Text:
+    target, label = match.group(1), match.group(2)
+    namespace, sep, _ = target.partition(":")
+    if sep and namespace.strip().lower() in _HIDDEN_LINK_NAMESPACES:
+        return ""
+    if sep and label is None and _INTERLANGUAGE_RE.match(namespace):
+        # Links to the same page in other languages
+        return ""
+    return "<a>{}</a>".format(label if label is not None else target)
+
+
+def _inline(text: Text) -> Text:
+    text = _EXTERNAL_LINK_RE.sub(lambda m: "<a>{}</a>".format(m.group(1) or ""), text)
+    text = _BOLD_RE.sub(r"<b>\1</b>", text)
+    return _ITALIC_RE.sub(r"<i>\1</i>", text)
@@ -0,0 +1,382 @@
+import bisect
+import gzip
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Text, Tuple
+
+from .constants import DEFAULT_SEARCH_LIMIT
+
+_WORD_RE = re.compile(r"\w+")
+
+# Title terms count as much as this many occurrences in quotes
+TITLE_WEIGHT = 3
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Maximum number of terms a prefix is expanded to
+MAX_PREFIX_TERMS = 64
+
+
+def tokenize(text: Text) -> List[Text]:
+    """
+    Split a text into lowercase terms. Diacritics (including Hebrew vowel points
+    and cantillation marks) are removed, so that e.g. "Éire", "eire" and "EIRE"
+    match each other, while letters without decomposition (such as the Polish "ł")
+    are kept as they are.
+
+    :param text: The text to split
+    :return: The terms of the text
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WORD_RE.findall(unicodedata.normalize("NFC", stripped))
+
+
+class _InvertedIndex:
+    """
+    Inverted index of documents (pages or quotes), given as weighted term
+    frequencies.
+    """
+
+    def __init__(self) -> None:
+        # The terms of each document (None for removed documents)
+        self.terms: List[Optional[Dict[Text, int]]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[Text, Dict[int, int]] = {}
+        self.count = 0
+        self.total_length = 0
+        self._vocabulary: Optional[List[Text]] = None
+
+    def add(self, terms: Dict[Text, int]) -> int:
+        doc = len(self.terms)
+        self.terms.append(None)
+        self.lengths.append(0)
+        self.replace(doc, terms)
+        return doc
+
+    def replace(self, doc: int, terms: Optional[Dict[Text, int]]) -> None:
+        old_terms = self.terms[doc]
+        if old_terms is not None:
+            for term in old_terms:
+                del self.postings[term][doc]
+                if not self.postings[term]:
+                    del self.postings[term]
+            self.count -= 1
+            self.total_length -= self.lengths[doc]
+
+        self.terms[doc] = terms
+        if terms is None:
+            return
+        for term, frequency in terms.items():
+            if term not in self.postings:
+                self._vocabulary = None
+            self.postings.setdefault(term, {})[doc] = frequency
+        self.count += 1
+        self.lengths[doc] = sum(terms.values())
+        self.total_length += self.lengths[doc]
+
+    def expand(self, prefix: Text) -> List[Text]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start : start + MAX_PREFIX_TERMS]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def scores(self, terms: List[Text]) -> Dict[int, float]:
+        """
+        Return the BM25 score of the documents containing any of the given terms.
+        """
+        average_length = self.total_length / self.count if self.count else 0.0
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self.postings.get(term, {})
+            idf = math.log(
+                1 + (self.count - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            for doc, frequency in postings.items():
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self.lengths[doc] / (average_length or 1)
+                )
+                score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                scores[doc] = max(scores.get(doc, 0.0), score)
+        return scores
+
+    def search(self, words: List[Text], prefix: bool) -> Dict[int, float]:
+        """
+        Return the score of the documents containing all of the given words (the
+        last one as a prefix, if prefix is True).
+        """
+        total: Optional[Dict[int, float]] = None
+        for i, word in enumerate(words):
+            terms = self.expand(word) if prefix and i == len(words) - 1 else [word]
+            scores = self.scores(terms)
+            if total is None:
+                total = scores
+            else:
+                total = {
+                    doc: score + scores[doc]
+                    for doc, score in total.items()
+                    if doc in scores
+                }
+            if not total:
+                return {}
+        return total or {}
+
+
+def _frequencies(texts: Iterable[Text], weight: int = 1) -> Dict[Text, int]:
+    terms: Dict[Text, int] = {}
+    for text in texts:
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def _query(query: Text) -> Tuple[List[Text], bool]:
+    """
+    Split a query into words, and determine whether the last one is a prefix (i.e.
+    whether the query does not end with a space).
+    """
+    return tokenize(query), not query[-1:].isspace()
+
+
+def _phrase_count(terms: List[Text], words: List[Text], prefix: bool) -> int:
+    """
+    Count the occurrences of a phrase (whose last word may be a prefix) in a list
+    of terms.
+    """
+    count = 0
+    last = len(words) - 1
+    for i in range(len(terms) - last):
+        if terms[i : i + last] == words[:last] and (
+            terms[i + last].startswith(words[last])
+            if prefix
+            else terms[i + last] == words[last]
+        ):
+            count += 1
+    return count
+
+
+class _LangIndex:
+    """
+    The pages (and quotes) of one language.
+    """
+
+    def __init__(self) -> None:
+        self.titles: List[Text] = []
+        self.ids: Dict[Text, int] = {}
+        self.pages = _InvertedIndex()
+        # The (page, text) of each quote, and the quotes of each page
+        self.quotes = _InvertedIndex()
+        self.quote_texts: List[Tuple[int, Text]] = []
+        self.page_quotes: List[List[int]] = []
+
+    def add(
+        self,
+        title: Text,
+        terms: Dict[Text, int],
+        quotes: Optional[Iterable[Text]] = None,
+    ) -> None:
+        page = self.ids.get(title)
+        if page is None:
+            page = self.pages.add(terms)
+            self.ids[title] = page
+            self.titles.append(title)
+            self.page_quotes.append([])
+        else:
+            self.pages.replace(page, terms)
+        if quotes is None:
+            return
+
+        for quote in self.page_quotes[page]:
+            self.quotes.replace(quote, None)
+            self.quote_texts[quote] = (page, "")
+        self.page_quotes[page] = []
+        for text in quotes:
+            self.page_quotes[page].append(self.quotes.add(_frequencies([text])))
+            self.quote_texts.append((page, text))
+
+
+class SearchIndex:
+    """
+    Local full-text index of page titles (and optionally quotes) per language,
+    used by search() and search_quotes() to answer queries without making any
+    requests. The last word of a query matches all the terms it is a prefix of, so
+    that the index can be used for autocompletion. Results are ranked using BM25.
+
+    Once installed using set_index(), the index is filled incrementally with the
+    pages retrieved by quotes() and quotes_many() and the titles found by search().
+    Pages may also be added directly using add_page().
+    """
+
+    def __init__(self, include_quotes: bool = False):
+        """
+        :param include_quotes: Whether to also index the quotes of each page
+        (otherwise only titles are indexed)
+        """
+        self.include_quotes = include_quotes
+        self._langs: Dict[Text, _LangIndex] = {}
+        self._lock = threading.Lock()
+
+    def add_page(
+        self, lang: Text, title: Text, quotes: Optional[Iterable[Text]] = None
+    ) -> None:
+        """
+        Add (or update) a page.
+
+        :param lang: The language of the page
+        :param title: The title of the page
+        :param quotes: The quotes of the page. If None, an already indexed page is
+        left unchanged.
+        """
+        if not self.include_quotes or quotes is None:
+            quote_list = None
+        else:
+            quote_list = list(quotes)
+
+        with self._lock:
+            index = self._langs.setdefault(lang, _LangIndex())
+            if quotes is None and title in index.ids:
+                return
+
+            terms = _frequencies([title], TITLE_WEIGHT)
+            for term, frequency in _frequencies(quote_list or []).items():
+                terms[term] = terms.get(term, 0) + frequency
+            index.add(title, terms, quote_list)
+
+    def search(
+        self, lang: Text, query: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Text]:
+        """
+        Search the indexed pages of a language. Pages must contain all of the words
+        of the query (the last one as a prefix, unless the query ends with a space).
+
+        :param lang: The language of the pages
+        :param query: The text to search for
+        :param limit: The maximum number of titles to return
+        :return: The matching titles, best matches first
+        """
+        words, prefix = _query(query)
+        with self._lock:
+            index = self._langs.get(lang)
+            if index is None or not words:
+                return []
+
+            scores = index.pages.search(words, prefix)
+            ranked = sorted(
+                scores, key=lambda page: (-scores[page], index.titles[page])
+            )
+            return [index.titles[page] for page in ranked[:limit]]
+
+    def search_quotes(
+        self, lang: Text, query: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Tuple[Text, Text]]:
+        """
+        Search the indexed quotes of a language for a phrase (whose last word is a
+        prefix, unless the query ends with a space).
+
+        :param lang: The language of the quotes
+        :param query: The phrase to search for
+        :param limit: The maximum number of quotes to return
+        :return: (title, quote) tuples, best matches first
+        """
+        words, prefix = _query(query)
+        with self._lock:
+            index = self._langs.get(lang)
+            if index is None or not words:
+                return []
+
+            scores = index.quotes.search(words, prefix)
+            results = []
+            for quote in sorted(scores, key=lambda quote: (-scores[quote], quote)):
+                page, text = index.quote_texts[quote]
+                if len(words) == 1 or _phrase_count(tokenize(text), words, prefix):
+                    results.append((index.titles[page], text))
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(index.titles) for index in self._langs.values())
+
+    def save(self, path: Text) -> None:
+        """
+        Save the index to a (gzip-compressed JSON) file.
+
+        :param path: Path of the file
+        """
+        with self._lock:
+            data = {
+                "include_quotes": self.include_quotes,
+                "langs": {
+                    lang: [
+                        (
+                            title,
+                            index.pages.terms[page],
+                            [
+                                index.quote_texts[quote][1]
+                                for quote in index.page_quotes[page]
+                            ],
+                        )
+                        for page, title in enumerate(index.titles)
+                    ]
+                    for lang, index in self._langs.items()
+                },
+            }
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Text) -> "SearchIndex":
+        """
+        Load an index saved using save().
+
+        :param path: Path of the file
+        :return: The index
+        """
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        search_index = cls(include_quotes=data["include_quotes"])
+        for lang, pages in data["langs"].items():
+            index = search_index._langs.setdefault(lang, _LangIndex())
+            for title, terms, quotes in pages:
+                index.add(title, terms, quotes if search_index.include_quotes else None)
+        return search_index
+
+
+_index: Optional[SearchIndex] = None
+
+
+def get_index() -> Optional[SearchIndex]:
+    """
+    Return the search index currently used by search(), or None if there is none
+    (the default).
+
+    :return: The current search index
+    """
+    return _index
+
+
+def set_index(search_index: Optional[SearchIndex]) -> Optional[SearchIndex]:
+    """
+    Set the search index used by search(), which falls back to the Wikiquote API (or
+    the quote store, if any) only when the index has no results. Passing None
+    disables the index.
+
+    :param search_index: The new search index
+    :return: The previously installed index, if any
+    """
+    global _index
+    previous, _index = _index, search_index
+    return previous
@@ -0,0 +1,334 @@
+import bisect
+import contextlib
+import functools
+import inspect
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    TypeVar,
+)
+
+if TYPE_CHECKING:
+    import http.server
+
+T = TypeVar("T")
+
+# Stages timed while retrieving quotes, and the counters incremented along the way.
+# Stages marked with (lang) are also labelled with the language.
+STAGES = {
+    "quotes": "quotes() calls, from start to finish (lang)",
+    "qotd": "quote_of_the_day() calls, from start to finish (lang)",
+    "connect": "opening new connections: DNS lookup, TCP and TLS handshakes",
+    "request": "performing API requests, from sending to reading the response",
+    "json_decode": "decoding JSON responses",
+    "html_parse": "parsing HTML (included in extract_quotes for quotes())",
+    "extract_quotes": "extracting the quotes of a page (lang)",
+    "extract_qotd": "extracting the quote of the day from the main page (lang)",
+}
+COUNTERS = {
+    "received_bytes": "bytes received over the network (possibly compressed)",
+    "response_bytes": "bytes of decoded API responses",
+    "candidate_nodes": "headings, list items and description lists visited",
+    "rejected_quotes": "potential quotes rejected by is_quote()",
+    "coalesced_calls": "calls that waited for an identical call in progress",
+}
+
+# Upper bounds, in seconds, of the buckets of the stage duration histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Tracer:
+    """
+    Base class for the objects receiving the measurements of each stage of the
+    retrieval of quotes (see STAGES and COUNTERS), once installed using
+    set_tracer(). Subclasses override observe() and count(), which may be called
+    from several threads at once. When no tracer is installed (the default), no
+    measurements are made.
+    """
+
+    def observe(self, stage: Text, seconds: float, lang: Optional[Text] = None) -> None:
+        """
+        Record the duration of a stage.
+
+        :param stage: The name of the stage
+        :param seconds: The time spent in the stage
+        :param lang: The language, for stages labelled with it
+        """
+
+    def count(self, name: Text, value: int) -> None:
+        """
+        Increment a counter.
+
+        :param name: The name of the counter
+        :param value: The amount to add to it
+        """
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Return the tracer currently receiving measurements, or None if instrumentation
+    is disabled (the default).
+
+    :return: The current tracer
+    """
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """
+    Set the tracer receiving measurements. Passing None disables instrumentation.
+
+    :param tracer: The new tracer
+    :return: The previously installed tracer, if any
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+
+@contextlib.contextmanager
+def stage(tracer: Tracer, name: Text, lang: Optional[Text] = None) -> Iterator[None]:
+    """
+    Context manager timing a stage, whether it succeeds or not. Callers only use it
+    once they have checked that a tracer is installed, so that nothing is measured
+    otherwise.
+
+    :param tracer: The tracer receiving the measurement
+    :param name: The name of the stage
+    :param lang: The language, for stages labelled with it
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer.observe(name, time.perf_counter() - start, lang)
+
+
+def traced(name: Text) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Decorator timing the calls of a function as a stage labelled with the language
+    (the function's lang parameter). When no tracer is installed, the function is
+    called directly.
+
+    :param name: The name of the stage
+    :return: The decorator
+    """
+
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def internal(*args: Any, **kwargs: Any) -> T:
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            with stage(tracer, name, bound.arguments.get("lang")):
+                return fn(*args, **kwargs)
+
+        return internal
+
+    return decorator
+
+
+def counted(tracer: Tracer, name: Text, items: Iterable[T]) -> Iterator[T]:
+    """
+    Yield the given items, and add the number of items consumed to a counter once
+    iteration stops (including when the iterator is closed early).
+
+    :param tracer: The tracer receiving the count
+    :param name: The name of the counter
+    :param items: The items to count
+    :return: An iterator over the items
+    """
+    consumed = 0
+    try:
+        for item in items:
+            consumed += 1
+            yield item
+    finally:
+        tracer.count(name, consumed)
+
+
+_LabelSet = Tuple[Tuple[Text, Text], ...]
+
+
+class _Histogram:
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class PrometheusExporter(Tracer):
+    """
+    Tracer aggregating measurements into metrics, which render() formats in the
+    Prometheus text exposition format (or in the OpenMetrics format). Stage
+    durations are histograms of the wikiquote_stage_duration_seconds metric,
+    labelled with the stage (and language), and each counter is exported as
+    wikiquote_<name>_total.
+    """
+
+    def __init__(
+        self,
+        namespace: Text = "wikiquote",
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        :param namespace: The prefix of the names of the metrics
+        :param buckets: Upper bounds, in seconds, of the histogram buckets
+        """
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[_LabelSet, _Histogram] = {}
+        self._counters: Dict[Text, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: Text, seconds: float, lang: Optional[Text] = None) -> None:
+        labels: _LabelSet = (("stage", stage),)
+        if lang is not None:
+            labels += (("lang", lang),)
+        # Buckets are cumulative when rendered, each observation is counted once here
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = _Histogram(len(self.buckets) + 1)
+                self._histograms[labels] = histogram
+            histogram.counts[bucket] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def count(self, name: Text, value: int) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        """
+        Forget all measurements.
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, openmetrics: bool = False) -> Text:
+        """
+        Format the metrics.
+
+        :param openmetrics: Use the OpenMetrics format instead of the Prometheus
+        text format
+        :return: The metrics, one sample per line
+        """
+        with self._lock:
+            histograms = [
+                (labels, list(h.counts), h.total, h.count)
+                for labels, h in sorted(self._histograms.items())
+            ]
+            counters = sorted(self._counters.items())
+
+        lines: List[Text] = []
+        name = self.namespace + "_stage_duration_seconds"
+        if histograms:
+            lines.append("# HELP {} Time spent in each stage.".format(name))
+            lines.append("# TYPE {} histogram".format(name))
+        for labels, counts, total, count in histograms:
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        name, _format_labels(labels + (("le", bound),)), cumulative
+                    )
+                )
+            lines.append(
+                "{}_sum{} {}".format(name, _format_labels(labels), _format_value(total))
+            )
+            lines.append("{}_count{} {}".format(name, _format_labels(labels), count))
+
+        for counter, value in counters:
+            # In the OpenMetrics format, counters are declared without their suffix
+            family = "{}_{}".format(self.namespace, counter)
+            declared = family if openmetrics else family + "_total"
+            help_text = COUNTERS.get(counter, counter.replace("_", " "))
+            lines.append("# HELP {} {}".format(declared, _escape(help_text)))
+            lines.append("# TYPE {} counter".format(declared))
+            lines.append("{}_total {}".format(family, value))
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "".join(line + "\n" for line in lines)
+
+    def serve(
+        self, port: int, host: Text = "", openmetrics: bool = False
+    ) -> "http.server.ThreadingHTTPServer":
+        """
+        Serve the metrics over HTTP (at any path) in a daemon thread, so that they
+        can be scraped. Call shutdown() on the returned server to stop it.
+
+        :param port: The port to listen on (0 picks a free one)
+        :param host: The address to listen on (all interfaces by default)
+        :param openmetrics: Serve the OpenMetrics format instead of the Prometheus
+        text format
+        :return: The server
+        """
+        # Only imported here, so that importing wikiquote stays fast
+        import http.server
+
+        exporter = self
+        if openmetrics:
+            content_type = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+        else:
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = exporter.render(openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: Text, *args: Any) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(
+            target=server.serve_forever, name="wikiquote-metrics", daemon=True
+        )
+        thread.start()
+        return server
+
+
+def _escape(value: Text) -> Text:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: _LabelSet) -> Text:
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(key, _escape(value).replace('"', '\\"'))
+            for key, value in labels
+        )
+    )
+
+
+def _format_value(value: float) -> Text:
+    return repr(float(value))
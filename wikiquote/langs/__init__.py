@@ -1,36 +1,62 @@
-import glob
 import importlib
-import os
-from typing import List, Text, Tuple
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, List, Optional, Text, Tuple, Union
 
-import lxml
+from .. import instrumentation
 
-modules = [
-    os.path.basename(m)[:-3]
-    for m in glob.glob(os.path.dirname(__file__) + "/*.py")
-    if not m.endswith("__init__.py")
-]
+if TYPE_CHECKING:
+    import lxml.html
 
-lang_dict = {}
+    from .. import utils
 
-for m in modules:
-    module = importlib.import_module("." + m, "wikiquote.langs")
-    lang_dict[m] = module
+# Language modules are only imported when first used, so the supported languages
+# are listed here (each one must have a module of the same name in this package)
+SUPPORTED_LANGUAGES = ["de", "en", "es", "eu", "fr", "he", "it", "pl", "pt"]
 
+lang_dict: Dict[Text, ModuleType] = {}
 
-SUPPORTED_LANGUAGES = modules
 
+def lang_module(lang: Text) -> ModuleType:
+    """
+    Return the module of a language, importing it on first use.
 
-def extract_quotes_lang(
-    lang: Text, html_tree: lxml.html.HtmlElement, max_quotes: int
-) -> List[Text]:
-    return lang_dict[lang].extract_quotes(html_tree, max_quotes)  # type: ignore
+    :param lang: The language code
+    :return: The module
+    """
+    module = lang_dict.get(lang)
+    if module is None:
+        if lang not in SUPPORTED_LANGUAGES:
+            raise KeyError(lang)
+        module = importlib.import_module("." + lang, __name__)
+        lang_dict[lang] = module
+    return module
 
 
-def qotd_lang(lang: Text, html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
-    quote, author = lang_dict[lang].qotd(html_tree)  # type: ignore
+def extract_quotes_lang(
+    lang: Text, html_tree: Union["lxml.html.HtmlElement", Text, bytes], max_quotes: int
+) -> List[Text]:
+    extract_quotes = lang_module(lang).extract_quotes
+    tracer = instrumentation.get_tracer()
+    if tracer is None:
+        return extract_quotes(html_tree, max_quotes)
+    with instrumentation.stage(tracer, "extract_quotes", lang):
+        return extract_quotes(html_tree, max_quotes)
+
+
+def spec_lang(lang: Text) -> Optional["utils.ExtractorSpec"]:
+    return getattr(lang_module(lang), "SPEC", None)
+
+
+def qotd_lang(lang: Text, html_tree: "lxml.html.HtmlElement") -> Tuple[Text, Text]:
+    qotd = lang_module(lang).qotd
+    tracer = instrumentation.get_tracer()
+    if tracer is None:
+        quote, author = qotd(html_tree)
+    else:
+        with instrumentation.stage(tracer, "extract_qotd", lang):
+            quote, author = qotd(html_tree)
     return quote, author.split(",")[0]
 
 
 def main_page_lang(lang: Text) -> Text:
-    return lang_dict[lang].MAIN_PAGE  # type: ignore
+    return lang_module(lang).MAIN_PAGE
@@ -1,31 +1,30 @@
 import re
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 WORD_BLOCKLIST: List[Text] = []
 MAIN_PAGE = "Hauptseite"
 HEADINGS = ["Überprüft"]
+# Ignore all text in italics
+DROP_TAGS = ["i"]
+SPEC = utils.ExtractorSpec(
+    HEADINGS, WORD_BLOCKLIST, DROP_TAGS, stages=[utils.remove_credit]
+)
+QOTD_DIVS = utils.compiled_xpath("div")
+PARENTHESES_RE = re.compile(r"\(.*?\)")
 
 
-def remove_i_tags(tree: lxml.html.HtmlElement) -> None:
-    for i in tree.xpath("//i"):
-        i.getparent().remove(i)
-
-
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    remove_i_tags(tree)
-
-    q_lst = utils.extract_quotes_li(tree, max_quotes, HEADINGS, WORD_BLOCKLIST)
-    return [utils.remove_credit(q) for q in q_lst]
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-ZitatdW")
-    raw_text = tree.xpath("div")[1].text_content().strip()
-    raw_text = re.sub(r"\(.*?\)", "", raw_text)
+    raw_text = QOTD_DIVS(tree)[1].text_content().strip()
+    raw_text = PARENTHESES_RE.sub("", raw_text)
 
     raw_quote = []
     for part in raw_text.split("\n"):
@@ -1,23 +1,23 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 WORD_BLOCKLIST = ["quoted", "Variant:", "Retrieved", "Notes:", "article:"]
 MAIN_PAGE = "Main Page"
 HEADINGS = ["cast", "see also", "external links", "about"]
+SPEC = utils.ExtractorSpec(HEADINGS, WORD_BLOCKLIST, stages=[utils.remove_credit])
+QOTD_ROWS = utils.compiled_xpath("div/div/table/tbody/tr")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    q_lst = utils.extract_quotes_li(tree, max_quotes, HEADINGS, WORD_BLOCKLIST)
-    return [utils.remove_credit(q) for q in q_lst]
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-qotd")
 
-    selector = "div/div/table/tbody/tr"
     # Improvement 1: Handle potential layout changes with multiple selectors
 
     # We currently rely on a single XPath selector to retrieve the quote of the day (QOTD).
@@ -36,7 +36,7 @@ def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
 
     # This approach increases the likelihood of retrieving the QOTD even if the layout changes.n.
 
-    raw_quote = tree.xpath(selector)[0].text_content().split("~")
+    raw_quote = QOTD_ROWS(tree)[0].text_content().split("~")
     quote = raw_quote[0].strip()
     author = raw_quote[1].strip()
     return quote, author
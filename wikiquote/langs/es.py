@@ -1,26 +1,29 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "Portada"
 WORD_BLOCKLIST = ["Fuente:", "Traducción:", "Nota:"]
 HEADINGS = ["enlaces externos", "referencias"]
+SPEC = utils.ExtractorSpec(HEADINGS, WORD_BLOCKLIST)
+QOTD_ROWS = utils.compiled_xpath("div/table/tbody/tr")
+QOTD_AUTHOR = utils.compiled_xpath("td/div/a")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    return utils.extract_quotes_li(tree, max_quotes, HEADINGS, WORD_BLOCKLIST)
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-FDD")
 
-    quote_container = tree.xpath("div/table/tbody/tr")
+    quote_container = QOTD_ROWS(tree)
     raw_quote = quote_container[0].text_content().split("~")
     quote = raw_quote[0].strip()
 
-    raw_author = quote_container[1].xpath("td/div/a")[0].text_content()
+    raw_author = QOTD_AUTHOR(quote_container[1])[0].text_content()
     author = raw_author.strip()
 
     return utils.clean_txt(quote), author
@@ -1,24 +1,24 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 WORD_BLOCKLIST = ["Iturria:", "Jatorrizkoan ", "Testuingurua:"]
 MAIN_PAGE = "Azala"
 HEADINGS = ["kanpo loturak", "erreferentziak"]
+SPEC = utils.ExtractorSpec(HEADINGS, WORD_BLOCKLIST, stages=[utils.remove_credit])
+QOTD_ROWS = utils.compiled_xpath("div/div/table/tbody/tr")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    q_lst = utils.extract_quotes_li(tree, max_quotes, HEADINGS, WORD_BLOCKLIST)
-    return [utils.remove_credit(q) for q in q_lst]
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-qotd")
 
-    selector = "div/div/table/tbody/tr"
-    raw_quote = tree.xpath(selector)[0].text_content().split("~")
+    raw_quote = QOTD_ROWS(tree)[0].text_content().split("~")
     quote = raw_quote[0].strip()
     author = raw_quote[1].strip()
 
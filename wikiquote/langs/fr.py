@@ -1,30 +1,42 @@
+import itertools
 import logging
 import re
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "Wikiquote:Accueil"
 
+QOTD_DIVS = utils.compiled_xpath("div/div")
+QOTD_CELLS = utils.compiled_xpath("table/tbody/tr/td")
+QOTD_QUOTE = utils.compiled_xpath("div/i")
+QOTD_AUTHOR = utils.compiled_xpath("div/a")
+QOTD_RE = re.compile(r"«(.+?)»(.+)")
+
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    # French wiki uses a "citation" HTML class
-    nodes = tree.xpath('//div[@class="citation"]')
-    quotes = [utils.clean_txt(node.text_content()) for node in nodes]
-    return quotes[:max_quotes]
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    # French wiki uses a "citation" HTML class (citations are looked for in the
+    # whole page, including the table of contents)
+    nodes = utils.iter_elements(
+        tree, ["div"], lambda node: node.get("class") == "citation", skip_toc=False
+    )
+    quotes = (utils.clean_txt(node.text_content()) for node in nodes)
+    if max_quotes < 0:
+        return list(quotes)[:max_quotes]
+    return list(itertools.islice(quotes, max_quotes))
 
 
 def qotd_old_method(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-cdj")
-    tree = tree.xpath("div/div")[1].xpath("table/tbody/tr/td")[1]
+    tree = QOTD_CELLS(QOTD_DIVS(tree)[1])[1]
 
-    quote = tree.xpath("div/i")[0].text_content()
-    author = tree.xpath("div/a")[0].text_content()
+    quote = QOTD_QUOTE(tree)[0].text_content()
+    author = QOTD_AUTHOR(tree)[0].text_content()
     return quote, author
 
 
@@ -35,7 +47,7 @@ def qotd_new_method(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     ]
 
     for line in lines:
-        matches = re.search(r"«(.+?)»(.+)", line)
+        matches = QOTD_RE.search(line)
         if not matches:
             continue
 
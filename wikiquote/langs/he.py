@@ -1,16 +1,14 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "עמוד_ראשי"
 HEADINGS = ["הערות שוליים", "ראו גם", "קישורים חיצוניים", "נאמר עליו"]
-
-
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    q_lst = utils.extract_quotes_li(tree, max_quotes, headings=HEADINGS)
-    return [remove_credit_he(q) for q in q_lst]
+QOTD_BOX = utils.compiled_xpath("//div[1]/table[3]/tbody/tr[2]/td")
+QOTD_QUOTE = utils.compiled_xpath("b")
+QOTD_AUTHOR = utils.compiled_xpath("small")
 
 
 def remove_credit_he(quote: Text) -> Text:
@@ -20,10 +18,17 @@ def remove_credit_he(quote: Text) -> Text:
     return quote.strip()
 
 
+SPEC = utils.ExtractorSpec(HEADINGS, stages=[remove_credit_he])
+
+
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
+
+
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
-    quote_box = html_tree.xpath("//div[1]/table[3]/tbody/tr[2]/td")[0]
+    quote_box = QOTD_BOX(html_tree)[0]
 
-    quote = quote_box.xpath("b")[0]
-    author = quote_box.xpath("small")[0]
+    quote = QOTD_QUOTE(quote_box)[0]
+    author = QOTD_AUTHOR(quote_box)[0]
 
     return quote.text_content(), author.text_content()
@@ -1,19 +1,21 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "Pagina_principale"
 HEADINGS = ["Bibliografia", "Opere", "Altri progetti", "Note", "Voci correlate"]
+SPEC = utils.ExtractorSpec(HEADINGS)
+QOTD_DIVS = utils.compiled_xpath("//div[@class='main-page-qotd']/div")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    return utils.extract_quotes_li(tree, max_quotes, HEADINGS)
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
-    tree = html_tree.xpath("//div[@class='main-page-qotd']/div")[2]
+    tree = QOTD_DIVS(html_tree)[2]
 
     quote_container = tree.text_content().split("„")
 
@@ -1,21 +1,23 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "Strona_główna"
+SPEC = utils.ExtractorSpec(stages=[utils.remove_credit])
+QOTD_TITLE = utils.compiled_xpath('.//div[text()="Cytat dnia"]')
+QOTD_ROWS = utils.compiled_xpath("table/tbody/tr")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    q_lst = utils.extract_quotes_li(tree, max_quotes)
-    return [utils.remove_credit(q) for q in q_lst]
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
-    qotd_title = html_tree.xpath('.//div[text()="Cytat dnia"]')[0]
+    qotd_title = QOTD_TITLE(html_tree)[0]
     qotd_element = qotd_title.getnext()
-    qotd_components = qotd_element.xpath("table/tbody/tr")
+    qotd_components = QOTD_ROWS(qotd_element)
 
     quote = qotd_components[0].text_content().strip()
     author = qotd_components[1].text_content().strip()
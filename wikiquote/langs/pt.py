@@ -1,26 +1,25 @@
 from typing import List, Text, Tuple
 
-import lxml
+import lxml.html
 
 from .. import utils
 
 MAIN_PAGE = "Página_principal"
 WORD_BLOCKLIST = ["Fonte"]
 HEADINGS = ["Veja também", "Referências"]
+# Ignore all description elements
+DROP_TAGS = ["dl"]
+SPEC = utils.ExtractorSpec(HEADINGS, WORD_BLOCKLIST, DROP_TAGS)
+QOTD_CELLS = utils.compiled_xpath(".//td")
 
 
-def extract_quotes(tree: lxml.html.HtmlElement, max_quotes: int) -> List[Text]:
-    # Remove all description elements
-    dl_list = tree.xpath("//dl")
-    for dl in dl_list:
-        dl.getparent().remove(dl)
-
-    return utils.extract_quotes_li(tree, max_quotes, HEADINGS, WORD_BLOCKLIST)
+def extract_quotes(tree: utils.HTMLSource, max_quotes: int) -> List[Text]:
+    return SPEC.extract_quotes(tree, max_quotes)
 
 
 def qotd(html_tree: lxml.html.HtmlElement) -> Tuple[Text, Text]:
     tree = html_tree.get_element_by_id("mf-cdd")
-    quote_author = tree.xpath(".//td")[2].text_content().split("-")
+    quote_author = QOTD_CELLS(tree)[2].text_content().split("-")
 
     quote = "-".join(quote_author[:-1]).strip().strip('"')
     author = quote_author[-1].strip()
@@ -0,0 +1,138 @@
+import concurrent.futures
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Text, Tuple
+
+from . import langs, scheduler, store, utils
+from .constants import DEFAULT_LANG, DEFAULT_MAX_QUOTES, DEFAULT_MAX_WORKERS, PAGE_URL
+from .quotes import QuotesResult, _cache_quotes, _cached_quotes, _check_page
+
+
+def _fetch_page(page_title: Text, lang: Text) -> Tuple[bytes, Optional[int]]:
+    """
+    Download a page, and return its (UTF-8 encoded) HTML and revision ID.
+    """
+    data = utils.json_from_url(PAGE_URL.format(lang=lang), page_title)
+    _check_page(data, page_title)
+    return utils.page_html(data).encode("utf-8"), data["parse"].get("revid")
+
+
+def _extract_quotes(lang: Text, html: bytes, max_quotes: int) -> List[Text]:
+    # Runs in the worker processes: only bytes and strings cross process boundaries
+    return langs.extract_quotes_lang(lang, html, max_quotes)
+
+
+@utils.validate_lang
+def harvest_quotes(
+    page_titles: Iterable[Text],
+    max_quotes: int = DEFAULT_MAX_QUOTES,
+    lang: Text = DEFAULT_LANG,
+    fetch_workers: int = DEFAULT_MAX_WORKERS,
+    parse_workers: Optional[int] = None,
+    ordered: bool = False,
+    max_pending: Optional[int] = None,
+    parse_executor: Optional[concurrent.futures.Executor] = None,
+) -> Iterator[Tuple[Text, QuotesResult]]:
+    """
+    Retrieve quotes for many pages, downloading pages using a pool of threads and
+    extracting their quotes using a pool of processes, so that extraction uses all
+    cores. Results are yielded as soon as they are available (or in the order of
+    the titles, if ordered is True).
+
+    Pages are only downloaded while fewer than max_pending pages are being
+    downloaded, parsed or waiting to be yielded, so that memory usage stays bounded
+    when results are consumed slower than they are produced.
+
+    :param page_titles: The titles of the pages
+    :param max_quotes: The maximum number of quotes to extract from each page
+    :param lang: The language of the pages
+    :param fetch_workers: The maximum number of pages downloaded at the same time
+    :param parse_workers: The number of processes extracting quotes (defaults to
+    the number of CPUs)
+    :param ordered: Yield results in the order of the titles
+    :param max_pending: The maximum number of pages in progress (defaults to twice
+    the total number of workers)
+    :param parse_executor: An executor to use instead of creating a pool of
+    processes (it is not shut down)
+    :return: An iterator over (title, quotes or exception) tuples, as
+    quotes_many() would return them
+    """
+    titles = iter(enumerate(dict.fromkeys(page_titles)))
+
+    offline_store = store.get_store()
+    if offline_store is not None:
+        for _, title in titles:
+            try:
+                yield title, offline_store.quotes(lang, title, max_quotes)
+            except Exception as e:
+                yield title, e
+        return
+
+    parse_workers = parse_workers or os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * (fetch_workers + parse_workers)
+    executor = parse_executor
+    if executor is None:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers)
+
+    fetching: Dict[concurrent.futures.Future, Tuple[int, Text]] = {}
+    parsing: Dict[concurrent.futures.Future, Tuple[int, Text, Optional[int]]] = {}
+    # Results waiting to be yielded in order
+    done: Dict[int, Tuple[Text, QuotesResult]] = {}
+    next_index = 0
+
+    fetchers = concurrent.futures.ThreadPoolExecutor(fetch_workers)
+    fetch = scheduler.bind_priority(_fetch_page, scheduler.BULK)
+    try:
+        while True:
+            while len(fetching) + len(parsing) + len(done) < max(max_pending, 1):
+                i, title = next(titles, (-1, ""))
+                if i < 0:
+                    break
+                cached = _cached_quotes(lang, title, max_quotes)
+                if cached is not None:
+                    done[i] = title, cached
+                else:
+                    fetching[fetchers.submit(fetch, title, lang)] = i, title
+
+            # Yield the results that are ready
+            ready = sorted(done) if not ordered else []
+            while ordered and next_index in done:
+                ready.append(next_index)
+                next_index += 1
+            for i in ready:
+                yield done.pop(i)
+            if ready:
+                continue
+            if not fetching and not parsing:
+                break
+
+            futures: Set[concurrent.futures.Future] = set(fetching) | set(parsing)
+            finished, _ = concurrent.futures.wait(
+                futures, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                if future in fetching:
+                    i, title = fetching.pop(future)
+                    try:
+                        html, revid = future.result()
+                    except Exception as e:
+                        done[i] = title, e
+                        continue
+                    parse = executor.submit(_extract_quotes, lang, html, max_quotes)
+                    parsing[parse] = i, title, revid
+                else:
+                    i, title, revid = parsing.pop(future)
+                    try:
+                        page_quotes = future.result()
+                    except Exception as e:
+                        done[i] = title, e
+                        continue
+                    _cache_quotes(lang, title, max_quotes, page_quotes, revid)
+                    done[i] = title, page_quotes
+    finally:
+        # Stop as soon as possible if the iterator is closed early
+        for future in list(fetching) + list(parsing):
+            future.cancel()
+        fetchers.shutdown()
+        if parse_executor is None:
+            executor.shutdown()
@@ -1,17 +1,81 @@
-from typing import Text, Tuple
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Text, Tuple, Union
 
-import lxml.html
+from . import instrumentation, langs, scheduler, singleflight, utils
+from .constants import DEFAULT_LANG, DEFAULT_QOTD_PREFETCH_DELAY, MAINPAGE_URL
 
-from . import langs, utils
-from .constants import DEFAULT_LANG, MAINPAGE_URL
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+QOTDResult = Union[Tuple[Text, Text], Exception]
+
+# The quote of the day changes once per day (at midnight UTC, Wikimedia's server
+# time), so results are kept per language until the day is over
+_daily_cache: Dict[Text, Tuple[datetime.date, Tuple[Text, Text]]] = {}
+_daily_cache_lock = threading.Lock()
+
+# Concurrent calls for a language share one request
+_flights = singleflight.Group()
+
+
+def _utc_today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def _cached_qotd(lang: Text, day: datetime.date) -> Optional[Tuple[Text, Text]]:
+    with _daily_cache_lock:
+        entry = _daily_cache.get(lang)
+    if entry is not None and entry[0] == day:
+        return entry[1]
+    return None
+
+
+def _cache_qotd(lang: Text, day: datetime.date, result: Tuple[Text, Text]) -> None:
+    with _daily_cache_lock:
+        _daily_cache[lang] = (day, result)
+
+
+def clear_cache() -> None:
+    """
+    Forget all quotes of the day retrieved so far.
+    """
+    with _daily_cache_lock:
+        _daily_cache.clear()
 
 
 @utils.validate_lang
+@instrumentation.traced("qotd")
 def quote_of_the_day(lang: Text = DEFAULT_LANG) -> Tuple[Text, Text]:
+    # The day is determined before the request, so that a quote retrieved right
+    # before midnight is not kept for the whole next day
+    day = _utc_today()
+    cached = _cached_qotd(lang, day)
+    if cached is not None:
+        return cached
+
+    key = ("qotd", lang, day, scheduler.current_priority())
+    return _flights.do(key, _retrieve_qotd, lang, day)
+
+
+def _retrieve_qotd(lang: Text, day: datetime.date) -> Tuple[Text, Text]:
     main_page = langs.main_page_lang(lang)
 
     data = utils.json_from_url(MAINPAGE_URL.format(lang=lang), main_page)
-    html_tree = lxml.html.fromstring(data["parse"]["text"]["*"])
+    result = _qotd_from_data(data, lang)
+    _cache_qotd(lang, day, result)
+    return result
+
+
+def _qotd_from_data(data: Dict[Text, Any], lang: Text) -> Tuple[Text, Text]:
+    html = utils.page_html(data)
+    tracer = instrumentation.get_tracer()
+    if tracer is None:
+        html_tree = utils.parse_html(html)
+    else:
+        with instrumentation.stage(tracer, "html_parse"):
+            html_tree = utils.parse_html(html)
 
     try:
         return langs.qotd_lang(lang, html_tree)
@@ -22,3 +86,98 @@ def quote_of_the_day(lang: Text = DEFAULT_LANG) -> Tuple[Text, Text]:
             "If the problem persists, open an issue at: "
             "https://github.com/federicotdn/wikiquote"
         )
+
+
+def all_qotd(languages: Optional[Iterable[Text]] = None) -> Dict[Text, QOTDResult]:
+    """
+    Retrieve the quote of the day of many languages concurrently.
+
+    :param languages: The languages to retrieve the quote of the day for (defaults
+    to all supported languages)
+    :return: A dictionary mapping each language to its (quote, author) tuple, or to
+    the exception quote_of_the_day() raised for it
+    """
+    languages = sorted(
+        languages if languages is not None else langs.SUPPORTED_LANGUAGES
+    )
+    results: Dict[Text, QOTDResult] = {}
+    if not languages:
+        return results
+
+    # Imported here, so that importing wikiquote does not import it
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(languages)) as executor:
+        fetch = scheduler.bind_priority(quote_of_the_day)
+        futures = {executor.submit(fetch, lang=lang): lang for lang in languages}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+
+    return {lang: results[lang] for lang in languages}
+
+
+class QOTDPrefetcher(threading.Thread):
+    """
+    Background thread that retrieves the quotes of the day shortly after they change
+    every day, so that calls to quote_of_the_day() never have to wait for them.
+    """
+
+    def __init__(
+        self,
+        languages: Optional[Iterable[Text]] = None,
+        delay: float = DEFAULT_QOTD_PREFETCH_DELAY,
+    ):
+        """
+        :param languages: The languages to prefetch (defaults to all supported
+        languages)
+        :param delay: Seconds to wait after midnight (UTC) before prefetching
+        """
+        super().__init__(name="wikiquote-qotd-prefetch", daemon=True)
+        self.languages = list(languages) if languages is not None else None
+        self.delay = delay
+        self._stopped = threading.Event()
+
+    def seconds_until_next_prefetch(self) -> float:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        midnight = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=1),
+            datetime.time(),
+            tzinfo=datetime.timezone.utc,
+        )
+        return (midnight - now).total_seconds() + self.delay
+
+    def prefetch(self) -> None:
+        for lang, result in all_qotd(self.languages).items():
+            if isinstance(result, Exception):
+                logger.warning("Could not prefetch QOTD for '%s': %s", lang, result)
+
+    def run(self) -> None:
+        with scheduler.request_priority(scheduler.BULK):
+            self.prefetch()
+            while not self._stopped.wait(self.seconds_until_next_prefetch()):
+                self.prefetch()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def start_qotd_prefetch(
+    languages: Optional[Iterable[Text]] = None,
+    delay: float = DEFAULT_QOTD_PREFETCH_DELAY,
+) -> QOTDPrefetcher:
+    """
+    Start a background thread that retrieves the quotes of the day right away, and
+    then again every day shortly after midnight (UTC). Call stop() on the returned
+    object to stop it.
+
+    :param languages: The languages to prefetch (defaults to all supported
+    languages)
+    :param delay: Seconds to wait after midnight (UTC) before prefetching
+    :return: The prefetching thread
+    """
+    prefetcher = QOTDPrefetcher(languages, delay)
+    prefetcher.start()
+    return prefetcher
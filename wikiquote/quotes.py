@@ -1,16 +1,53 @@
-from typing import Any, Dict, List, Text
-
-import lxml.html
-
-from . import langs, utils
-from .constants import DEFAULT_LANG, DEFAULT_MAX_QUOTES, PAGE_URL, RANDOM_URL, SRCH_URL
-
-
-def _is_disambiguation(categories: List[Dict[Text, Any]]) -> bool:
-    # Checks to see if at least one category includes 'Disambiguation_pages'
-    return not categories or any(
-        [category["*"] == "Disambiguation_pages" for category in categories]
-    )
+import collections
+import random
+import urllib.parse
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    Union,
+)
+
+from . import (
+    cache,
+    index,
+    instrumentation,
+    langs,
+    scheduler,
+    singleflight,
+    store,
+    utils,
+)
+from .constants import (
+    DEFAULT_LANG,
+    DEFAULT_MAX_QUOTES,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_SEARCH_LIMIT,
+    MAX_TITLES_PER_QUERY,
+    PAGE_URL,
+    QUERY_URL,
+    RANDOM_URL,
+    REVISIONS_URL,
+    SECTION_URL,
+    SECTIONS_URL,
+    SRCH_URL,
+)
+
+QuotesResult = Union[List[Text], Exception]
+
+# Concurrent identical lookups share one request (and extraction)
+_flights = singleflight.Group()
+
+
+def _is_disambiguation(categories: List[Text]) -> bool:
+    # Checks to see if at least one category is 'Disambiguation_pages'
+    return not categories or "Disambiguation_pages" in categories
 
 
 @utils.validate_lang
@@ -18,25 +55,199 @@ def search(s: Text, lang: Text = DEFAULT_LANG) -> List[Text]:
     if not s:
         return []
 
+    indexed = _index_search(lang, s)
+    if indexed:
+        return indexed
+
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.search(lang, s)
+
+    cached = _cache_get(lang, "search", s)
+    if cached is not None:
+        return list(cached)
+
+    key = ("search", lang, s, scheduler.current_priority())
+    return list(_flights.do(key, _search_api, s, lang))
+
+
+def _search_api(s: Text, lang: Text) -> List[Text]:
     local_srch_url = SRCH_URL.format(lang=lang)
     data = utils.json_from_url(local_srch_url, s)
-    results = [entry["title"] for entry in data["query"]["search"]]
+    results = _search_results(data)
+    _cache_set(lang, "search", s, list(results))
+    _index_pages(lang, results)
     return results
 
 
+@utils.validate_lang
+def search_quotes(
+    query: Text, lang: Text = DEFAULT_LANG, limit: int = DEFAULT_SEARCH_LIMIT
+) -> List[Tuple[Text, Text]]:
+    """
+    Find the quotes containing a phrase (whose last word is a prefix, unless the
+    query ends with a space), among the quotes of the search index (if it indexes
+    quotes) or else of the quote store. No requests are made: without an index or a
+    store, there are no results.
+
+    :param query: The phrase to search for
+    :param lang: The language of the quotes
+    :param limit: The maximum number of quotes to return
+    :return: (title, quote) tuples, best matches first
+    """
+    search_index = index.get_index()
+    if search_index is not None and search_index.include_quotes:
+        results = search_index.search_quotes(lang, query, limit)
+        if results:
+            return results
+
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.search_quotes(lang, query, limit)
+    return []
+
+
+def _index_search(lang: Text, s: Text) -> List[Text]:
+    search_index = index.get_index()
+    if search_index is None:
+        return []
+    return search_index.search(lang, s)
+
+
+def _index_pages(
+    lang: Text, titles: Iterable[Text], results: Optional[List[Text]] = None
+) -> None:
+    search_index = index.get_index()
+    if search_index is not None:
+        for title in titles:
+            search_index.add_page(lang, title, results)
+
+
+def _cache_get(lang: Text, endpoint: Text, title: Text) -> Optional[Any]:
+    current_cache = cache.get_cache()
+    if current_cache is None:
+        return None
+    return current_cache.get((lang, endpoint, title))
+
+
+def _cache_set(lang: Text, endpoint: Text, title: Text, value: Any) -> None:
+    current_cache = cache.get_cache()
+    if current_cache is not None:
+        current_cache.set((lang, endpoint, title), value)
+
+
+def _cached_quotes(
+    lang: Text, page_title: Text, max_quotes: int
+) -> Optional[List[Text]]:
+    """
+    Return the cached quotes of a page, if at least max_quotes quotes were extracted
+    from it (or if the page does not contain any more quotes).
+    """
+    current_cache = cache.get_cache()
+    if current_cache is None:
+        return None
+
+    entry = current_cache.get(
+        (lang, "quotes", page_title), accept=lambda e: _enough_quotes(e, max_quotes)
+    )
+    return entry["quotes"][:max_quotes] if entry is not None else None
+
+
+def _enough_quotes(entry: Dict[Text, Any], max_quotes: int) -> bool:
+    complete = len(entry["quotes"]) < entry["max_quotes"]
+    return complete or max_quotes <= entry["max_quotes"]
+
+
+def _stale_quotes(
+    lang: Text, page_title: Text, max_quotes: int
+) -> Optional[Dict[Text, Any]]:
+    """
+    Return the expired cache entry of a page, if it can be revalidated (i.e. its
+    revision ID is known) and has enough quotes.
+    """
+    current_cache = cache.get_cache()
+    if current_cache is None:
+        return None
+
+    entry = current_cache.get_stale((lang, "quotes", page_title))
+    if entry is None or entry.get("revid") is None:
+        return None
+    return entry if _enough_quotes(entry, max_quotes) else None
+
+
+def _renew_quotes(lang: Text, page_title: Text) -> None:
+    current_cache = cache.get_cache()
+    if current_cache is not None:
+        current_cache.touch((lang, "quotes", page_title))
+
+
+def _cache_quotes(
+    lang: Text,
+    page_title: Text,
+    max_quotes: int,
+    results: List[Text],
+    revid: Optional[int] = None,
+) -> None:
+    entry = {"max_quotes": max_quotes, "quotes": list(results), "revid": revid}
+    _cache_set(lang, "quotes", page_title, entry)
+    # Retrieved pages are also added to the search index, if there is one
+    _index_pages(lang, [page_title], results)
+
+
+def _search_results(data: Dict[Text, Any]) -> List[Text]:
+    return [entry["title"] for entry in data["query"]["search"]]
+
+
 @utils.validate_lang
 def random_titles(
     lang: Text = DEFAULT_LANG, max_titles: int = DEFAULT_MAX_QUOTES
 ) -> List[Text]:
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.random_titles(lang, max_titles)
+
     local_random_url = RANDOM_URL.format(lang=lang, limit=max_titles)
     data = utils.json_from_url(local_random_url)
-    results = [entry["title"] for entry in data["query"]["random"]]
-    return results
+    return _random_results(data)
+
+
+def _random_results(data: Dict[Text, Any]) -> List[Text]:
+    return [entry["title"] for entry in data["query"]["random"]]
 
 
 @utils.validate_lang
+def random_quote(lang: Text = DEFAULT_LANG) -> Tuple[Text, Text]:
+    """
+    Return a random quote, along with the title of the page it comes from. If a quote
+    store is installed, quotes are picked uniformly from all of its quotes.
+    Otherwise, the quote is picked from the first random page that has any.
+
+    :param lang: The language of the quote
+    :return: A (quote, page title) tuple
+    """
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.random_quote(lang)
+
+    for title in random_titles(lang=lang):
+        try:
+            page_quotes = quotes(title, lang=lang)
+        except (utils.NoSuchPageException, utils.DisambiguationPageException):
+            continue
+        if page_quotes:
+            return random.choice(page_quotes), title
+
+    raise utils.NoSuchPageException("No quotes found in random pages")
+
+
+@utils.validate_lang
+@instrumentation.traced("quotes")
 def quotes(
-    page_title: Text, max_quotes: int = DEFAULT_MAX_QUOTES, lang: Text = DEFAULT_LANG
+    page_title: Text,
+    max_quotes: int = DEFAULT_MAX_QUOTES,
+    lang: Text = DEFAULT_LANG,
+    sections: bool = False,
+    dedupe: bool = False,
 ) -> List[Text]:
     # Improvement 2: Provide functionality for retrieving a random quote
 
@@ -62,12 +273,167 @@ def quotes(
     # or a single random quote from the specified page, without requiring them
     # to import the `random` library themselves.
 
+    if not dedupe:
+        return _quotes(page_title, max_quotes, lang, sections)
+    results = _quotes(page_title, max_quotes, lang, sections)
+    unique = _without_duplicates(results)
+    if len(unique) < len(results) == max_quotes:
+        # Duplicates were removed from a truncated list, so all quotes are needed
+        unique = _without_duplicates(_quotes(page_title, -1, lang, sections))
+    return unique[:max_quotes] if max_quotes >= 0 else unique
+
+
+def _without_duplicates(quotes: List[Text]) -> List[Text]:
+    # Quotes only differing by case, accents, punctuation or spacing are removed
+    return list(utils.postprocess_quotes(quotes, dedupe=True))
+
+
+def _quotes(
+    page_title: Text, max_quotes: int, lang: Text, sections: bool
+) -> List[Text]:
+    # Pages are served from the offline quote store instead, if there is one
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return offline_store.quotes(lang, page_title, max_quotes)
+
+    cached = _cached_quotes(lang, page_title, max_quotes)
+    if cached is not None:
+        return cached
+
+    # Calls are only coalesced within a priority lane, so that interactive callers
+    # never wait for a request queued in the bulk lane
+    lane = scheduler.current_priority()
+    key = ("quotes", lang, page_title, max_quotes, sections, lane)
+    return list(
+        _flights.do(key, _retrieve_quotes, page_title, max_quotes, lang, sections)
+    )
+
+
+def _retrieve_quotes(
+    page_title: Text, max_quotes: int, lang: Text, sections: bool
+) -> List[Text]:
+    # If the page has not changed since it was cached, reuse the expired entry
+    stale = _stale_quotes(lang, page_title, max_quotes)
+    if stale is not None and _current_revision(page_title, lang) == stale["revid"]:
+        _renew_quotes(lang, page_title)
+        return stale["quotes"][:max_quotes]
+
+    results, revid = _fetch_quotes(page_title, max_quotes, lang, sections)
+    _cache_quotes(lang, page_title, max_quotes, results, revid)
+    return results
+
+
+def _fetch_quotes(
+    page_title: Text, max_quotes: int, lang: Text, sections: bool = False
+) -> Tuple[List[Text], Optional[int]]:
+    """
+    Download a page (or only its sections that may contain quotes) and extract its
+    quotes.
+
+    :return: A (quotes, revision ID) tuple
+    """
+    if sections:
+        section_quotes = _fetch_section_quotes(page_title, max_quotes, lang)
+        if section_quotes is not None:
+            return section_quotes
+
     local_page_url = PAGE_URL.format(lang=lang)
     data = utils.json_from_url(local_page_url, page_title)
+    results = _page_quotes(data, page_title, max_quotes, lang)
+    return results, data["parse"].get("revid")
+
+
+def _fetch_section_quotes(
+    page_title: Text, max_quotes: int, lang: Text
+) -> Optional[Tuple[List[Text], Optional[int]]]:
+    """
+    Retrieve the list of sections of a page, and download (concurrently) only the
+    sections whose headings are not skipped by the language's extractor.
+
+    :return: A (quotes, revision ID) tuple, or None if the page can not be split in
+    sections (in which case it should be downloaded whole)
+    """
+    data = utils.json_from_url(SECTIONS_URL.format(lang=lang), page_title)
+    _check_page(data, page_title)
+
+    revid = data["parse"].get("revid")
+    indexes = _quote_sections(data["parse"]["sections"], langs.spec_lang(lang))
+    if revid is None or indexes is None:
+        return None
+    if not indexes:
+        return [], revid
+
+    # Sections are requested by revision ID, so that they all belong to the same
+    # version of the page
+    urls = [
+        SECTION_URL.format(lang=lang, section=index, revid=revid) for index in indexes
+    ]
+    # Imported here, so that importing wikiquote does not import it
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(len(urls), DEFAULT_MAX_WORKERS)
+    ) as executor:
+        fetch = scheduler.bind_priority(utils.json_from_url)
+        sections_data = list(executor.map(fetch, urls))
+
+    html_content = "".join(utils.page_html(d) for d in sections_data)
+    return langs.extract_quotes_lang(lang, html_content, max_quotes), revid
+
+
+def _quote_sections(
+    sections: List[Dict[Text, Any]], spec: Optional[utils.ExtractorSpec]
+) -> Optional[List[Text]]:
+    """
+    Choose the sections of a page to download, given the extractor of the language
+    (headings are matched exactly as it matches them). Only h2 and h3 headings
+    delimit the extractor's sections, and a section is downloaded along with all of
+    its subsections.
+
+    :param sections: The sections returned by action=parse&prop=sections
+    :param spec: The extractor of the language, if it uses one
+    :return: The indexes of the sections to download, or None if the whole page
+    should be downloaded instead
+    """
+    import lxml.html
+
+    levels = [int(section["level"]) for section in sections]
+    # Without h2/h3 headings the extractor uses the whole page, including the lead
+    if (
+        spec is None
+        or not spec.headings
+        or not any(level in (2, 3) for level in levels)
+    ):
+        return None
+
+    indexes = []
+    covered_level = None
+    for section, level in zip(sections, levels):
+        if covered_level is not None and level > covered_level:
+            continue
+        covered_level = None
+        if level > 3:
+            # Part of a skipped section
+            continue
+
+        heading = lxml.html.fragment_fromstring(section["line"], create_parent="h2")
+        if level > 1 and spec.skip_heading(heading):
+            continue
+        if not section["index"].isdigit():
+            # Transcluded from another page, can't be requested on its own
+            return None
+        indexes.append(section["index"])
+        covered_level = level
+
+    return indexes
+
+
+def _check_page(data: Dict[Text, Any], page_title: Text) -> None:
     if "error" in data:
         raise utils.NoSuchPageException("No pages matched the title: " + page_title)
 
-    if _is_disambiguation(data["parse"]["categories"]):
+    categories = [category["category"] for category in data["parse"]["categories"]]
+    if _is_disambiguation(categories):
         # Improvement 4: User-friendly handling of disambiguation
 
         # The current functionality raises an exception when encountering a disambiguation page.
@@ -87,10 +453,15 @@ def quotes(
 
         raise utils.DisambiguationPageException("Title returned a disambiguation page.")
 
-    html_content = data["parse"]["text"]["*"]
-    html_tree = lxml.html.fromstring(html_content)
 
-    
+def _page_quotes(
+    data: Dict[Text, Any], page_title: Text, max_quotes: int, lang: Text
+) -> List[Text]:
+    _check_page(data, page_title)
+
+    # The HTML is parsed incrementally, and only until max_quotes quotes are found
+    html_content = utils.page_html(data)
+
     # Improvement 3: Provide functionality for filtering quotes by length
 
     # The current functionality retrieves all quotes or a single random quote.
@@ -111,4 +482,346 @@ def quotes(
     # This improvement allows users to retrieve quotes based on their desired length,
     # providing more control over the quote selection process.
 
-    return langs.extract_quotes_lang(lang, html_tree, max_quotes)
+    return langs.extract_quotes_lang(lang, html_content, max_quotes)
+
+
+def _chunks(items: List[Text], size: int) -> Iterable[List[Text]]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _query_pages(
+    titles: List[Text], lang: Text, query_url: Text = QUERY_URL
+) -> Dict[Text, Any]:
+    """
+    Query information about many titles at once (following continuations), and
+    return a dictionary with the title normalizations, redirects and pages found.
+    """
+    query: Dict[Text, Any] = {"normalized": {}, "redirects": {}, "pages": {}}
+    continuation: Dict[Text, Text] = {}
+
+    while True:
+        url = query_url.format(lang=lang)
+        for key, value in continuation.items():
+            url += "&{}={}".format(key, urllib.parse.quote(value))
+
+        data = utils.json_from_url(url + "&titles=", "|".join(titles))
+        _merge_query(query, data)
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    return query
+
+
+def _merge_query(query: Dict[Text, Any], data: Dict[Text, Any]) -> None:
+    results = data.get("query", {})
+    for entry in results.get("normalized", []):
+        query["normalized"][entry["from"]] = entry["to"]
+    for entry in results.get("redirects", []):
+        query["redirects"][entry["from"]] = entry["to"]
+    for page in results.get("pages", {}).values():
+        merged = query["pages"].setdefault(page["title"], page)
+        if merged is not page:
+            merged.setdefault("categories", []).extend(page.get("categories", []))
+
+
+def _page_revisions(titles: List[Text], query: Dict[Text, Any]) -> Dict[Text, Any]:
+    revisions = {}
+    for title in titles:
+        page = query["pages"].get(_resolve_title(title, query), {})
+        revids = [revision["revid"] for revision in page.get("revisions", [])]
+        revisions[title] = revids[0] if revids else None
+    return revisions
+
+
+def _current_revision(page_title: Text, lang: Text) -> Optional[int]:
+    # If the revision cannot be checked, the page is downloaded again instead (as in
+    # quotes_many())
+    try:
+        return _revisions([page_title], lang)[page_title]
+    except Exception:
+        return None
+
+
+def _revisions(titles: List[Text], lang: Text) -> Dict[Text, Optional[int]]:
+    """
+    Retrieve the current revision ID of many pages, using one request per batch of
+    titles. Missing pages have a revision ID of None.
+    """
+    revisions = {}
+    for batch in _chunks(titles, MAX_TITLES_PER_QUERY):
+        query = _query_pages(batch, lang, REVISIONS_URL)
+        revisions.update(_page_revisions(batch, query))
+    return revisions
+
+
+def _resolve_title(title: Text, query: Dict[Text, Any]) -> Text:
+    title = query["normalized"].get(title, title)
+    seen = set()
+    while title in query["redirects"] and title not in seen:
+        seen.add(title)
+        title = query["redirects"][title]
+    return title
+
+
+def _query_page_error(
+    page: Optional[Dict[Text, Any]], title: Text
+) -> Optional[Exception]:
+    """
+    Check the information returned by a query for a page, and return the exception
+    quotes() would raise for it (if any).
+    """
+    if page is None or "missing" in page or "invalid" in page:
+        return utils.NoSuchPageException("No pages matched the title: " + title)
+
+    # Category titles include the (localized) namespace, e.g. "Category:Foo bar"
+    categories = [
+        category["title"].split(":", 1)[-1].replace(" ", "_")
+        for category in page.get("categories", [])
+    ]
+    if "disambiguation" in page.get("pageprops", {}) or _is_disambiguation(categories):
+        return utils.DisambiguationPageException(
+            "Title returned a disambiguation page."
+        )
+
+    return None
+
+
+@utils.validate_lang
+def quotes_many(
+    page_titles: Iterable[Text],
+    max_quotes: int = DEFAULT_MAX_QUOTES,
+    lang: Text = DEFAULT_LANG,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    sections: bool = False,
+    dedupe: bool = False,
+) -> Dict[Text, QuotesResult]:
+    """
+    Retrieve quotes for many pages at once. Titles are first resolved (following
+    redirects) and checked in batches using multi-title queries, and only then are
+    the remaining pages downloaded and parsed using a pool of worker threads.
+
+    :param page_titles: The titles of the pages
+    :param max_quotes: The maximum number of quotes to extract from each page
+    :param lang: The language of the pages
+    :param max_workers: The maximum number of pages downloaded at the same time
+    :param sections: Download only the sections of each page that may contain
+    quotes (see quotes())
+    :param dedupe: Remove the quotes that only differ from a previous one of the same
+    page by case, accents, punctuation or spacing (see quotes())
+    :return: A dictionary mapping each title to its list of quotes, or to the
+    exception quotes() would have raised for it
+    """
+    results = _quotes_many(page_titles, max_quotes, lang, max_workers, sections)
+    if not dedupe:
+        return results
+
+    truncated = []
+    for title, result in results.items():
+        if isinstance(result, list):
+            unique = _without_duplicates(result)
+            if len(unique) < len(result) == max_quotes:
+                truncated.append(title)
+            results[title] = unique
+    # Duplicates were removed from truncated lists, so all their quotes are needed
+    if truncated:
+        for title, result in _quotes_many(
+            truncated, -1, lang, max_workers, sections
+        ).items():
+            if isinstance(result, list):
+                result = _without_duplicates(result)[:max_quotes]
+            results[title] = result
+    return results
+
+
+def _quotes_many(
+    page_titles: Iterable[Text],
+    max_quotes: int,
+    lang: Text,
+    max_workers: int,
+    sections: bool,
+) -> Dict[Text, QuotesResult]:
+    titles = list(dict.fromkeys(page_titles))
+    results: Dict[Text, QuotesResult] = {}
+    targets: Dict[Text, List[Text]] = {}
+
+    offline_store = store.get_store()
+    if offline_store is not None:
+        for title in titles:
+            try:
+                results[title] = offline_store.quotes(lang, title, max_quotes)
+            except Exception as e:
+                results[title] = e
+        return results
+
+    stale = {}
+    for title in titles:
+        cached = _cached_quotes(lang, title, max_quotes)
+        if cached is not None:
+            results[title] = cached
+            continue
+        entry = _stale_quotes(lang, title, max_quotes)
+        if entry is not None:
+            stale[title] = entry
+
+    # Reuse expired cache entries of pages that have not changed since
+    if stale:
+        try:
+            revisions = _revisions(list(stale), lang)
+        except Exception:
+            revisions = {}
+        for title, revid in revisions.items():
+            if revid == stale[title]["revid"]:
+                _renew_quotes(lang, title)
+                results[title] = stale[title]["quotes"][:max_quotes]
+
+    pending = [title for title in titles if title not in results]
+    for batch in _chunks(pending, MAX_TITLES_PER_QUERY):
+        try:
+            query = _query_pages(batch, lang)
+        except Exception as e:
+            results.update((title, e) for title in batch)
+            continue
+
+        for title in batch:
+            target = _resolve_title(title, query)
+            error = _query_page_error(query["pages"].get(target), title)
+            if error:
+                results[title] = error
+            else:
+                targets.setdefault(target, []).append(title)
+
+    import concurrent.futures
+
+    fetch = scheduler.bind_priority(_fetch_quotes)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch, target, max_quotes, lang, sections): target
+            for target in targets
+        }
+        for future in concurrent.futures.as_completed(futures):
+            target = futures[future]
+            try:
+                result, revid = future.result()
+            except Exception as e:
+                for title in targets[target]:
+                    results[title] = e
+                continue
+            for title in targets[target]:
+                # Titles leading to the same page do not share the same list
+                results[title] = list(result)
+                _cache_quotes(lang, title, max_quotes, result, revid)
+
+    return {title: results[title] for title in titles}
+
+
+@utils.validate_lang
+def iter_quotes(
+    page_titles: Iterable[Text],
+    max_quotes: int = DEFAULT_MAX_QUOTES,
+    lang: Text = DEFAULT_LANG,
+    window: int = DEFAULT_MAX_WORKERS,
+    sections: bool = False,
+) -> Iterator[Tuple[Text, Text]]:
+    """
+    Lazily yield the quotes of many pages, in the order of the titles. The next
+    pages are retrieved concurrently (using quotes()) while the quotes of the
+    current one are consumed, but only `window` pages are in progress at any time,
+    so memory usage stays bounded. Titles are only read as they are needed, so
+    page_titles may be an infinite iterator. Pages that do not exist and
+    disambiguation pages are skipped.
+
+    :param page_titles: The titles of the pages
+    :param max_quotes: The maximum number of quotes to extract from each page
+    :param lang: The language of the pages
+    :param window: The maximum number of pages retrieved ahead of time
+    :param sections: Download only the sections of each page that may contain
+    quotes (see quotes())
+    :return: An iterator over (title, quote) tuples
+    """
+    import concurrent.futures
+
+    titles = iter(page_titles)
+    pending: Deque[Tuple[Text, concurrent.futures.Future]] = collections.deque()
+    # Pages are retrieved ahead of time, in the bulk lane of the request scheduler
+    fetch = scheduler.bind_priority(quotes, scheduler.BULK)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(window, 1))
+    try:
+        while True:
+            while len(pending) < max(window, 1):
+                title = next(titles, None)
+                if title is None:
+                    break
+                future = executor.submit(fetch, title, max_quotes, lang, sections)
+                pending.append((title, future))
+            if not pending:
+                return
+
+            title, future = pending.popleft()
+            try:
+                page_quotes = future.result()
+            except (utils.NoSuchPageException, utils.DisambiguationPageException):
+                continue
+            for quote in page_quotes:
+                yield title, quote
+    finally:
+        # Do not wait for the pages retrieved ahead if the iterator is closed
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+@utils.validate_lang
+def revalidate_quotes(
+    page_titles: Iterable[Text],
+    lang: Text = DEFAULT_LANG,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Dict[Text, bool]:
+    """
+    Check whether the cached quotes of many pages are still up to date, by comparing
+    their revision IDs with the current ones (using one lightweight request per batch
+    of titles). Entries of pages that have not changed are renewed, and only the
+    pages that have changed are downloaded and parsed again. Pages that can no longer
+    be retrieved are removed from the cache.
+
+    :param page_titles: The titles of the pages
+    :param lang: The language of the pages
+    :param max_workers: The maximum number of pages downloaded at the same time
+    :return: A dictionary mapping each cached title to True if the page changed, or
+    False otherwise
+    """
+    current_cache = cache.get_cache()
+    if current_cache is None:
+        return {}
+
+    entries = {}
+    for title in dict.fromkeys(page_titles):
+        entry = current_cache.get_stale((lang, "quotes", title))
+        if entry is not None and entry.get("revid") is not None:
+            entries[title] = entry
+
+    with scheduler.request_priority(scheduler.BULK):
+        revisions = _revisions(list(entries), lang)
+    changed = {title: revisions[title] != entries[title]["revid"] for title in entries}
+    for title in entries:
+        if not changed[title]:
+            current_cache.touch((lang, "quotes", title))
+
+    def refresh(title: Text) -> None:
+        max_quotes = entries[title]["max_quotes"]
+        try:
+            results, revid = _fetch_quotes(title, max_quotes, lang)
+        except (utils.NoSuchPageException, utils.DisambiguationPageException):
+            current_cache.delete((lang, "quotes", title))
+            return
+        _cache_quotes(lang, title, max_quotes, results, revid)
+
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the results so that errors are propagated
+        refresh_bulk = scheduler.bind_priority(refresh, scheduler.BULK)
+        list(executor.map(refresh_bulk, [title for title in entries if changed[title]]))
+
+    return changed
@@ -0,0 +1,216 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Text, Tuple
+
+from . import scheduler, store, utils
+from .constants import (
+    DEFAULT_LANG,
+    DEFAULT_QUOTES_PER_PAGE,
+    DEFAULT_RESERVOIR_BATCH,
+    DEFAULT_RESERVOIR_SIZE,
+    DEFAULT_TIMEOUT,
+    RESERVOIR_RETRY_DELAY,
+)
+from .quotes import quotes_many, random_titles
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class QuoteReservoir(threading.Thread):
+    """
+    Pool of random quotes per language, from which quotes are drawn in constant
+    time. Once started, a background thread keeps the pool of every language
+    requested so far filled, retrieving batches of random pages (using
+    random_titles() and quotes_many()) whenever quotes are drawn. If the thread is
+    not started, pools are filled by draw() itself when they run out.
+
+    At most quotes_per_page quotes are kept from each page, so that pages with many
+    quotes are not over-represented.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_RESERVOIR_SIZE,
+        batch_size: int = DEFAULT_RESERVOIR_BATCH,
+        quotes_per_page: int = DEFAULT_QUOTES_PER_PAGE,
+    ):
+        """
+        :param size: Number of quotes to keep in the pool of each language
+        :param batch_size: Number of random pages retrieved at a time
+        :param quotes_per_page: Maximum number of quotes kept from each page
+        """
+        super().__init__(name="wikiquote-quote-reservoir", daemon=True)
+        self.size = size
+        self.batch_size = batch_size
+        self.quotes_per_page = quotes_per_page
+        self._pools: Dict[Text, List[Tuple[Text, Text]]] = {}
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+
+    def available(self, lang: Text) -> int:
+        """
+        Return the number of quotes of a language that can be drawn right away.
+
+        :param lang: The language of the quotes
+        :return: The number of quotes in the pool
+        """
+        with self._condition:
+            return len(self._pools.get(lang, []))
+
+    def fill(self, lang: Text) -> int:
+        """
+        Retrieve a batch of random pages, and add some of their quotes to the pool
+        of a language.
+
+        :param lang: The language of the quotes
+        :return: The number of quotes added
+        """
+        with scheduler.request_priority(scheduler.BULK):
+            titles = random_titles(lang=lang, max_titles=self.batch_size)
+            results = quotes_many(titles, lang=lang)
+
+        new_quotes: List[Tuple[Text, Text]] = []
+        for title, result in results.items():
+            if isinstance(result, Exception) or not result:
+                continue
+            count = min(self.quotes_per_page, len(result))
+            new_quotes.extend((quote, title) for quote in random.sample(result, count))
+
+        with self._condition:
+            self._pools.setdefault(lang, []).extend(new_quotes)
+            self._condition.notify_all()
+        return len(new_quotes)
+
+    def draw(
+        self, lang: Text, n: int = 1, timeout: float = DEFAULT_TIMEOUT
+    ) -> List[Tuple[Text, Text]]:
+        """
+        Draw random quotes from the pool of a language, waiting for it to be filled
+        if needed. Each quote is drawn at most once. If not enough quotes can be
+        drawn, the ones drawn so far are put back in the pool.
+
+        :param lang: The language of the quotes
+        :param n: The number of quotes to draw
+        :param timeout: Maximum number of seconds to wait for quotes
+        :return: A list of (quote, page title) tuples
+        """
+        deadline = time.monotonic() + timeout
+        results: List[Tuple[Text, Text]] = []
+        try:
+            while True:
+                with self._condition:
+                    pool = self._pools.setdefault(lang, [])
+                    while pool and len(results) < n:
+                        results.append(_pop_random(pool))
+                    # Wake up the background thread so that it refills the pool
+                    self._condition.notify_all()
+                    if len(results) >= n:
+                        return results
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise utils.NoSuchPageException(
+                            "No quotes found in random pages"
+                        )
+                    if self.is_alive():
+                        self._condition.wait(remaining)
+                        continue
+
+                if not self.fill(lang):
+                    raise utils.NoSuchPageException("No quotes found in random pages")
+        except BaseException:
+            # The quotes drawn so far are put back, so that they are not lost
+            with self._condition:
+                self._pools.setdefault(lang, []).extend(results)
+                self._condition.notify_all()
+            raise
+
+    def run(self) -> None:
+        while not self._stopped.is_set():
+            with self._condition:
+                langs = [
+                    lang for lang, pool in self._pools.items() if len(pool) < self.size
+                ]
+                if not langs:
+                    self._condition.wait()
+                    continue
+
+            for lang in langs:
+                try:
+                    added = self.fill(lang)
+                except Exception as e:
+                    logger.warning(
+                        "Could not fill quote reservoir for '%s': %s", lang, e
+                    )
+                    added = 0
+                if not added:
+                    self._stopped.wait(RESERVOIR_RETRY_DELAY)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+
+def _pop_random(pool: List[Tuple[Text, Text]]) -> Tuple[Text, Text]:
+    # Swap a random element with the last one, so that removing it is O(1)
+    i = random.randrange(len(pool))
+    pool[i], pool[-1] = pool[-1], pool[i]
+    return pool.pop()
+
+
+_reservoir: Optional[QuoteReservoir] = None
+_reservoir_lock = threading.Lock()
+
+
+def get_reservoir() -> QuoteReservoir:
+    """
+    Return the reservoir used by random_quotes(). Unless one was installed using
+    set_reservoir(), a default one is created and started on first use.
+
+    :return: The current reservoir
+    """
+    global _reservoir
+    with _reservoir_lock:
+        if _reservoir is None:
+            _reservoir = QuoteReservoir()
+            _reservoir.start()
+        return _reservoir
+
+
+def set_reservoir(reservoir: Optional[QuoteReservoir]) -> Optional[QuoteReservoir]:
+    """
+    Set the reservoir used by random_quotes(). Passing None makes random_quotes()
+    create a default one again on first use.
+
+    :param reservoir: The new reservoir
+    :return: The previously installed reservoir, if any
+    """
+    global _reservoir
+    with _reservoir_lock:
+        previous, _reservoir = _reservoir, reservoir
+    return previous
+
+
+@utils.validate_lang
+def random_quotes(
+    n: int = 1, lang: Text = DEFAULT_LANG, timeout: float = DEFAULT_TIMEOUT
+) -> List[Tuple[Text, Text]]:
+    """
+    Return random quotes, along with the titles of the pages they come from. If a
+    quote store is installed, quotes are picked uniformly from all of its quotes.
+    Otherwise, they are drawn from a reservoir of quotes from random pages, which is
+    replenished in the background.
+
+    :param n: The number of quotes to return
+    :param lang: The language of the quotes
+    :param timeout: Maximum number of seconds to wait for quotes
+    :return: A list of (quote, page title) tuples
+    """
+    offline_store = store.get_store()
+    if offline_store is not None:
+        return [offline_store.random_quote(lang) for _ in range(n)]
+    return get_reservoir().draw(lang, n, timeout)
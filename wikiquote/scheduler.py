@@ -0,0 +1,374 @@
+import contextlib
+import contextvars
+import email.utils
+import functools
+import heapq
+import http.client
+import io
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Text, Tuple, TypeVar
+
+from . import transport
+from .constants import (
+    DEFAULT_BURST,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAXLAG,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RATE_LIMIT,
+    DEFAULT_RETRY_DELAY,
+    MAX_RETRY_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+T = TypeVar("T")
+
+# Priority lanes: waiting interactive requests are always sent before bulk ones
+INTERACTIVE = 0
+BULK = 1
+
+# Responses signalling that the server is overloaded: the request is retried, and
+# the concurrency of the host is reduced
+THROTTLE_STATUSES = (429, 503)
+# Responses of transient errors, which are retried
+RETRY_STATUSES = THROTTLE_STATUSES + (502, 504)
+# Jittered delays are between 1 and 1 + RETRY_JITTER times the computed delay
+RETRY_JITTER = 0.5
+
+_priority: "contextvars.ContextVar[int]" = contextvars.ContextVar(
+    "wikiquote_request_priority", default=INTERACTIVE
+)
+
+
+@contextlib.contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """
+    Context manager setting the priority lane (INTERACTIVE or BULK) of the requests
+    made by the current thread (or task) within it.
+
+    :param priority: The priority lane
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """
+    Return the priority lane of the requests made by the current thread.
+
+    :return: INTERACTIVE or BULK
+    """
+    return _priority.get()
+
+
+def bind_priority(
+    fn: Callable[..., T], priority: Optional[int] = None
+) -> Callable[..., T]:
+    """
+    Wrap a function so that it makes its requests in a priority lane, which defaults
+    to the lane of the calling thread. Worker threads (e.g. of an executor) do not
+    inherit the lane of the thread submitting work to them, so functions submitted
+    to executors are wrapped with this function.
+
+    :param fn: The function to wrap
+    :param priority: The priority lane, or None for the current one
+    :return: The wrapped function
+    """
+    lane = current_priority() if priority is None else priority
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> T:
+        with request_priority(lane):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def retry_after(value: Optional[Text]) -> Optional[float]:
+    """
+    Parse the value of a Retry-After header, which is either a number of seconds or
+    an HTTP date.
+
+    :param value: The value of the header
+    :return: The number of seconds to wait, or None if the value is missing or
+    invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def is_maxlag_error(body: bytes) -> bool:
+    """
+    Check if an API response is a "maxlag" error, returned (with a 200 status) when
+    the replication lag of the wiki's databases exceeds the maxlag parameter of the
+    request.
+
+    :param body: The response body
+    :return: True if the response is a maxlag error
+    """
+    # Avoid decoding successful responses, which can be large
+    if b'"maxlag"' not in body[:512]:
+        return False
+    try:
+        data = json.loads(body.decode("utf-8"))
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("error", {}).get("code") == "maxlag"
+
+
+class _HostScheduler:
+    """
+    Admission control for the requests to a single host: a token bucket limits the
+    request rate, and an AIMD (additive increase, multiplicative decrease) limit
+    bounds the number of requests in flight. Waiting requests are admitted in order
+    of priority, then arrival.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._refilled = time.monotonic()
+        self._last_decrease = 0.0
+        self._waiting: List[Tuple[int, int]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _wait_time(self, ticket: Tuple[int, int], now: float) -> Optional[float]:
+        """
+        Return 0 if the request holding ticket can be sent now, the number of seconds
+        to wait if only time is missing, or None if it must wait for another request
+        to finish (or to be admitted first).
+        """
+        if self._waiting[0] != ticket:
+            return None
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        slots = int(self.limit)
+        if ticket[0] != INTERACTIVE and slots > 1:
+            # Keep a slot free for interactive requests
+            slots -= 1
+        if self.in_flight >= slots:
+            return None
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def acquire(self, priority: int) -> float:
+        """
+        Wait until a request can be sent.
+
+        :param priority: The priority lane of the request
+        :return: The time at which the request was admitted
+        """
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait_time = self._wait_time(ticket, now)
+                    if wait_time == 0:
+                        break
+                    self._condition.wait(wait_time)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                # The next request in line may be admitted as well
+                self._condition.notify_all()
+
+            self.tokens -= 1
+            self.in_flight += 1
+            return now
+
+    def release(
+        self,
+        admitted: float,
+        succeeded: bool = True,
+        throttled: bool = False,
+        pause: float = 0.0,
+    ) -> None:
+        """
+        Record the end of a request.
+
+        :param admitted: The value returned by acquire() for the request
+        :param succeeded: Whether the server answered normally
+        :param throttled: Whether the server asked to slow down
+        :param pause: Number of seconds during which no request is sent
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                # Only decrease once for the requests that were in flight together
+                if admitted >= self._last_decrease:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                    logger.debug("Concurrency limit reduced to %d", int(self.limit))
+                # Start again slowly once the pause is over
+                self.tokens = min(self.tokens, 0.0)
+            elif succeeded:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if pause:
+                self.paused_until = max(self.paused_until, now + pause)
+            self._condition.notify_all()
+
+
+class SchedulingTransport(transport.Transport):
+    """
+    Transport sending requests through another transport (by default, an
+    HTTPTransport), while scheduling them per host:
+
+    - The request rate is limited by a token bucket.
+    - The number of requests in flight adapts to the server: it is halved whenever
+      the server answers with 429 or 503 or a maxlag error, and increases again
+      slowly while requests succeed.
+    - Throttled and transiently failed requests are retried, after the delay in the
+      Retry-After header if any, or after an exponential backoff. Delays are
+      jittered so that retries are spread out.
+    - Requests are sent in order of priority (see request_priority()), so that
+      interactive requests go ahead of bulk ones, and one slot is kept free for
+      interactive requests. Bulk API requests also carry the maxlag parameter, so
+      that they are rejected first when the wiki is lagging.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[transport.Transport] = None,
+        rate: float = DEFAULT_RATE_LIMIT,
+        burst: int = DEFAULT_BURST,
+        max_concurrency: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        maxlag: Optional[int] = DEFAULT_MAXLAG,
+    ):
+        """
+        :param inner: The transport performing the requests
+        :param rate: Maximum number of requests per second to each host
+        :param burst: Maximum number of requests sent at once after an idle period
+        :param max_concurrency: Maximum number of requests in flight to each host
+        :param max_retries: Maximum number of times a request is retried
+        :param retry_delay: Delay, in seconds, before the first retry of a request
+        when the server does not give one (it doubles with every retry)
+        :param maxlag: The maxlag parameter of bulk API requests, or None to not
+        send it
+        """
+        self.inner = inner if inner is not None else transport.HTTPTransport()
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.maxlag = maxlag
+        self._hosts: Dict[Text, _HostScheduler] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host: Text) -> _HostScheduler:
+        with self._lock:
+            scheduler = self._hosts.get(host)
+            if scheduler is None:
+                scheduler = _HostScheduler(self.rate, self.burst, self.max_concurrency)
+                self._hosts[host] = scheduler
+            return scheduler
+
+    def concurrency_limit(self, host: Text) -> int:
+        """
+        Return the current limit of requests in flight to a host.
+
+        :param host: The host (and port, if any) of the URLs
+        :return: The limit
+        """
+        return int(self._host(host).limit)
+
+    def _backoff(self, attempt: int, delay: Optional[float]) -> float:
+        if delay is None:
+            delay = self.retry_delay * 2**attempt
+        return min(delay, MAX_RETRY_DELAY) * random.uniform(1, 1 + RETRY_JITTER)
+
+    def get(self, url: Text) -> bytes:
+        priority = current_priority()
+        parts = urllib.parse.urlsplit(url)
+        host = self._host(parts.netloc)
+        if (
+            priority != INTERACTIVE
+            and self.maxlag is not None
+            and parts.path.endswith("api.php")
+        ):
+            url += "{}maxlag={}".format("&" if parts.query else "?", self.maxlag)
+
+        attempt = 0
+        while True:
+            admitted = host.acquire(priority)
+            try:
+                body = self.inner.get(url)
+            except urllib.error.HTTPError as e:
+                throttled = e.code in THROTTLE_STATUSES
+                if e.code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    host.release(admitted, e.code < 500, throttled)
+                    raise
+                delay = self._backoff(
+                    attempt, retry_after(e.headers.get("Retry-After"))
+                )
+            except BaseException:
+                host.release(admitted, succeeded=False)
+                raise
+            else:
+                if not is_maxlag_error(body):
+                    host.release(admitted)
+                    return body
+                if attempt >= self.max_retries:
+                    host.release(admitted, succeeded=False, throttled=True)
+                    raise urllib.error.HTTPError(
+                        url,
+                        503,
+                        "Database lag exceeds maxlag",
+                        http.client.HTTPMessage(),
+                        io.BytesIO(body),
+                    )
+                delay = self._backoff(attempt, None)
+                throttled = True
+
+            logger.info(
+                "Request throttled or failed, retrying in %.1f seconds: %s", delay, url
+            )
+            # Throttled requests pause the whole host, others only wait themselves
+            host.release(admitted, False, throttled, delay if throttled else 0.0)
+            if not throttled:
+                time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self.inner.close()
@@ -0,0 +1,137 @@
+import threading
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    TypeVar,
+)
+
+from . import instrumentation
+
+if TYPE_CHECKING:
+    import asyncio
+
+T = TypeVar("T")
+
+_Calls = Dict[Hashable, "asyncio.Future[Any]"]
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        # Set if the call was interrupted by something other than an Exception (e.g.
+        # KeyboardInterrupt), in which case waiting callers make the call themselves
+        self.interrupted = False
+
+
+def _count_coalesced() -> None:
+    tracer = instrumentation.get_tracer()
+    if tracer is not None:
+        tracer.count("coalesced_calls", 1)
+
+
+class Group:
+    """
+    Coalesces identical calls made concurrently by several threads: while a call
+    for a key is in progress, other calls for the same key wait for it and receive
+    its result (or exception) instead of making the call again. Results are shared,
+    so they should not be modified by callers.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call a function, unless a call with the same key is in progress, in which
+        case wait for it instead.
+
+        :param key: The key identifying the call
+        :param fn: The function
+        :return: The result of the function
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    break
+            _count_coalesced()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if not call.interrupted:
+                return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.interrupted = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncGroup:
+    """
+    Asynchronous version of Group: while a coroutine for a key is running, other
+    callers awaiting the same key (in the same event loop) share its result (or
+    exception). The coroutine runs as a task, which is not cancelled when one of
+    its callers is.
+    """
+
+    def __init__(self) -> None:
+        # Tasks belong to an event loop, so calls are tracked per loop
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Calls]"
+        self._loops = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def do(
+        self, key: Hashable, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+    ) -> T:
+        """
+        Await a coroutine function, unless a call with the same key is in progress,
+        in which case wait for it instead.
+
+        :param key: The key identifying the call
+        :param fn: The coroutine function
+        :return: The result of the coroutine
+        """
+        # asyncio is only imported here, so that the synchronous API does not load it
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._loops.setdefault(loop, {})
+
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            calls[key] = task
+            task.add_done_callback(lambda done: _forget(calls, key, done))
+        else:
+            _count_coalesced()
+        return await asyncio.shield(task)
+
+
+def _forget(calls: _Calls, key: Hashable, task: "asyncio.Future[Any]") -> None:
+    if calls.get(key) is task:
+        del calls[key]
+    # All the callers may have been cancelled: the exception is marked as retrieved,
+    # so that it is not reported as never retrieved
+    if not task.cancelled():
+        task.exception()
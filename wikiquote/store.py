@@ -0,0 +1,901 @@
+import array
+import bisect
+import heapq
+import itertools
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import threading
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Text, Tuple
+
+from . import index, utils
+from .constants import DEFAULT_MAX_QUOTES, DEFAULT_SEARCH_LIMIT
+
+# Pages to add to a store, as (lang, title, quotes, revision ID, is disambiguation)
+# tuples
+StoredPage = Tuple[Text, Text, List[Text], Optional[int], bool]
+
+
+# Maximum number of quotes of a page indexed by SQLiteQuoteStore
+_MAX_PAGE_QUOTES = 1 << 20
+# Number of random rows SQLiteQuoteStore.random_quote() tries to pick, before
+# drawing among all the quotes of the language instead
+_RANDOM_ATTEMPTS = 16
+
+
+def normalize_title(title: Text) -> Text:
+    """
+    Normalize a title the way MediaWiki does: underscores are replaced by spaces
+    and the first letter is capitalized.
+
+    :param title: The title to normalize
+    :return: The normalized title
+    """
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+class QuoteStore:
+    """
+    Base class for the stores holding the quotes of every page of a Wikiquote (for
+    example, built from a database dump using dump.ingest_dump()). Once installed
+    using set_store(), quotes(), quotes_many(), search(), search_quotes(),
+    random_titles() and random_quote() are served from the store, without making
+    any requests. Subclasses must implement add_pages(), add_redirects(), _page(),
+    _iter_quotes(), search(), random_titles() and random_quote().
+    """
+
+    def add_pages(self, pages: Iterable[StoredPage]) -> None:
+        """
+        Add (or replace) pages.
+
+        :param pages: (lang, title, quotes, revision ID, is disambiguation) tuples
+        """
+        raise NotImplementedError
+
+    def add_redirects(self, redirects: Iterable[Tuple[Text, Text, Text]]) -> None:
+        """
+        Add (or replace) redirects.
+
+        :param redirects: (lang, title, target title) tuples
+        """
+        raise NotImplementedError
+
+    def _page(
+        self, lang: Text, title: Text, max_quotes: int
+    ) -> Optional[Tuple[List[Text], bool]]:
+        """
+        Return the (quotes, is disambiguation) tuple of a page, following
+        redirects, or None if there is no such page. At least the first max_quotes
+        quotes of the page must be returned.
+        """
+        raise NotImplementedError
+
+    def quotes(
+        self, lang: Text, title: Text, max_quotes: int = DEFAULT_MAX_QUOTES
+    ) -> List[Text]:
+        """
+        Return the quotes of a page, as quotes() would.
+
+        :param lang: The language of the page
+        :param title: The title of the page
+        :param max_quotes: The maximum number of quotes to return
+        :return: The quotes of the page
+        """
+        page = self._page(lang, normalize_title(title), max_quotes)
+        if page is None:
+            raise utils.NoSuchPageException("No pages matched the title: " + title)
+        if page[1]:
+            raise utils.DisambiguationPageException(
+                "Title returned a disambiguation page."
+            )
+        return page[0][:max_quotes]
+
+    def search(
+        self, lang: Text, s: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Text]:
+        """
+        Search the titles of the pages of a language.
+
+        :param lang: The language of the pages
+        :param s: The text to search for
+        :param limit: The maximum number of titles to return
+        :return: The matching titles, best matches first
+        """
+        raise NotImplementedError
+
+    def _iter_quotes(self, lang: Text) -> Iterator[Tuple[Text, Text]]:
+        """
+        Iterate over the (title, quote) tuples of all quotes of a language.
+        """
+        raise NotImplementedError
+
+    def search_quotes(
+        self, lang: Text, query: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Tuple[Text, Text]]:
+        """
+        Search the quotes of a language for a phrase (whose last word is a prefix,
+        unless the query ends with a space). By default, all quotes are scanned,
+        quotes containing the phrase more often (relative to their length) ranking
+        higher.
+
+        :param lang: The language of the quotes
+        :param query: The phrase to search for
+        :param limit: The maximum number of quotes to return
+        :return: (title, quote) tuples, best matches first
+        """
+        words, prefix = index._query(query)
+        if not words:
+            return []
+
+        matches = []
+        for position, (title, quote) in enumerate(self._iter_quotes(lang)):
+            terms = index.tokenize(quote)
+            count = index._phrase_count(terms, words, prefix)
+            if count:
+                matches.append((-count / len(terms), position, title, quote))
+        return [
+            (title, quote) for _, _, title, quote in heapq.nsmallest(limit, matches)
+        ]
+
+    def random_titles(
+        self, lang: Text, max_titles: int = DEFAULT_MAX_QUOTES
+    ) -> List[Text]:
+        """
+        Return the titles of random pages of a language.
+
+        :param lang: The language of the pages
+        :param max_titles: The number of titles to return
+        :return: The titles
+        """
+        raise NotImplementedError
+
+    def random_quote(self, lang: Text) -> Tuple[Text, Text]:
+        """
+        Return a random quote of a language, along with the title of its page.
+
+        :param lang: The language of the quote
+        :return: A (quote, title) tuple
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+class SQLiteQuoteStore(QuoteStore):
+    """
+    Quote store backed by an SQLite database. If SQLite supports it, quotes are
+    indexed using FTS5, so that search_quotes() scales to millions of quotes.
+    """
+
+    def __init__(self, path: Text):
+        """
+        :param path: Path of the database file
+        """
+        # sqlite3 is only imported once a store is created, so that importing
+        # wikiquote stays fast
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (lang TEXT, title TEXT, "
+                "revid INTEGER, disambiguation INTEGER, quotes TEXT, "
+                "PRIMARY KEY (lang, title))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS redirects (lang TEXT, title TEXT, "
+                "target TEXT, PRIMARY KEY (lang, title))"
+            )
+            self._create_quote_rows()
+            self._fts = self._create_quote_index()
+
+    def _create_quote_rows(self) -> None:
+        """
+        Create the table with one row per quote (the row ID of its page and its
+        position in it), used to pick random quotes, if it does not exist yet.
+        """
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'quote_rows'"
+        ).fetchone()
+        if exists:
+            return
+        self._conn.execute(
+            "CREATE TABLE quote_rows (id INTEGER PRIMARY KEY, lang TEXT, "
+            "page INTEGER, position INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX quote_rows_page ON quote_rows (page)")
+
+        # Add the quotes of the pages added before the table existed
+        for rowid, lang, quotes in self._conn.execute(
+            "SELECT rowid, lang, quotes FROM pages"
+        ).fetchall():
+            self._add_quote_rows(rowid, lang, json.loads(quotes))
+
+    def _add_quote_rows(self, rowid: int, lang: Text, quotes: List[Text]) -> None:
+        self._conn.executemany(
+            "INSERT INTO quote_rows (lang, page, position) VALUES (?, ?, ?)",
+            [(lang, rowid, i) for i in range(len(quotes))],
+        )
+
+    def _create_quote_index(self) -> bool:
+        """
+        Create the full-text index of quotes (whose row IDs encode the row ID of
+        the page and the position of the quote in it), if it does not exist yet.
+
+        :return: False if FTS5 is not available, True otherwise
+        """
+        import sqlite3
+
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'quote_terms'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE quote_terms USING fts5(terms)")
+        except sqlite3.OperationalError:
+            return False
+
+        # Index the pages added before the index existed
+        for rowid, quotes in self._conn.execute("SELECT rowid, quotes FROM pages"):
+            self._index_quotes(rowid, json.loads(quotes))
+        return True
+
+    def _index_quotes(self, rowid: int, quotes: List[Text]) -> None:
+        self._conn.executemany(
+            "INSERT INTO quote_terms (rowid, terms) VALUES (?, ?)",
+            [
+                (rowid * _MAX_PAGE_QUOTES + i, " ".join(index.tokenize(quote)))
+                for i, quote in enumerate(quotes[:_MAX_PAGE_QUOTES])
+            ],
+        )
+
+    def add_pages(self, pages: Iterable[StoredPage]) -> None:
+        with self._lock, self._conn:
+            for lang, title, quotes, revid, disambiguation in pages:
+                # Remove the quotes of the page being replaced
+                old = self._conn.execute(
+                    "SELECT rowid FROM pages WHERE lang = ? AND title = ?",
+                    (lang, title),
+                ).fetchone()
+                if old is not None:
+                    self._conn.execute(
+                        "DELETE FROM quote_rows WHERE page = ?", (old[0],)
+                    )
+                if old is not None and self._fts:
+                    self._conn.execute(
+                        "DELETE FROM quote_terms WHERE rowid >= ? AND rowid < ?",
+                        (old[0] * _MAX_PAGE_QUOTES, (old[0] + 1) * _MAX_PAGE_QUOTES),
+                    )
+
+                cursor = self._conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                    (lang, title, revid, int(disambiguation), json.dumps(quotes)),
+                )
+                if cursor.lastrowid is not None:
+                    self._add_quote_rows(cursor.lastrowid, lang, quotes)
+                if self._fts and cursor.lastrowid is not None:
+                    self._index_quotes(cursor.lastrowid, quotes)
+
+    def add_redirects(self, redirects: Iterable[Tuple[Text, Text, Text]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)", list(redirects)
+            )
+
+    def _page(
+        self, lang: Text, title: Text, max_quotes: int
+    ) -> Optional[Tuple[List[Text], bool]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT quotes, disambiguation FROM pages WHERE lang = ? AND title = "
+                "coalesce((SELECT target FROM redirects WHERE lang = ? AND title = ?),"
+                " ?)",
+                (lang, lang, title, title),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), bool(row[1])
+
+    def search(
+        self, lang: Text, s: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Text]:
+        if not s:
+            return []
+
+        pattern = s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title FROM pages WHERE lang = ? AND title LIKE ? ESCAPE '\\' "
+                "ORDER BY lower(title) = lower(?) DESC, "
+                "title LIKE ? ESCAPE '\\' DESC, title LIMIT ?",
+                (lang, "%" + pattern + "%", s, pattern + "%", limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _iter_quotes(self, lang: Text) -> Iterator[Tuple[Text, Text]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, quotes FROM pages WHERE lang = ? ORDER BY title",
+                (lang,),
+            ).fetchall()
+        for title, quotes in rows:
+            for quote in json.loads(quotes):
+                yield title, quote
+
+    def search_quotes(
+        self, lang: Text, query: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Tuple[Text, Text]]:
+        words, prefix = index._query(query)
+        if not self._fts or not words:
+            return super().search_quotes(lang, query, limit)
+
+        # Terms only contain word characters, so they need no escaping
+        match = '"{}"{}'.format(" ".join(words), "*" if prefix else "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pages.title, pages.quotes, quote_terms.rowid FROM quote_terms "
+                "JOIN pages ON pages.rowid = quote_terms.rowid / ? "
+                "WHERE quote_terms MATCH ? AND pages.lang = ? "
+                "ORDER BY quote_terms.rank LIMIT ?",
+                (_MAX_PAGE_QUOTES, match, lang, limit),
+            ).fetchall()
+        return [
+            (title, json.loads(quotes)[rowid % _MAX_PAGE_QUOTES])
+            for title, quotes, rowid in rows
+        ]
+
+    def random_titles(
+        self, lang: Text, max_titles: int = DEFAULT_MAX_QUOTES
+    ) -> List[Text]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title FROM pages WHERE lang = ? ORDER BY random() LIMIT ?",
+                (lang, max_titles),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def random_quote(self, lang: Text) -> Tuple[Text, Text]:
+        # Quotes are picked uniformly by picking random IDs of quote rows, until one
+        # of them exists and belongs to the language. If quotes of the language are
+        # too sparse, a quote is drawn among all of them instead (which is slower).
+        query = (
+            "SELECT pages.title, pages.quotes, quote_rows.position FROM quote_rows "
+            "JOIN pages ON pages.rowid = quote_rows.page WHERE quote_rows.lang = ? "
+        )
+        row = None
+        with self._lock:
+            max_id = self._conn.execute("SELECT max(id) FROM quote_rows").fetchone()[0]
+            for _ in range(_RANDOM_ATTEMPTS if max_id is not None else 0):
+                row = self._conn.execute(
+                    query + "AND quote_rows.id = ?", (lang, random.randint(1, max_id))
+                ).fetchone()
+                if row is not None:
+                    break
+            else:
+                row = self._conn.execute(
+                    query + "ORDER BY random() LIMIT 1", (lang,)
+                ).fetchone()
+        if row is None:
+            raise utils.NoSuchPageException("No quotes found for language: " + lang)
+        title, quotes, position = row
+        return json.loads(quotes)[position], title
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+
+# File format of compact stores: the magic number, the length of a JSON header, the
+# header, and then the arrays and UTF-8 blobs of each language (8-byte aligned)
+_COMPACT_MAGIC = b"WQSTORE1"
+_COMPACT_HEADER = struct.Struct("<8sQ")
+
+
+class _CompactLang:
+    """
+    The (zero-copy) views over the arrays of one language of a compact store:
+    - titles / title_offsets: The sorted titles of all pages, as one UTF-8 blob and
+      the offset of each title in it
+    - quote_ranges: The index of the first quote of each page (plus a final entry),
+      so that page i has quotes quote_ranges[i] to quote_ranges[i + 1]
+    - flags: 1 for disambiguation pages, 0 otherwise
+    - quotes / quote_offsets: All quotes, as one UTF-8 blob and the offset of each
+      quote in it
+    - redirects / redirect_offsets / redirect_targets: The sorted titles of the
+      redirects, and the index of the page each one leads to
+    - title_keys / title_key_offsets: The lowercase titles, in the same order, each
+      one preceded by a newline (and the last one followed by one), so that titles
+      can be searched for substrings without decoding them
+    - terms / term_offsets / posting_ranges / postings: The sorted terms of all
+      quotes (see index.tokenize()), and the sorted indexes of the quotes
+      containing each term, so that term i is in quotes postings[posting_ranges[i]]
+      to postings[posting_ranges[i + 1] - 1]
+
+    The title keys and terms are missing from files written by older versions.
+    """
+
+    def __init__(self, buf: memoryview, info: Dict[Text, Any]):
+        self.views: List[memoryview] = []
+
+        def view(name: Text) -> memoryview:
+            offset, length = info[name]
+            raw = buf[offset : offset + length]
+            self.views.append(raw)
+            return raw
+
+        def integers(name: Text) -> memoryview:
+            integers = view(name).cast("Q")
+            self.views.append(integers)
+            return integers
+
+        self.titles = view("titles")
+        self.title_offsets = integers("title_offsets")
+        self.quote_ranges = integers("quote_ranges")
+        self.flags = view("flags")
+        self.quotes = view("quotes")
+        self.quote_offsets = integers("quote_offsets")
+        self.redirects = view("redirects")
+        self.redirect_offsets = integers("redirect_offsets")
+        self.redirect_targets = integers("redirect_targets")
+        self.indexed = "terms" in info
+        if self.indexed:
+            self.title_keys = view("title_keys")
+            self.title_key_offsets = integers("title_key_offsets")
+            self.terms = view("terms")
+            self.term_offsets = integers("term_offsets")
+            self.posting_ranges = integers("posting_ranges")
+            self.postings = integers("postings")
+
+    @property
+    def page_count(self) -> int:
+        return len(self.title_offsets) - 1
+
+    @property
+    def quote_count(self) -> int:
+        return len(self.quote_offsets) - 1
+
+    def title(self, i: int) -> Text:
+        return str(
+            self.titles[self.title_offsets[i] : self.title_offsets[i + 1]], "utf-8"
+        )
+
+    def quote(self, i: int) -> Text:
+        return str(
+            self.quotes[self.quote_offsets[i] : self.quote_offsets[i + 1]], "utf-8"
+        )
+
+    def find(self, title: Text) -> Optional[int]:
+        """
+        Return the index of a page (following redirects), or None.
+        """
+        key = title.encode("utf-8")
+        i = _find(self.titles, self.title_offsets, key)
+        if i is not None:
+            return i
+        i = _find(self.redirects, self.redirect_offsets, key)
+        return self.redirect_targets[i] if i is not None else None
+
+    def quote_page(self, q: int) -> int:
+        """
+        Return the index of the page of a quote.
+        """
+        return bisect.bisect_right(self.quote_ranges, q) - 1
+
+    def postings_of(self, term: Text, prefix: bool) -> memoryview:
+        """
+        Return the sorted indexes of the quotes containing a term (or, if prefix is
+        True, any term starting with it). As terms are sorted, the postings of all
+        the terms starting with a prefix are contiguous, but may contain duplicates.
+        """
+        key = term.encode("utf-8")
+        start = _lower_bound(self.terms, self.term_offsets, key)
+        if prefix:
+            # No UTF-8 encoded string contains the byte 0xff
+            end = _lower_bound(self.terms, self.term_offsets, key + b"\xff")
+        elif _string(self.terms, self.term_offsets, start) == key:
+            end = start + 1
+        else:
+            end = start
+        return self.postings[self.posting_ranges[start] : self.posting_ranges[end]]
+
+    def title_matches(self, key: bytes) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over the (index, position) of the first occurrence of some bytes in
+        each title key, in the order of the titles (a position of 1 meaning that
+        the title starts with them).
+        """
+        pattern = re.compile(re.escape(key))
+        match = pattern.search(self.title_keys)
+        while match is not None:
+            i = bisect.bisect_right(self.title_key_offsets, match.start()) - 1
+            yield i, match.start() - self.title_key_offsets[i]
+            match = pattern.search(self.title_keys, self.title_key_offsets[i + 1])
+
+    def release(self) -> None:
+        for view in reversed(self.views):
+            view.release()
+
+
+def _string(blob: memoryview, offsets: memoryview, i: int) -> Optional[bytes]:
+    if i >= len(offsets) - 1:
+        return None
+    return bytes(blob[offsets[i] : offsets[i + 1]])
+
+
+def _lower_bound(blob: memoryview, offsets: memoryview, key: bytes) -> int:
+    # Binary search over a sorted blob of UTF-8 strings
+    lo, hi = 0, len(offsets) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if bytes(blob[offsets[mid] : offsets[mid + 1]]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _find(blob: memoryview, offsets: memoryview, key: bytes) -> Optional[int]:
+    i = _lower_bound(blob, offsets, key)
+    return i if _string(blob, offsets, i) == key else None
+
+
+class CompactQuoteStore(QuoteStore):
+    """
+    Read-only quote store, stored in a compact file built with CompactStoreBuilder.
+    The file is memory-mapped, so that all the processes reading it share the same
+    copy in memory, and only the quotes requested are decoded.
+    """
+
+    def __init__(self, path: Text):
+        """
+        :param path: Path of the store file
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _COMPACT_HEADER.unpack_from(self._mmap)
+        if magic != _COMPACT_MAGIC:
+            self._mmap.close()
+            raise ValueError("Not a compact quote store: {}".format(path))
+
+        start = _COMPACT_HEADER.size
+        header = json.loads(self._mmap[start : start + header_length].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            self._mmap.close()
+            raise ValueError("Compact quote store built on a different platform")
+
+        data_start = start + header_length
+        data_start += -data_start % 8
+        self._mmap_view = memoryview(self._mmap)
+        self._buf = self._mmap_view[data_start:]
+        self._langs = {
+            lang: _CompactLang(self._buf, info)
+            for lang, info in header["langs"].items()
+        }
+
+    def add_pages(self, pages: Iterable[StoredPage]) -> None:
+        raise TypeError("Compact quote stores are read-only")
+
+    def add_redirects(self, redirects: Iterable[Tuple[Text, Text, Text]]) -> None:
+        raise TypeError("Compact quote stores are read-only")
+
+    def _page(
+        self, lang: Text, title: Text, max_quotes: int
+    ) -> Optional[Tuple[List[Text], bool]]:
+        section = self._langs.get(lang)
+        i = section.find(title) if section is not None else None
+        if section is None or i is None:
+            return None
+
+        start, end = section.quote_ranges[i], section.quote_ranges[i + 1]
+        if max_quotes >= 0:
+            end = min(end, start + max_quotes)
+        quotes = [section.quote(q) for q in range(start, end)]
+        return quotes, bool(section.flags[i])
+
+    def _iter_quotes(self, lang: Text) -> Iterator[Tuple[Text, Text]]:
+        section = self._langs.get(lang)
+        if section is None:
+            return
+        for i in range(section.page_count):
+            start, end = section.quote_ranges[i], section.quote_ranges[i + 1]
+            if start < end:
+                title = section.title(i)
+                for q in range(start, end):
+                    yield title, section.quote(q)
+
+    def search(
+        self, lang: Text, s: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Text]:
+        section = self._langs.get(lang)
+        if not s or section is None:
+            return []
+
+        s = s.lower()
+        if section.indexed:
+            return _search_title_keys(section, s, limit)
+
+        matches = []
+        for i in range(section.page_count):
+            title = section.title(i)
+            lower = title.lower()
+            if s in lower:
+                matches.append((lower != s, not lower.startswith(s), title))
+        return [title for _, _, title in sorted(matches)[:limit]]
+
+    def search_quotes(
+        self, lang: Text, query: Text, limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[Tuple[Text, Text]]:
+        section = self._langs.get(lang)
+        if section is None or not section.indexed:
+            return super().search_quotes(lang, query, limit)
+        words, prefix = index._query(query)
+        if not words:
+            return []
+
+        # Only the quotes containing all the words are checked for the phrase
+        candidates: Optional[Set[int]] = None
+        for i, word in enumerate(words):
+            postings = set(section.postings_of(word, prefix and i == len(words) - 1))
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+
+        matches = []
+        for q in sorted(candidates or ()):
+            quote = section.quote(q)
+            terms = index.tokenize(quote)
+            count = index._phrase_count(terms, words, prefix)
+            if count:
+                title = section.title(section.quote_page(q))
+                matches.append((-count / len(terms), q, title, quote))
+        return [
+            (title, quote) for _, _, title, quote in heapq.nsmallest(limit, matches)
+        ]
+
+    def random_titles(
+        self, lang: Text, max_titles: int = DEFAULT_MAX_QUOTES
+    ) -> List[Text]:
+        section = self._langs.get(lang)
+        if section is None:
+            return []
+        count = section.page_count
+        return [
+            section.title(i)
+            for i in random.sample(range(count), min(max_titles, count))
+        ]
+
+    def random_quote(self, lang: Text) -> Tuple[Text, Text]:
+        section = self._langs.get(lang)
+        if section is None or not section.quote_count:
+            raise utils.NoSuchPageException("No quotes found for language: " + lang)
+
+        q = random.randrange(section.quote_count)
+        return section.quote(q), section.title(section.quote_page(q))
+
+    def close(self) -> None:
+        for section in self._langs.values():
+            section.release()
+        self._langs = {}
+        self._buf.release()
+        self._mmap_view.release()
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return sum(section.page_count for section in self._langs.values())
+
+
+def _search_title_keys(section: _CompactLang, s: Text, limit: int) -> List[Text]:
+    # Same order as the scan: exact matches, then prefix matches, then the others,
+    # in the order of the titles
+    if "\n" in s:
+        return []
+    key = s.encode("utf-8")
+    exact = list(
+        itertools.islice(
+            (i for i, _ in section.title_matches(b"\n" + key + b"\n")), limit
+        )
+    )
+    found = set(exact)
+    prefixes = list(
+        itertools.islice(
+            (i for i, _ in section.title_matches(b"\n" + key) if i not in found),
+            limit - len(exact),
+        )
+    )
+    found.update(prefixes)
+    others = list(
+        itertools.islice(
+            (i for i, position in section.title_matches(key) if position != 1),
+            limit - len(found),
+        )
+    )
+    return [section.title(i) for i in exact + prefixes + others]
+
+
+class CompactStoreBuilder:
+    """
+    Builder of the files read by CompactQuoteStore. Pages and redirects are added
+    using add_pages() and add_redirects() (so a builder can be passed to
+    dump.ingest_dump()), and the file is written by close(). Quotes are spooled to a
+    temporary file while building, so only titles are kept in memory.
+    """
+
+    def __init__(self, path: Text):
+        """
+        :param path: Path of the store file to write
+        """
+        import tempfile
+
+        self.path = path
+        self._spool: IO[bytes] = tempfile.TemporaryFile()
+        # lang -> title -> (spool offset, quote lengths, is disambiguation)
+        self._pages: Dict[Text, Dict[Text, Tuple[int, "array.array[int]", bool]]] = {}
+        self._redirects: Dict[Text, Dict[Text, Text]] = {}
+
+    def add_pages(self, pages: Iterable[StoredPage]) -> None:
+        for lang, title, quotes, _, disambiguation in pages:
+            offset = self._spool.seek(0, os.SEEK_END)
+            lengths = array.array("Q")
+            for quote in quotes:
+                data = quote.encode("utf-8")
+                self._spool.write(data)
+                lengths.append(len(data))
+            self._pages.setdefault(lang, {})[title] = (offset, lengths, disambiguation)
+
+    def add_redirects(self, redirects: Iterable[Tuple[Text, Text, Text]]) -> None:
+        for lang, title, target in redirects:
+            self._redirects.setdefault(lang, {})[title] = target
+
+    def close(self) -> None:
+        """
+        Write the store file.
+        """
+        import shutil
+        import tempfile
+
+        langs = sorted(set(self._pages) | set(self._redirects))
+        tmp_path = self.path + ".tmp"
+        # Offsets in the header are relative to the start of the data, which is only
+        # known once the header has been written
+        with tempfile.TemporaryFile() as data:
+            sections = {lang: self._write_lang(data, lang) for lang in langs}
+            header = json.dumps({"byteorder": sys.byteorder, "langs": sections})
+            encoded = header.encode("utf-8")
+            with open(tmp_path, "wb") as out:
+                out.write(_COMPACT_HEADER.pack(_COMPACT_MAGIC, len(encoded)))
+                out.write(encoded)
+                out.write(b"\0" * (-out.tell() % 8))
+                data.seek(0)
+                shutil.copyfileobj(data, out)
+        os.replace(tmp_path, self.path)
+        self._spool.close()
+
+    def _write_lang(self, out: IO[bytes], lang: Text) -> Dict[Text, Tuple[int, int]]:
+        def write(name: Text, data: bytes) -> None:
+            out.write(b"\0" * (-out.tell() % 8))
+            info[name] = (out.tell(), len(data))
+            out.write(data)
+
+        info: Dict[Text, Tuple[int, int]] = {}
+        pages = self._pages.get(lang, {})
+        titles = sorted(pages, key=lambda t: t.encode("utf-8"))
+        ids = {title: i for i, title in enumerate(titles)}
+
+        title_offsets, blob = _offsets(titles)
+        write("titles", blob)
+        write("title_offsets", title_offsets.tobytes())
+        title_key_offsets, blob = _offsets(["\n" + title.lower() for title in titles])
+        write("title_keys", blob + b"\n")
+        write("title_key_offsets", title_key_offsets.tobytes())
+
+        # Quotes are copied from the spool in the order of the titles, and their
+        # terms indexed (the postings of the terms of a language are kept in memory)
+        quote_ranges = array.array("Q", [0])
+        quote_offsets = array.array("Q", [0])
+        flags = bytearray()
+        postings: Dict[Text, "array.array[int]"] = {}
+        out.write(b"\0" * (-out.tell() % 8))
+        quotes_start = out.tell()
+        for title in titles:
+            offset, lengths, disambiguation = pages[title]
+            self._spool.seek(offset)
+            data = self._spool.read(sum(lengths))
+            out.write(data)
+            start = 0
+            for length in lengths:
+                q = len(quote_offsets) - 1
+                quote = str(data[start : start + length], "utf-8")
+                for term in set(index.tokenize(quote)):
+                    postings.setdefault(term, array.array("Q")).append(q)
+                start += length
+                quote_offsets.append(quote_offsets[-1] + length)
+            quote_ranges.append(len(quote_offsets) - 1)
+            flags.append(int(disambiguation))
+        info["quotes"] = (quotes_start, out.tell() - quotes_start)
+        write("quote_offsets", quote_offsets.tobytes())
+        write("quote_ranges", quote_ranges.tobytes())
+        write("flags", bytes(flags))
+
+        terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+        term_offsets, blob = _offsets(terms)
+        write("terms", blob)
+        write("term_offsets", term_offsets.tobytes())
+        posting_ranges = array.array("Q", [0])
+        for term in terms:
+            posting_ranges.append(posting_ranges[-1] + len(postings[term]))
+        write("posting_ranges", posting_ranges.tobytes())
+        out.write(b"\0" * (-out.tell() % 8))
+        postings_start = out.tell()
+        for term in terms:
+            postings[term].tofile(out)
+        info["postings"] = (postings_start, out.tell() - postings_start)
+
+        # Redirects to missing pages are dropped
+        redirects = {
+            title: ids[target]
+            for title, target in self._redirects.get(lang, {}).items()
+            if target in ids and title not in ids
+        }
+        redirect_titles = sorted(redirects, key=lambda t: t.encode("utf-8"))
+        redirect_offsets, blob = _offsets(redirect_titles)
+        write("redirects", blob)
+        write("redirect_offsets", redirect_offsets.tobytes())
+        targets = array.array("Q", [redirects[title] for title in redirect_titles])
+        write("redirect_targets", targets.tobytes())
+        return info
+
+    def __enter__(self) -> "CompactStoreBuilder":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self._spool.close()
+
+
+def _offsets(strings: List[Text]) -> Tuple["array.array[int]", bytes]:
+    offsets = array.array("Q", [0])
+    encoded = [string.encode("utf-8") for string in strings]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return offsets, b"".join(encoded)
+
+
+_store: Optional[QuoteStore] = None
+
+
+def get_store() -> Optional[QuoteStore]:
+    """
+    Return the quote store currently used to serve all API functions offline, or
+    None if the Wikiquote API is used (the default).
+
+    :return: The current quote store
+    """
+    return _store
+
+
+def set_store(store: Optional[QuoteStore]) -> Optional[QuoteStore]:
+    """
+    Set the quote store used to serve quotes(), quotes_many(), search() and
+    random_titles() offline. Passing None goes back to using the Wikiquote API.
+
+    :param store: The new quote store
+    :return: The previously installed store, if any
+    """
+    global _store
+    previous, _store = _store, store
+    return previous
@@ -0,0 +1,259 @@
+import gzip
+import http.client
+import io
+import threading
+import urllib.error
+import urllib.parse
+import zlib
+from typing import Dict, List, Optional, Text, Tuple
+
+from . import instrumentation
+from .constants import (
+    DEFAULT_MAX_REDIRECTS,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_TIMEOUT,
+    USER_AGENT,
+)
+
+# Errors raised by http.client when a kept-alive connection was closed by the server
+# while it sat idle in the pool. Requests that fail this way are retried once on a
+# fresh connection.
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+_PoolKey = Tuple[Text, Text, int]
+
+
+class Transport:
+    """
+    Base class for the objects used to perform HTTP GET requests against the Wikiquote
+    API. Subclasses only need to implement get(). A different transport can be
+    installed using set_transport(), which is useful for testing against a local fake
+    server.
+    """
+
+    def get(self, url: Text) -> bytes:
+        """
+        Perform an HTTP GET request and return the (decoded) response body.
+
+        :param url: The URL to retrieve
+        :return: The response body
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources (e.g. open connections) held by the transport."""
+
+
+class _ConnectionPool:
+    """
+    A thread-safe pool of idle persistent connections to a single host.
+    """
+
+    def __init__(self, scheme: Text, host: Text, port: int, timeout: float, size: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.size = size
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Return an idle connection if there is one, or a new one otherwise.
+
+        :return: A (connection, reused) tuple
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.new_connection(), False
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class HTTPTransport(Transport):
+    """
+    Transport using persistent (keep-alive) connections, pooled per host. Compressed
+    responses (gzip/deflate) are transparently decoded.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        user_agent: Text = USER_AGENT,
+        max_redirects: int = DEFAULT_MAX_REDIRECTS,
+    ):
+        """
+        :param timeout: Socket timeout, in seconds, for connecting and reading
+        :param pool_size: Maximum number of idle connections kept open per host
+        :param user_agent: Value of the User-Agent header sent with every request
+        :param max_redirects: Maximum number of redirects to follow per request
+        """
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self._pools: Dict[_PoolKey, _ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme: Text, host: Text, port: int) -> _ConnectionPool:
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _ConnectionPool(scheme, host, port, self.timeout, self.pool_size)
+                self._pools[key] = pool
+            return pool
+
+    def _request(self, url: Text) -> Tuple[int, Text, http.client.HTTPMessage, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "https"
+        if scheme not in ("http", "https"):
+            raise ValueError("Unsupported URL scheme: {}".format(scheme))
+
+        port = parts.port or (443 if scheme == "https" else 80)
+        pool = self._pool(scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        headers = {
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+            "User-Agent": self.user_agent,
+        }
+
+        tracer = instrumentation.get_tracer()
+        conn, reused = pool.acquire()
+        while True:
+            try:
+                if tracer is not None and conn.sock is None:
+                    # Connect explicitly (request() would do it otherwise), so that
+                    # the DNS lookup and handshakes are timed on their own
+                    with instrumentation.stage(tracer, "connect"):
+                        conn.connect()
+                conn.request("GET", path, headers=headers)
+                res = conn.getresponse()
+                body = res.read()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped the idle connection, try again on a new one
+                conn, reused = pool.new_connection(), False
+                continue
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        if res.will_close:
+            conn.close()
+        else:
+            pool.release(conn)
+
+        if tracer is not None:
+            tracer.count("received_bytes", len(body))
+        encoding = res.headers.get("Content-Encoding")
+        return res.status, res.reason, res.headers, decode_body(body, encoding)
+
+    def get(self, url: Text) -> bytes:
+        for _ in range(self.max_redirects + 1):
+            status, reason, headers, body = self._request(url)
+            location = headers.get("Location")
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urllib.parse.urljoin(url, location)
+                continue
+            if status >= 400:
+                raise urllib.error.HTTPError(
+                    url, status, reason, headers, io.BytesIO(body)
+                )
+            return body
+
+        raise urllib.error.HTTPError(
+            url, status, "Too many redirects", headers, io.BytesIO(body)
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+def decode_body(body: bytes, content_encoding: Optional[Text]) -> bytes:
+    """
+    Decode a response body according to its Content-Encoding header.
+
+    :param body: The raw response body
+    :param content_encoding: The value of the Content-Encoding header, if any
+    :return: The decoded body
+    """
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate streams without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """
+    Return the transport currently used for all requests, creating a default
+    HTTPTransport if none has been set.
+
+    :return: The current transport
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
+
+
+def set_transport(transport: Optional[Transport]) -> Optional[Transport]:
+    """
+    Replace the transport used for all requests. Passing None restores the default
+    HTTPTransport on the next request.
+
+    :param transport: The new transport
+    :return: The previously installed transport, if any
+    """
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    return previous
@@ -1,21 +1,48 @@
+import collections
+import functools
+import inspect
+import itertools
 import json
-import re
+import threading
+import time
 import urllib.parse
-import urllib.request
-from typing import Any, Callable, Dict, List, Optional, Text, TypeVar
-
-try:
-    import lxml
-
-    lxml.html
-except AttributeError:
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+if TYPE_CHECKING:
     import lxml.html
 
-from . import langs
-from .constants import MIN_QUOTE_LEN, MIN_QUOTE_WORDS
+from . import index, instrumentation, langs, transport
+from .constants import (
+    HTML_CHUNK_SIZE,
+    MIN_QUOTE_LEN,
+    MIN_QUOTE_WORDS,
+    QUOTE_BATCH_SIZE,
+)
 
 T = TypeVar("T")
 
+# Extraction functions accept either a parsed HTML tree, or the HTML itself (as a
+# string, or encoded as UTF-8), in which case it is parsed incrementally and only as
+# far as needed
+HTMLSource = Union["lxml.html.HtmlElement", Text, bytes]
+
 
 class NoSuchPageException(Exception):
     pass
@@ -36,34 +63,121 @@ class MissingQOTDException(Exception):
 def json_from_url(url: Text, params: Optional[Text] = None) -> Dict[Text, Any]:
     """
     Given a URL that returns JSON, returns a Python dictionary of the parsed JSON by
-    making an HTTP GET request to the url with the given params.
+    making an HTTP GET request to the url with the given params. The request is
+    performed by the current transport (see transport.set_transport()).
 
     :param url: The URL to retrieve
     :param params: The parameters to pass to the URL
     :return: A Python dictionary of the parsed JSON
     """
+    tracer = instrumentation.get_tracer()
+    if tracer is None:
+        # The body is released as soon as it has been decoded, before parsing
+        text = transport.get_transport().get(build_url(url, params)).decode("utf-8")
+        return json.loads(text)
+
+    with instrumentation.stage(tracer, "request"):
+        body = transport.get_transport().get(build_url(url, params))
+    tracer.count("response_bytes", len(body))
+    with instrumentation.stage(tracer, "json_decode"):
+        text = body.decode("utf-8")
+        del body
+        return json.loads(text)
+
+
+def page_html(data: Dict[Text, Any]) -> Text:
+    """
+    Remove the HTML of a page from an action=parse response (in formatversion=2)
+    and return it, so that the response does not keep it alive once it has been
+    parsed.
+
+    :param data: The response
+    :return: The HTML of the page
+    """
+    return data["parse"].pop("text")
+
+
+_parsers = threading.local()
+
+
+def _utf8_parser() -> "lxml.html.HTMLParser":
+    """
+    Return the HTML parser of UTF-8 input of the current thread (lxml parsers are
+    not thread-safe), creating it on first use.
+    """
+    import lxml.html
+
+    parser = getattr(_parsers, "utf8", None)
+    if parser is None:
+        parser = _parsers.utf8 = lxml.html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def parse_html(html: Union[Text, bytes]) -> "lxml.html.HtmlElement":
+    """
+    Parse a complete HTML document with a parser reused by the current thread. The
+    HTML is fed to it encoded as UTF-8, in chunks of HTML_CHUNK_SIZE characters, so
+    that no encoded copy of the whole document is made.
+
+    :param html: The HTML, as a string or encoded as UTF-8
+    :return: The root element of the document
+    """
+    parser = _utf8_parser()
+    try:
+        for start in range(0, len(html), HTML_CHUNK_SIZE):
+            parser.feed(_utf8(html[start : start + HTML_CHUNK_SIZE]))
+        return parser.close()
+    except BaseException:
+        # The parser may be left in the middle of a document
+        _parsers.utf8 = None
+        raise
+
+
+def _utf8(chunk: Union[Text, bytes]) -> bytes:
+    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def build_url(url: Text, params: Optional[Text] = None) -> Text:
+    """
+    Append the given params (quoted) to a URL.
+
+    :param url: The base URL
+    :param params: The parameters to append to the URL
+    :return: The complete URL
+    """
     if params:
         url += urllib.parse.quote(params)
-    res = urllib.request.urlopen(url)
-    body = res.read().decode("utf-8")
-    return json.loads(body)
+    return url
 
 
 def validate_lang(fn: Callable[..., T]) -> Callable[..., T]:
     """
     Decorator function to validate the language parameter of a function by checking if
-    it is in SUPPORTED_LANGUAGES.
+    it is in SUPPORTED_LANGUAGES. Coroutine functions are also supported, in which
+    case the exception is raised when the coroutine is awaited.
 
     :param fn: The function to decorate
     :return: The decorated function
     """
 
-    def internal(*args: Any, **kwargs: Any) -> T:
-        """Helper function to validate the language parameter of a function."""
+    def check(kwargs: Dict[Text, Any]) -> None:
         lang = kwargs.get("lang")
         if lang and lang not in langs.SUPPORTED_LANGUAGES:
             raise UnsupportedLanguageException("Unsupported language: {}".format(lang))
 
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def internal_async(*args: Any, **kwargs: Any) -> Any:
+            """Helper function to validate the language parameter of a coroutine."""
+            check(kwargs)
+            return await fn(*args, **kwargs)
+
+        return cast(Callable[..., T], internal_async)
+
+    def internal(*args: Any, **kwargs: Any) -> T:
+        """Helper function to validate the language parameter of a function."""
+        check(kwargs)
         return fn(*args, **kwargs)
 
     return internal
@@ -82,49 +196,243 @@ def remove_credit(quote: Text) -> Text:
     return quote
 
 
+def quote_key(quote: Text) -> Text:
+    """
+    Normalize a quote for comparison: case, accents, punctuation and spacing are
+    ignored, so that e.g. "Hello, world!" and "hello world" have the same key.
+
+    :param quote: The quote
+    :return: The normalized quote
+    """
+    return " ".join(index.tokenize(quote))
+
+
+def postprocess_quotes(
+    quotes: Iterable[Text],
+    stages: Sequence[Callable[[Text], Text]] = (),
+    dedupe: bool = False,
+) -> Iterator[Text]:
+    """
+    Lazily apply a pipeline of post-processing stages to quotes: each stage is a
+    function taking a quote and returning it transformed (e.g. remove_credit), and
+    all stages are applied to a quote before moving on to the next one. If dedupe is
+    True, quotes with the same key (see quote_key()) as a previous quote are
+    removed, which collapses variants of a quote that only differ in punctuation.
+
+    :param quotes: The quotes to process
+    :param stages: The stages, applied in order
+    :param dedupe: Remove near-duplicate quotes
+    :return: An iterator over the processed quotes
+    """
+    seen = set()
+    for quote in quotes:
+        for stage in stages:
+            quote = stage(quote)
+        if dedupe:
+            key = quote_key(quote)
+            if key in seen:
+                continue
+            seen.add(key)
+        yield quote
+
+
 # ==================================================================================================
 # Extract Functions
 # ==================================================================================================
 
 
+class ExtractorSpec:
+    """
+    The rules used to extract the quotes of a language (the headings of the sections
+    to skip, the words that disqualify a quote, the tags of the elements to ignore
+    and the post-processing of quotes), declared as data by each language module
+    and compiled once into the structures used during extraction.
+    """
+
+    def __init__(
+        self,
+        headings: Optional[Sequence[Text]] = None,
+        word_blocklist: Optional[Sequence[Text]] = None,
+        drop_tags: Collection[Text] = (),
+        stages: Sequence[Callable[[Text], Text]] = (),
+        dedupe: bool = False,
+    ) -> None:
+        """
+        :param headings: A list of headings to skip.
+        :param word_blocklist: A list of words to blacklist (skip quotes containing
+        these words).
+        :param drop_tags: Tags of elements to ignore completely (including their
+        tail text), as if they had been removed from the tree.
+        :param stages: Functions applied in order to each valid quote, e.g.
+        remove_credit (see postprocess_quotes()).
+        :param dedupe: Remove the quotes that only differ from a previous one by
+        case, accents, punctuation or spacing.
+        """
+        # str.startswith() accepts a tuple of prefixes
+        self.headings = tuple(heading.lower() for heading in headings or ())
+        self.word_blocklist = frozenset(word_blocklist or ())
+        self.drop_tags = frozenset(drop_tags)
+        self.stages = tuple(stages)
+        self.dedupe = dedupe
+
+    def extract_quotes(self, tree: HTMLSource, max_quotes: int) -> List[Text]:
+        """
+        Extract quotes from a list of list items and return them as a list (see
+        extract_quotes_li()).
+
+        :param tree: The HTML tree (or HTML) to extract quotes from.
+        :param max_quotes: The maximum number of quotes to extract.
+        :return: A list of quotes.
+        """
+        quotes_list = []
+        for quote in self.iter_quotes(tree):
+            quotes_list.append(quote)
+            if max_quotes == len(quotes_list):
+                break
+        return quotes_list
+
+    def iter_quotes(self, tree: HTMLSource) -> Iterator[Text]:
+        """
+        Lazily extract quotes from list items and description lists (see
+        iter_quotes_li()), and post-process them.
+
+        :param tree: The HTML tree (or HTML) to extract quotes from.
+        :return: An iterator over the quotes found.
+        """
+        quotes = self._iter_valid_quotes(tree)
+        if not self.stages and not self.dedupe:
+            return quotes
+        return postprocess_quotes(quotes, self.stages, self.dedupe)
+
+    def _iter_valid_quotes(self, tree: HTMLSource) -> Iterator[Text]:
+        drop_tags = self.drop_tags
+        nodes = iter_elements(tree, _CANDIDATE_TAGS, _is_candidate, drop_tags)
+        filter_quotes = self.filter_quotes
+        tracer = instrumentation.get_tracer()
+        if tracer is not None:
+            nodes = instrumentation.counted(tracer, "candidate_nodes", nodes)
+            filter_quotes = functools.partial(self._traced_filter_quotes, tracer)
+
+        # Nodes found before the first heading are skipped, unless there are no
+        # headings at all (which can only be known once the whole tree has been
+        # walked)
+        seen_heading = False
+        before_heading: List[lxml.html.HtmlElement] = []
+        skip_to_next_heading = False
+        # Potential quotes are validated in batches, at the end of each section or
+        # once QUOTE_BATCH_SIZE of them have been found
+        candidates: List[Text] = []
+
+        # node is a heading, a list item or description list tag,
+        # e.g.) <li> Quote </li>
+        for node in nodes:
+            if node.tag in ("h2", "h3"):
+                yield from filter_quotes(candidates)
+                candidates = []
+                seen_heading = True
+                before_heading = []
+                skip_to_next_heading = self.skip_heading(node)
+                continue
+            elif not seen_heading:
+                before_heading.append(node)
+                continue
+            elif skip_to_next_heading:
+                continue
+
+            potential_quote = extract_potential_quote(node, drop_tags)
+            if potential_quote:
+                candidates.append(potential_quote)
+            if len(candidates) >= QUOTE_BATCH_SIZE:
+                yield from filter_quotes(candidates)
+                candidates = []
+
+        yield from filter_quotes(candidates)
+        candidates = []
+        for node in before_heading:
+            potential_quote = extract_potential_quote(node, drop_tags)
+            if potential_quote:
+                candidates.append(potential_quote)
+        yield from filter_quotes(candidates)
+
+    def filter_quotes(self, candidates: Sequence[Text]) -> Iterator[Text]:
+        """
+        Validate a batch of potential quotes (see quote_mask()).
+
+        :param candidates: The potential quotes.
+        :return: An iterator over the valid quotes, in order.
+        """
+        return itertools.compress(
+            candidates, quote_mask(candidates, self.word_blocklist)
+        )
+
+    def _traced_filter_quotes(
+        self, tracer: instrumentation.Tracer, candidates: Sequence[Text]
+    ) -> Iterator[Text]:
+        mask = quote_mask(candidates, self.word_blocklist)
+        rejected = len(mask) - sum(mask)
+        if rejected:
+            tracer.count("rejected_quotes", rejected)
+        return itertools.compress(candidates, mask)
+
+    def skip_heading(self, node: "lxml.html.HtmlElement") -> bool:
+        """
+        Determine if we should skip the quotes under a given heading.
+
+        :param node: The heading node.
+        :return: True if the heading is one of the headings to skip.
+        """
+        if not self.headings:
+            return False
+
+        heading = node_text(node, self.drop_tags).lower()
+        return heading.startswith(self.headings)
+
+
 def extract_quotes_li(
-    tree: lxml.html.HtmlElement,
+    tree: HTMLSource,
     max_quotes: int,
     headings: Optional[List[Text]] = None,
     word_blacklist: Optional[List[Text]] = None,
+    drop_tags: Collection[Text] = (),
 ) -> List[Text]:
     """
     Extract quotes from a list of list items and return them as a list. This function
-    will only extract quotes from the first max_quotes list items.
+    will only extract quotes from the first max_quotes list items. If tree is HTML,
+    it is only parsed until max_quotes quotes have been found. Language
+    modules use their own ExtractorSpec instead, compiled once.
 
-    :param tree: The HTML tree to extract quotes from.
+    :param tree: The HTML tree (or HTML) to extract quotes from.
     :param max_quotes: The maximum number of quotes to extract.
     :param headings: A list of headings to skip.
     :param word_blacklist: A list of words to blacklist (skip quotes containing these
     words).
+    :param drop_tags: Tags of elements to ignore completely (including their tail
+    text), as if they had been removed from the tree.
     :return: A list of quotes, e.g. ["Quote 1", "Quote 2", ...].
     """
-    remove_toc(tree)  # Remove table of contents
-    quotes_list = []
-    skip_to_next_heading = bool(tree.xpath("//h2|//h3"))
-    node_list = tree.xpath("//div/ul/li|//div/dl|//h2|//h3")
+    spec = ExtractorSpec(headings, word_blacklist, drop_tags)
+    return spec.extract_quotes(tree, max_quotes)
 
-    # Iterate through the list items and description list tags
-    # node is a list item or description list tag, e.g.) <li> Quote </li>
-    for node in node_list:
-        if node.tag in ["h2", "h3"]:
-            skip_to_next_heading = check_skip_heading(node, headings or [])
-            continue
-        elif skip_to_next_heading:
-            continue
 
-        # Potential quote is the first child node of the list item
-        potential_quote = extract_potential_quote(node)
-        if potential_quote and is_quote(potential_quote, word_blacklist or []):
-            quotes_list.append(potential_quote)
-            if max_quotes == len(quotes_list):
-                break
-    return quotes_list
+def iter_quotes_li(
+    tree: HTMLSource,
+    headings: Optional[List[Text]] = None,
+    word_blacklist: Optional[List[Text]] = None,
+    drop_tags: Collection[Text] = (),
+) -> Iterator[Text]:
+    """
+    Lazily extract quotes from list items and description lists, in a single walk
+    over the tree. The tree is not modified: the table of contents, elements with
+    tags in drop_tags and nested lists are ignored instead of being removed. If tree
+    is HTML, it is parsed incrementally as quotes are consumed.
+
+    :param tree: The HTML tree (or HTML) to extract quotes from.
+    :param headings: A list of headings to skip.
+    :param word_blacklist: A list of words to blacklist.
+    :param drop_tags: Tags of elements to ignore completely.
+    :return: An iterator over the quotes found.
+    """
+    return ExtractorSpec(headings, word_blacklist, drop_tags).iter_quotes(tree)
 
 
 # TODO: Add features to extract author pages, disambiguation pages, and other pages
@@ -177,28 +485,9 @@ def extract_quotes_li(
 # against potential website changes.
 
 
-#---------------------------------------------------------------------------------------------------------
-
-# Improvement 2: Offline Data Backup (Optional)
-
-# While the current implementation relies on the Wikiquote API, we can consider incorporating an optional fallback
-# mechanism using an offline dataset in case the API becomes unavailable.
-
-# This would provide increased resilience against API outages. An example dataset is available at:
-# https://www.kaggle.com/code/kerneler/starter-wikiquote-en-simplified-a2e29c89-c/input (English dataset)
-
-# However, there are considerations:
-
-# - Offline datasets might not be as up-to-date as the online API.
-# - Extracting "Quote of the Day" might not be feasible with offline data.
-# - Managing offline data could introduce additional complexity.
-
-# The decision to include an offline backup depends on the trade-off between resilience and complexity
-# within your specific use case.
-
-#---------------------------------------------------------------------------------------------------------
+# ---------------------------------------------------------------------------------------------------------
 
-# Improvement 3: Enhanced Quote Extraction 
+# Improvement 3: Enhanced Quote Extraction
 
 # We can potentially improve the accuracy of extracted quotes by considering the structure of Wikiquote pages.
 
@@ -219,55 +508,293 @@ def extract_quotes_li(
 # ===================================================================================================
 
 
-def remove_toc(tree: lxml.html.HtmlElement) -> None:
+@functools.lru_cache(maxsize=None)
+def compiled_xpath(path: Text) -> Callable[..., List[Any]]:
+    """
+    Compile an XPath expression, once: the compiled expression is cached and reused
+    by later calls. Language modules compile their selectors when they are imported.
+
+    :param path: The XPath expression (which must select a node-set).
+    :return: The compiled expression, which returns the selected nodes when it is
+    called with an element.
+    """
+    import lxml.etree
+
+    return cast(Callable[..., List[Any]], lxml.etree.XPath(path))
+
+
+def remove_toc(tree: "lxml.html.HtmlElement") -> None:
     """
     Remove the table of contents from the given HTML tree.
 
     :param tree: The HTML tree.
     """
-    for toc in tree.xpath('//div[@id="toc"]'):
+    for toc in compiled_xpath('//div[@id="toc"]')(tree):
         toc.getparent().remove(toc)
 
 
-def check_skip_heading(node: lxml.html.HtmlElement, headings: List[Text]) -> bool:
+def _is_dropped(node: "lxml.html.HtmlElement", drop_tags: Collection[Text]) -> bool:
+    """
+    Check if a node must be ignored during extraction: either it is the table of
+    contents, or its tag is in drop_tags.
+    """
+    return node.tag in drop_tags or (node.tag == "div" and node.get("id") == "toc")
+
+
+def walk_html(
+    source: HTMLSource,
+    tags: Optional[Sequence[Text]] = None,
+    chunk_size: int = HTML_CHUNK_SIZE,
+) -> Iterator[Tuple[Text, "lxml.html.HtmlElement"]]:
+    """
+    Yield ("start", element) and ("end", element) events for the elements of an HTML
+    document, in document order. If the source is HTML (a string, or bytes), it is
+    fed to an incremental parser in chunks of chunk_size characters (or bytes), so
+    that parsing stops as soon as the caller stops consuming events. At the "end"
+    event of an element, the element and all of its descendants have been completely
+    parsed.
+
+    :param source: An HTML tree, or the HTML to parse (a string, or bytes encoded as
+    UTF-8).
+    :param tags: If given, only yield events for elements with these tags.
+    :param chunk_size: Number of characters (or bytes) fed to the parser at a time.
+    :return: An iterator over (event, element) tuples.
+    """
+    # lxml is only imported once HTML has to be parsed, so that importing wikiquote
+    # stays fast
+    import lxml.etree
+    import lxml.html
+
+    if not isinstance(source, (str, bytes)):
+        yield from lxml.etree.iterwalk(source, events=("start", "end"), tag=tags)
+        return
+    if not source.strip():
+        # An empty document has no elements
+        return
+
+    # The HTML is fed as UTF-8, one chunk at a time. Unlike parse_html(), pull
+    # parsers are not reused, as several walks may be in progress at once in a
+    # thread (and they are cheap to create compared to parsing).
+    parser = lxml.etree.HTMLPullParser(
+        events=("start", "end"), tag=tags, encoding="utf-8"
+    )
+    parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+    tracer = instrumentation.get_tracer()
+    if tracer is not None:
+        yield from _traced_pull_parse(tracer, parser, source, chunk_size)
+        return
+
+    for start in range(0, len(source), chunk_size):
+        parser.feed(_utf8(source[start : start + chunk_size]))
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def _traced_pull_parse(
+    tracer: instrumentation.Tracer,
+    parser: "lxml.etree.HTMLPullParser",
+    source: Union[Text, bytes],
+    chunk_size: int,
+) -> Iterator[Tuple[Text, "lxml.html.HtmlElement"]]:
+    """
+    Feed the source to the parser like walk_html() does, and report the time spent
+    parsing (excluding the time spent by the caller between events) as the
+    html_parse stage.
+    """
+    elapsed = 0.0
+    try:
+        for start in range(0, len(source), chunk_size):
+            began = time.perf_counter()
+            parser.feed(_utf8(source[start : start + chunk_size]))
+            elapsed += time.perf_counter() - began
+            yield from parser.read_events()
+        began = time.perf_counter()
+        parser.close()
+        elapsed += time.perf_counter() - began
+        yield from parser.read_events()
+    finally:
+        tracer.observe("html_parse", elapsed)
+
+
+def iter_elements(
+    source: HTMLSource,
+    tags: Sequence[Text],
+    match: Optional[Callable[["lxml.html.HtmlElement"], bool]] = None,
+    drop_tags: Collection[Text] = (),
+    skip_toc: bool = True,
+) -> Iterator["lxml.html.HtmlElement"]:
+    """
+    Yield, in document order, the elements with the given tags for which match()
+    returns True, each one as soon as it has been completely parsed (see
+    walk_html()). The contents of dropped elements (see _is_dropped()) are skipped.
+
+    :param source: An HTML tree, or the HTML to parse.
+    :param tags: Tags of the elements to yield.
+    :param match: If given, only yield the elements for which it returns True. It
+    is called as soon as an element starts, so it should only look at the
+    element's tag, attributes and ancestors.
+    :param drop_tags: Tags of elements to ignore completely.
+    :param skip_toc: Skip the contents of the table of contents.
+    :return: An iterator over the matching elements.
+    """
+    walked = set(tags) | set(drop_tags) | {"div"}
+    # Matching elements that have started, in document order, each with a flag
+    # telling whether it has ended
+    pending: Deque[List[Any]] = collections.deque()
+    skipping = None
+    for event, node in walk_html(source, sorted(walked)):
+        if skipping is not None:
+            if node is skipping and event == "end":
+                skipping = None
+            continue
+
+        if event == "start":
+            if skip_toc:
+                dropped = _is_dropped(node, drop_tags)
+            else:
+                dropped = node.tag in drop_tags
+            if dropped:
+                skipping = node
+            elif node.tag in tags and (match is None or match(node)):
+                pending.append([node, False])
+            continue
+
+        for entry in pending:
+            if entry[0] is node:
+                entry[1] = True
+                break
+        while pending and pending[0][1]:
+            yield pending.popleft()[0]
+
+
+# Tags of the elements walked by ExtractorSpec.iter_quotes()
+_CANDIDATE_TAGS = ("h2", "h3", "li", "dl")
+
+
+def _is_candidate(node: "lxml.html.HtmlElement") -> bool:
+    """
+    Check if a node may contain a quote or is a heading, i.e. if it matches
+    //div/ul/li|//div/dl|//h2|//h3.
+    """
+    parent = node.getparent()
+    if node.tag == "li":
+        parent_tag = parent.tag if parent is not None else None
+        parent = parent.getparent() if parent_tag == "ul" else None
+    elif node.tag != "dl":
+        return True
+    return parent is not None and parent.tag == "div"
+
+
+def node_text(
+    node: "lxml.html.HtmlElement",
+    drop_tags: Collection[Text] = (),
+    skip_children: Sequence[Text] = (),
+) -> Text:
+    """
+    Return the text content of a node, as text_content() would after removing the
+    dropped elements (see _is_dropped()) and the direct children of the node with
+    tags in skip_children from the tree.
+
+    :param node: The node.
+    :param drop_tags: Tags of elements to ignore completely.
+    :param skip_children: Tags of direct children to ignore.
+    :return: The text content.
+    """
+    parts: List[Text] = []
+    _collect_text(node, drop_tags, skip_children, parts)
+    return "".join(parts)
+
+
+def _collect_text(
+    node: "lxml.html.HtmlElement",
+    drop_tags: Collection[Text],
+    skip_children: Sequence[Text],
+    parts: List[Text],
+) -> None:
+    if node.text:
+        parts.append(node.text)
+    for child in node:
+        if not isinstance(child.tag, str):
+            # Comments and processing instructions only contribute their tail
+            pass
+        elif child.tag in skip_children or _is_dropped(child, drop_tags):
+            continue
+        else:
+            _collect_text(child, drop_tags, (), parts)
+        if child.tail:
+            parts.append(child.tail)
+
+
+def _child_nodes(
+    node: "lxml.html.HtmlElement",
+    drop_tags: Collection[Text],
+    skip_children: Sequence[Text] = (),
+) -> List[Any]:
+    """
+    Return the child nodes (elements and text) of a node, like the XPath expression
+    child::node() would after removing the ignored elements from the tree.
+    """
+    if not isinstance(node.tag, str):
+        return []
+
+    children: List[Any] = [node.text] if node.text else []
+    for child in node:
+        if isinstance(child.tag, str) and (
+            child.tag in skip_children or _is_dropped(child, drop_tags)
+        ):
+            continue
+        children.append(child)
+        if child.tail:
+            children.append(child.tail)
+    return children
+
+
+def check_skip_heading(
+    node: "lxml.html.HtmlElement",
+    headings: List[Text],
+    drop_tags: Collection[Text] = (),
+) -> bool:
     """
     Determine if we should skip the quotes under a given heading.
 
     :param node: The heading node.
     :param headings: List of headings to be checked.
+    :param drop_tags: Tags of elements to ignore completely.
     :return: True if the heading indicates skipping, False otherwise.
     """
-    return any(
-        node.text_content().lower().startswith(unwanted.lower())
-        for unwanted in headings
-    )
+    if not headings:
+        return False
+
+    heading = node_text(node, drop_tags).lower()
+    return heading.startswith(tuple(unwanted.lower() for unwanted in headings))
 
 
-def extract_potential_quote(node: lxml.html.HtmlElement) -> Optional[Text]:
+def extract_potential_quote(
+    node: "lxml.html.HtmlElement", drop_tags: Collection[Text] = ()
+) -> Optional[Text]:
     """
     Extract a potential quote from a given node.
 
     :param node: The node potentially containing a quote.
+    :param drop_tags: Tags of elements to ignore completely.
     :return: Extracted quote or None if not found.
     """
     if node.tag == "dl":
-        dds = node.xpath("dd")
-        if all(is_quote_node(dd) for dd in dds):
-            return clean_txt("\n".join(dd.text_content().strip() for dd in dds))
+        dds = [dd for dd in node if dd.tag == "dd" and not _is_dropped(dd, drop_tags)]
+        if all(is_quote_node(dd, drop_tags) for dd in dds):
+            return clean_txt("\n".join(node_text(dd, drop_tags).strip() for dd in dds))
         return None
 
-    # Remove nested uls (unordered lists) from the node, if any
-    for ul in node.xpath("ul"):
-        ul.getparent().remove(ul)
-
+    # Nested uls (unordered lists) are not part of the quote
     return (
-        clean_txt(" ".join(node.text_content().split()))
-        if is_quote_node(node)
+        clean_txt(" ".join(node_text(node, drop_tags, ("ul",)).split()))
+        if is_quote_node(node, drop_tags, ("ul",))
         else None
     )
 
 
-def is_quote(txt: Text, word_blacklist: List[Text]) -> bool:
+def is_quote(txt: Text, word_blacklist: Collection[Text]) -> bool:
     """
     This function will check if a string is a valid quote. A valid quote is defined as a
     string that:
@@ -283,21 +810,49 @@ def is_quote(txt: Text, word_blacklist: List[Text]) -> bool:
     :return: True if the text is a valid quote, False otherwise
     :rtype: bool
     """
-    txt_split = txt.split()
-    invalid_conditions = [
-        txt and txt[0].isalpha() and txt[0].islower(),
-        len(txt) < MIN_QUOTE_LEN,
-        len(txt_split) < MIN_QUOTE_WORDS,
-        any(True for word in txt_split if word in word_blacklist),
-        txt.endswith(("(", ":", "]")),
-        txt.startswith(("(",)),
-    ]
+    return quote_mask([txt], word_blacklist)[0]
 
-    # Returns False if any invalid conditions are True, otherwise returns True.
-    return not any(invalid_conditions)
 
-
-def is_quote_node(node: lxml.html.HtmlElement) -> bool:
+def quote_mask(
+    candidates: Sequence[Text], word_blacklist: Collection[Text] = ()
+) -> List[bool]:
+    """
+    Check many potential quotes at once, with the rules of is_quote(). The cheapest
+    checks are done first, and the text of a candidate is only split into words
+    once all of them have passed. The blacklist is checked with a single set
+    operation per candidate.
+
+    :param candidates: The texts to check
+    :param word_blacklist: A collection of words to blacklist (preferably a
+    frozenset, otherwise it is converted to one)
+    :return: A list with one boolean per candidate, True if it is a valid quote
+    """
+    if not isinstance(word_blacklist, (set, frozenset)):
+        word_blacklist = frozenset(word_blacklist)
+
+    mask = []
+    for txt in candidates:
+        first = txt[:1]
+        valid = not (
+            len(txt) < MIN_QUOTE_LEN
+            or (first.isalpha() and first.islower())
+            or first == "("
+            or txt.endswith(("(", ":", "]"))
+        )
+        if valid:
+            txt_split = txt.split()
+            valid = len(txt_split) >= MIN_QUOTE_WORDS and word_blacklist.isdisjoint(
+                txt_split
+            )
+        mask.append(valid)
+    return mask
+
+
+def is_quote_node(
+    node: "lxml.html.HtmlElement",
+    drop_tags: Collection[Text] = (),
+    skip_children: Sequence[Text] = (),
+) -> bool:
     """
     This function will check if a node is a valid quote. It returns True if the node is
     a valid quote, False otherwise.
@@ -305,28 +860,37 @@ def is_quote_node(node: lxml.html.HtmlElement) -> bool:
       link.
 
     :param node: The node to check
+    :param drop_tags: Tags of elements to ignore completely
+    :param skip_children: Tags of direct children of the node to ignore
     :return: True if the node is a valid quote, False otherwise
     """
     # Discard nodes with the <small> tag
-    if node.find("small") is not None:
-        return False
+    for child in node:
+        if child.tag == "small" and not _is_dropped(child, drop_tags):
+            return False
 
     # Discard nodes that are just a link
-    # (using xpath so lxml will show text nodes)
     # The link may be inside <i> or <b> tags, so keep peeling layers
     suspect_node = node
     while True:
-        node_children = suspect_node.xpath("child::node()")
+        node_children = _child_nodes(suspect_node, drop_tags, skip_children)
+        skip_children = ()
         if len(node_children) != 1:
             break
         suspect_node = node_children[0]
-        if not isinstance(suspect_node, lxml.etree._Element):
+        if isinstance(suspect_node, str):
             break
         if suspect_node.tag == "a":
             return False
     return True
 
 
+# Unwanted characters: quotation marks and non-breaking spaces. str.replace() is
+# used instead of a str.translate() table, which is several times slower in CPython
+# when deleting characters from non-ASCII text
+_UNWANTED_CHARS = ("«", "»", '"', "“", "”", "\xa0")
+
+
 def clean_txt(txt: Text) -> Text:
     """
     This function will clean the text of a quote by removing unwanted characters,
@@ -335,6 +899,6 @@ def clean_txt(txt: Text) -> Text:
     :param txt: The text to clean
     :return: The cleaned text
     """
-    txt = re.sub(r'«|»|"|“|”', "", txt)  # Remove unwanted characters
-    txt = txt.replace("\xa0", "")  # Remove non-breaking spaces
+    for char in _UNWANTED_CHARS:
+        txt = txt.replace(char, "")  # Remove unwanted characters
     return txt.strip()  # Remove leading and trailing newlines/quotes